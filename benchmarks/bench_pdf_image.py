@@ -0,0 +1,127 @@
+# benchmarks/bench_pdf_image.py
+"""
+Size and render time of a lab report PDF with an image attachment.
+
+Generates phone-photo-like test images (a 12 MP JPEG with an EXIF rotation, a 3-page
+scanned TIFF) and, for each, builds cover + image PDF two ways:
+
+- original: the old embed_image_into_pdf - full-resolution pixels handed to
+            reportlab (Flate-compressed raw RGB), first frame only
+- pipeline: the current embed_image_into_pdf - EXIF-rotated, downsampled to
+            PDF_IMAGE_DPI, re-encoded as JPEG (PDF_IMAGE_JPEG_QUALITY), every TIFF page
+
+and reports the output size and the median time of --runs renders.
+
+Usage (from the repo root):
+    python benchmarks/bench_pdf_image.py [--runs 3]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from io import BytesIO
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from PIL import Image, ImageDraw, ImageFilter  # noqa: E402
+from reportlab.lib.pagesizes import A4  # noqa: E402
+from reportlab.lib.units import mm  # noqa: E402
+from reportlab.lib.utils import ImageReader  # noqa: E402
+from reportlab.pdfgen import canvas  # noqa: E402
+
+from utils import pdf_utils  # noqa: E402
+
+
+def photo(width: int, height: int, seed: int) -> Image.Image:
+    """Smooth shading, printed text lines and sensor noise - compresses like a real photo."""
+    base = Image.linear_gradient("L").resize((width, height)).convert("RGB")
+    noise = Image.effect_noise((width, height), 24).convert("RGB")
+    img = Image.blend(base, noise, 0.15)
+    draw = ImageDraw.Draw(img)
+    for row in range(40):
+        y = height // 10 + row * height // 50
+        draw.rectangle((width // 10, y, width // 10 + (seed * 37 + row * 53) % (width // 2) + width // 4, y + height // 200),
+                       fill=(30, 30, 40))
+    return img.filter(ImageFilter.GaussianBlur(0.6))
+
+
+def phone_jpeg() -> bytes:
+    """4000 x 3000 JPEG stored sideways with EXIF orientation 6, as phones write them."""
+    img = photo(4000, 3000, 1)
+    exif = Image.Exif()
+    exif[0x0112] = 6
+    buf = BytesIO()
+    img.save(buf, "JPEG", quality=92, exif=exif)
+    return buf.getvalue()
+
+
+def scanned_tiff(pages: int = 3) -> bytes:
+    """Multi-page 300 dpi A4 scan (2480 x 3508 per page), LZW compressed."""
+    frames = [photo(2480, 3508, i) for i in range(pages)]
+    buf = BytesIO()
+    frames[0].save(buf, "TIFF", save_all=True, append_images=frames[1:], compression="tiff_lzw", dpi=(300, 300))
+    return buf.getvalue()
+
+
+def original_embed(cover_buf, image_file):
+    """embed_image_into_pdf before the pre-processing pipeline."""
+    image_file.seek(0)
+    img = Image.open(image_file)
+    if img.mode in ("RGBA", "LA"):
+        img = img.convert("RGB")
+    img.seek(0)
+
+    image_pdf_buf = BytesIO()
+    c = canvas.Canvas(image_pdf_buf, pagesize=A4)
+    page_w, page_h = A4
+    max_w, max_h = page_w - 20 * mm, page_h - 30 * mm
+    iw, ih = img.size
+    scale = min(max_w / iw, max_h / ih, 1.0)
+    draw_w, draw_h = iw * scale, ih * scale
+    c.drawImage(ImageReader(img), (page_w - draw_w) / 2, (page_h - draw_h) / 2, draw_w, draw_h,
+                preserveAspectRatio=True)
+    c.showPage()
+    c.save()
+    image_pdf_buf.seek(0)
+    return pdf_utils.merge_pdfs([cover_buf, image_pdf_buf])
+
+
+def measure(embed, cover, data: bytes, runs: int):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        output = embed(cover, BytesIO(data))
+        times.append(time.perf_counter() - start)
+    size = len(output.getvalue())
+    pages = len(pdf_utils.PdfReader(output).pages)
+    return size, statistics.median(times), pages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    report = SimpleNamespace(
+        id=1, prescription=None, test_name="Blood Panel", status="Lab Test Completed",
+        result="see attachment", result_url=None, created_at=None, updated_at=None,
+    )
+    cover = pdf_utils.create_cover_pdf(report)
+
+    print(f"PDF_IMAGE_DPI={pdf_utils.PDF_IMAGE_DPI} PDF_IMAGE_JPEG_QUALITY={pdf_utils.PDF_IMAGE_JPEG_QUALITY}")
+    for name, data in (("12 MP phone JPEG", phone_jpeg()), ("3-page TIFF scan", scanned_tiff())):
+        print(f"\n{name}: input {len(data) / 1024 / 1024:.1f} MB")
+        results = {}
+        for mode, embed in (("original", original_embed), ("pipeline", pdf_utils.embed_image_into_pdf)):
+            size, seconds, pages = measure(embed, cover, data, args.runs)
+            results[mode] = (size, seconds)
+            print(f"  {mode:<9} {size / 1024 / 1024:>7.2f} MB  {seconds:>6.2f} s  {pages} pages")
+        (old_size, old_time), (new_size, new_time) = results["original"], results["pipeline"]
+        print(f"  saved     {100 * (1 - new_size / old_size):>6.1f} %   {100 * (1 - new_time / old_time):>5.1f} % time")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+# benchmarks/bench_pdf_merge.py
+"""
+Peak memory of a lab report download with a large PDF attachment.
+
+Builds a PDF of about --size-mb (default 50) of incompressible scanned-page images,
+then, each in a fresh process, merges a cover page in front of it:
+
+- buffered:  the old path - whole body as bytes (resp.content), copied into a
+             BytesIO, merged into another BytesIO, returned from memory
+- streaming: the current path - attachment in a temp file (http_client.download),
+             merged into a spooled temp file, streamed out in chunks (iter_file)
+
+and reports wall time and peak RSS above the process baseline.
+
+Usage (from the repo root):
+    python benchmarks/bench_pdf_merge.py [--size-mb 50]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+PAGE_PIXELS = 1400   # square raw RGB image per page, ~5.6 MB each
+
+
+def build_attachment(path: str, size_mb: float):
+    """Write a valid PDF of uncompressed noise images, streamed to disk (no PDF library needed)."""
+    image_bytes = PAGE_PIXELS * PAGE_PIXELS * 3
+    pages = max(1, round(size_mb * 1024 * 1024 / image_bytes))
+    offsets = []
+
+    with open(path, "wb") as f:
+        def obj(body: bytes):
+            offsets.append(f.tell())
+            f.write(b"%d 0 obj\n" % len(offsets) + body + b"\nendobj\n")
+
+        f.write(b"%PDF-1.4\n")
+        kids = " ".join(f"{3 + 3 * i} 0 R" for i in range(pages)).encode()
+        obj(b"<< /Type /Catalog /Pages 2 0 R >>")
+        obj(b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % pages)
+        for i in range(pages):
+            page, content, image = 3 + 3 * i, 4 + 3 * i, 5 + 3 * i
+            obj(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Contents %d 0 R "
+                b"/Resources << /XObject << /Im0 %d 0 R >> >> >>" % (content, image))
+            draw = b"q 595 0 0 842 0 0 cm /Im0 Do Q"
+            obj(b"<< /Length %d >>\nstream\n" % len(draw) + draw + b"\nendstream")
+            offsets.append(f.tell())
+            f.write(b"%d 0 obj\n<< /Type /XObject /Subtype /Image /Width %d /Height %d "
+                    b"/ColorSpace /DeviceRGB /BitsPerComponent 8 /Length %d >>\nstream\n"
+                    % (image, PAGE_PIXELS, PAGE_PIXELS, image_bytes))
+            remaining = image_bytes
+            while remaining:
+                chunk = min(remaining, 1024 * 1024)
+                f.write(os.urandom(chunk))
+                remaining -= chunk
+            f.write(b"\nendstream\nendobj\n")
+
+        xref = f.tell()
+        f.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(offsets) + 1))
+        for offset in offsets:
+            f.write(b"%010d 00000 n \n" % offset)
+        f.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(offsets) + 1, xref))
+
+
+def peak_rss_kb() -> int:
+    """High-water RSS of this process (VmHWM; ru_maxrss would include the parent's pre-exec peak)."""
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def child(mode: str, path: str):
+    import time
+    from io import BytesIO
+    from types import SimpleNamespace
+
+    from utils.file_cache import iter_file
+    from utils.pdf_utils import create_cover_pdf, merge_pdfs, spooled_pdf_file
+
+    report = SimpleNamespace(
+        id=1, prescription=None, test_name="X-Ray", status="Lab Test Completed",
+        result="see attachment", result_url="https://example.org/scan.pdf",
+        created_at=None, updated_at=None,
+    )
+    cover = create_cover_pdf(report)
+    baseline = peak_rss_kb()
+    start = time.perf_counter()
+
+    sent = 0
+    if mode == "buffered":
+        with open(path, "rb") as f:
+            content = f.read()                      # resp.content
+        merged = merge_pdfs([cover, BytesIO(content)])
+        for chunk in iter_file(merged):
+            sent += len(chunk)
+    else:
+        with open(path, "rb") as attachment:        # http_client.download spools to disk
+            merged = merge_pdfs([cover, attachment], spooled_pdf_file())
+        for chunk in iter_file(merged):
+            sent += len(chunk)
+
+    print(json.dumps({
+        "mode": mode,
+        "seconds": round(time.perf_counter() - start, 2),
+        "peak_rss_mb": round((peak_rss_kb() - baseline) / 1024, 1),
+        "output_mb": round(sent / 1024 / 1024, 1),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--size-mb", type=float, default=50)
+    parser.add_argument("--child", nargs=2, metavar=("MODE", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(*args.child)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "attachment.pdf")
+        build_attachment(path, args.size_mb)
+        print(f"attachment: {os.path.getsize(path) / 1024 / 1024:.1f} MB")
+
+        env = dict(os.environ, DATABASE_URL=os.environ.get("DATABASE_URL", "sqlite://"))
+        for mode in ("buffered", "streaming"):
+            out = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--child", mode, path],
+                cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+            ).stdout
+            result = json.loads(out.strip().splitlines()[-1])
+            print(f"{result['mode']:<10} {result['seconds']:>6.2f} s   "
+                  f"peak RSS +{result['peak_rss_mb']:.1f} MB   output {result['output_mb']} MB")
+
+
+if __name__ == "__main__":
+    main()
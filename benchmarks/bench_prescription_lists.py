@@ -0,0 +1,175 @@
+# benchmarks/bench_prescription_lists.py
+"""
+Rows transferred and latency per page for the prescription list endpoints.
+
+Compares the old joinedload + LIMIT page fetch against the current controller
+(page of prescriptions first, then batched IN-queries) at 100k+ prescriptions.
+
+Usage (from the repo root):
+    python benchmarks/bench_prescription_lists.py [--rows 100000] [--pages 1,10,100]
+
+Runs on an in-memory SQLite database by default; set BENCH_DATABASE_URL to point at
+a scratch PostgreSQL database instead (its tables are created and filled).
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from sqlalchemy import create_engine, desc, event, insert
+from sqlalchemy.orm import sessionmaker, joinedload
+from sqlalchemy.pool import StaticPool
+
+from database import Base
+from models.user import User, UserRole
+from models.student import Student
+from models.medicine import Medicine
+from models.prescription import Prescription
+from models.prescription_medicine import PrescriptionMedicine
+from models.lab_report import LabReport
+from models.staff_profile import StaffProfile  # noqa: F401  (registers mapper)
+from controllers import prescription_controller as ctrl
+
+
+def make_engine():
+    url = os.getenv("BENCH_DATABASE_URL")
+    if url:
+        return create_engine(url)
+    return create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+
+
+def seed(engine, rows: int):
+    Base.metadata.create_all(engine)
+    base = datetime(2024, 1, 1)
+
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{
+            "id": 1, "username": "bench_nurse", "email": "bench@hms",
+            "hashed_password": "x", "role": UserRole.nurse,
+        }])
+        conn.execute(insert(Student), [
+            {"id": i, "id_number": f"B{i:06d}", "email": f"b{i}@hms", "name": f"Student {i}"}
+            for i in range(1, 2001)
+        ])
+        conn.execute(insert(Medicine), [
+            {"id": i, "name": f"MED {i}", "quantity": 500} for i in range(1, 201)
+        ])
+
+        batch = 10_000
+        for start in range(1, rows + 1, batch):
+            ids = range(start, min(start + batch, rows + 1))
+            conn.execute(insert(Prescription), [{
+                "id": i, "student_id": (i % 2000) + 1, "nurse_id": 1,
+                "status": "Medication Prescribed by Doctor" if i % 3 else "Initiated by Nurse",
+                "patient_type": "student", "visit_type": "normal",
+                "created_at": base + timedelta(minutes=i),
+            } for i in ids])
+            # three medicines and two lab tests per prescription
+            conn.execute(insert(PrescriptionMedicine), [{
+                "prescription_id": i, "medicine_id": ((i + k) % 200) + 1,
+                "quantity_prescribed": 2,
+            } for i in ids for k in range(3)])
+            conn.execute(insert(LabReport), [{
+                "prescription_id": i, "test_name": f"TEST {k}",
+                "status": "Lab Test Requested", "created_at": base + timedelta(minutes=i),
+            } for i in ids for k in range(2)])
+
+
+class StatementRecorder:
+    """Captures every statement so the rows each one returns can be counted afterwards."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+        event.listen(engine, "after_cursor_execute", self._record)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            self.statements.append((statement, parameters))
+
+    def reset(self):
+        self.statements = []
+
+    def transferred(self):
+        """(rows, values) returned by the captured statements; values = rows x columns."""
+        rows = values = 0
+        captured = list(self.statements)
+        with self.engine.connect() as conn:
+            for statement, parameters in captured:
+                fetched = conn.exec_driver_sql(statement, parameters).fetchall()
+                rows += len(fetched)
+                values += sum(len(r) for r in fetched)
+        return rows, values
+
+
+def old_joinedload_page(db, page: int, limit: int):
+    """The pre-two-phase list query: joinedload collections + LIMIT/OFFSET."""
+    return (
+        db.query(Prescription)
+        .options(
+            joinedload(Prescription.student),
+            joinedload(Prescription.medicines).joinedload(PrescriptionMedicine.medicine),
+            joinedload(Prescription.lab_reports),
+        )
+        .order_by(desc(Prescription.created_at))
+        .offset((page - 1) * limit)
+        .limit(limit)
+        .all()
+    )
+
+
+def measure(fn, recorder, repeat: int = 5):
+    timings = []
+    for _ in range(repeat):
+        recorder.reset()
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return (timings[len(timings) // 2] * 1000, len(recorder.statements), *recorder.transferred())
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--pages", default="1,10,100,1000")
+    args = parser.parse_args()
+
+    engine = make_engine()
+    print(f"seeding {args.rows} prescriptions ...")
+    seed(engine, args.rows)
+    Session = sessionmaker(bind=engine)
+    recorder = StatementRecorder(engine)
+
+    print(f"{'variant':<28}{'page':>6}{'median ms':>12}{'queries':>9}{'rows':>8}{'values':>9}")
+    for page in [int(p) for p in args.pages.split(",")]:
+        db = Session()
+        variants = [
+            ("joinedload + LIMIT (old)", lambda: old_joinedload_page(db, page, args.limit)),
+            ("page + IN-queries (offset)", lambda: ctrl.get_prescriptions(db, page, args.limit, count="none")),
+        ]
+        # the keyset cursor for the same page, taken from the previous page's last row
+        if page > 1:
+            prev = ctrl.get_prescriptions(db, page - 1, args.limit, count="none")
+            variants.append((
+                "page + IN-queries (cursor)",
+                lambda: ctrl.get_prescriptions(db, limit=args.limit, cursor=prev["next_cursor"], count="none"),
+            ))
+
+        for name, fn in variants:
+            ms, queries, rows, values = measure(lambda: (fn(), db.expunge_all()), recorder)
+            print(f"{name:<28}{page:>6}{ms:>12.2f}{queries:>9}{rows:>8}{values:>9}")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# benchmarks/bench_startup.py
+"""
+Cold-start profile of the API: time and memory to `import main` in a fresh process.
+
+Each run starts a new interpreter (like a new worker), imports the app and reports
+wall time, peak RSS and which heavy libraries were loaded at import. The slowest
+imports come from `python -X importtime`.
+
+Usage (from the repo root):
+    python benchmarks/bench_startup.py [--runs 5] [--top 15]
+
+Heavy libraries (pandas, openpyxl, reportlab, PyPDF2, PIL, google.generativeai)
+should only be imported by the endpoints that use them; any that show up here
+were pulled in at startup.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ["pandas", "openpyxl", "reportlab", "PyPDF2", "PIL", "google.generativeai"]
+
+CHILD = f"""
+import json, resource, sys, time
+start = time.perf_counter()
+import main
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    "import_ms": elapsed * 1000,
+    "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    "heavy": [m for m in {HEAVY_MODULES!r} if m in sys.modules],
+}}))
+"""
+
+
+def child_env():
+    env = dict(os.environ)
+    env.setdefault("DATABASE_URL", "sqlite://")
+    env["PYTHONPATH"] = ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    env.pop("PYTHONPROFILEIMPORTTIME", None)
+    return env
+
+
+def run_once():
+    proc = subprocess.run(
+        [sys.executable, "-c", CHILD], cwd=ROOT, env=child_env(),
+        capture_output=True, text=True, check=True,
+    )
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(top: int):
+    """(cumulative_us, module) for the slowest top-level imports under `import main`."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"], cwd=ROOT, env=child_env(),
+        capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = [part.strip() for part in line[len("import time:"):].split("|")]
+        # Top-level packages only, so a heavy dependency counts once
+        if "." not in name and name != "main":
+            rows.append((int(cumulative), name))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    results = [run_once() for _ in range(args.runs)]
+    import_ms = [r["import_ms"] for r in results]
+    rss_mb = [r["max_rss_kb"] / 1024 for r in results]
+
+    print(f"import main   median {statistics.median(import_ms):8.1f} ms   "
+          f"min {min(import_ms):8.1f} ms   ({args.runs} runs)")
+    print(f"peak RSS      median {statistics.median(rss_mb):8.1f} MB")
+    heavy = results[-1]["heavy"]
+    print(f"heavy modules loaded at startup: {', '.join(heavy) if heavy else 'none'}")
+
+    print("\nslowest imports (cumulative):")
+    for cumulative, name in slowest_imports(args.top):
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
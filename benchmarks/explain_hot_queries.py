@@ -0,0 +1,152 @@
+# benchmarks/explain_hot_queries.py
+"""
+EXPLAIN the hot list/queue/stats queries and check that each one uses its index.
+
+The statements are captured from the real controller calls, so this follows the
+controllers as they change. Exits non-zero if an expected index is not used.
+
+Usage (from the repo root):
+    python benchmarks/explain_hot_queries.py
+
+Runs on an in-memory SQLite database built from the models by default; set
+BENCH_DATABASE_URL to check a migrated PostgreSQL database instead (sequential
+scans are disabled for the check so small tables still show the index plans).
+"""
+import os
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from database import Base
+from models.user import User, UserRole
+from models.student import Student
+from models.medicine import Medicine
+from models.prescription import Prescription
+from models.prescription_medicine import PrescriptionMedicine
+from models.lab_report import LabReport
+from models.staff_profile import StaffProfile  # noqa: F401  (registers mapper)
+from controllers import prescription_controller, lab_report_controller, stats_controller
+
+
+# name -> (controller call, index that must appear in at least one of its plans)
+HOT_QUERIES = {
+    "prescription list": (
+        lambda db: prescription_controller.get_prescriptions(db, count="none"),
+        "ix_prescriptions_created_at_id",
+    ),
+    "pharmacist queue": (
+        lambda db: prescription_controller.get_prescribed_queue(db, count="exact"),
+        "ix_prescriptions_status_created_at",
+    ),
+    "student history": (
+        lambda db: prescription_controller.get_prescriptions_by_studentid(db, student_id=1, count="none"),
+        "ix_prescriptions_student_id_created_at",
+    ),
+    "list medicines (IN-load)": (
+        lambda db: prescription_controller.get_prescriptions(db, count="none"),
+        "ix_prescription_medicines_prescription_id",
+    ),
+    "list lab reports (IN-load)": (
+        lambda db: prescription_controller.get_prescriptions(db, count="none"),
+        "ix_lab_reports_prescription_id",
+    ),
+    "lab-tech stats": (
+        lambda db: stats_controller.get_lab_tech_stats(db),
+        "ix_lab_reports_status_created_at",
+    ),
+}
+
+
+def make_engine():
+    url = os.getenv("BENCH_DATABASE_URL")
+    if url:
+        return create_engine(url)
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(engine)
+    seed(engine)
+    return engine
+
+
+def seed(engine, rows: int = 2000):
+    base = datetime(2024, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{
+            "id": 1, "username": "explain_nurse", "email": "explain@hms",
+            "hashed_password": "x", "role": UserRole.nurse,
+        }])
+        conn.execute(insert(Student), [
+            {"id": i, "id_number": f"E{i:05d}", "email": f"e{i}@hms", "name": f"Student {i}"}
+            for i in range(1, 101)
+        ])
+        conn.execute(insert(Medicine), [{"id": i, "name": f"MED {i}"} for i in range(1, 21)])
+        conn.execute(insert(Prescription), [{
+            "id": i, "student_id": (i % 100) + 1, "nurse_id": 1,
+            "status": "Medication Prescribed by Doctor" if i % 3 else "Initiated by Nurse",
+            "created_at": base + timedelta(minutes=i),
+        } for i in range(1, rows + 1)])
+        conn.execute(insert(PrescriptionMedicine), [{
+            "prescription_id": i, "medicine_id": (i % 20) + 1, "quantity_prescribed": 1,
+        } for i in range(1, rows + 1)])
+        conn.execute(insert(LabReport), [{
+            "prescription_id": i, "test_name": "CBC", "status": "Lab Test Requested",
+            "created_at": base + timedelta(minutes=i),
+        } for i in range(1, rows + 1)])
+        conn.exec_driver_sql("ANALYZE")
+
+
+def explain(conn, statement, parameters) -> str:
+    if conn.dialect.name == "sqlite":
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+        return "\n".join(str(r[-1]) for r in rows)
+    rows = conn.exec_driver_sql(f"EXPLAIN {statement}", parameters).fetchall()
+    return "\n".join(r[0] for r in rows)
+
+
+def main() -> int:
+    engine = make_engine()
+    Session = sessionmaker(bind=engine)
+
+    captured = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            captured.append((statement, parameters))
+
+    failures = 0
+    with engine.connect() as conn:
+        if conn.dialect.name == "postgresql":
+            conn.exec_driver_sql("SET enable_seqscan = off")
+
+        for name, (call, index) in HOT_QUERIES.items():
+            captured.clear()
+            event.listen(engine, "after_cursor_execute", record)
+            db = Session()
+            try:
+                call(db)
+            finally:
+                db.close()
+                event.remove(engine, "after_cursor_execute", record)
+
+            plans = [explain(conn, s, p) for s, p in captured]
+            used = any(index in plan for plan in plans)
+            failures += not used
+            print(f"[{'ok' if used else 'MISSING'}] {name}: {index}")
+            if not used:
+                for plan in plans:
+                    print("    " + plan.replace("\n", "\n    "))
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
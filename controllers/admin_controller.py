@@ -3,7 +3,7 @@ from sqlalchemy.orm import Session
 from database import get_db
 from services import admin_service
 from schemas.admin_schemas import (
-    DashboardStats,
+    DashboardStats, DbPoolStats, HttpStats,
     UserOut, StudentOut, MedicineOut, PrescriptionOut,
     MedicineAnalytics, AnomalyAlert
 )
@@ -13,6 +13,12 @@ from typing import List
 def get_dashboard_stats(db: Session = Depends(get_db)) -> DashboardStats:
     return admin_service.get_dashboard_stats(db)
 
+def get_db_pool_stats() -> DbPoolStats:
+    return admin_service.get_db_pool_stats()
+
+def get_http_stats() -> HttpStats:
+    return admin_service.get_http_stats()
+
 def get_users(db: Session = Depends(get_db)) -> List[UserOut]:
     return admin_service.get_all_users(db)
 
@@ -66,3 +72,6 @@ def get_medicine_analytics(db: Session = Depends(get_db)):
 
 def get_anomalies(db: Session = Depends(get_db)):
     return admin_service.get_anomalies(db)
+
+def get_anomaly_summary(db: Session = Depends(get_db)):
+    return admin_service.get_anomaly_summary(db)
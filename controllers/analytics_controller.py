@@ -1,76 +1,106 @@
+import os
+from contextlib import contextmanager
 from sqlalchemy.orm import Session
-from sqlalchemy import func, extract, and_, case
-from datetime import datetime, timedelta, date
+from sqlalchemy import func, case
+from datetime import timedelta, date
 
+from database import get_read_db
 from models.medicine import Medicine
-from models.prescription import Prescription
-from models.prescription_medicine import PrescriptionMedicine
+from models.daily_stats import DailyMedicineStats
+from services.rollup_service import rollup_today
+from utils.cache import SnapshotCache
+from utils.dates import add_months, month_key, month_start
+
+# Responses are cached per `days`; after ANALYTICS_CACHE_TTL seconds the old
+# response is still served for ANALYTICS_STALE_TTL more while it is rebuilt.
+# Keys are (days, day), so at most ANALYTICS_CACHE_SIZE are kept (LRU): earlier
+# days' entries are evicted instead of piling up for the life of the worker
+ANALYTICS_CACHE_TTL = float(os.getenv("ANALYTICS_CACHE_TTL", "60"))
+ANALYTICS_STALE_TTL = float(os.getenv("ANALYTICS_STALE_TTL", "300"))
+ANALYTICS_CACHE_SIZE = int(os.getenv("ANALYTICS_CACHE_SIZE", "64"))
+analytics_cache = SnapshotCache(
+    ttl=ANALYTICS_CACHE_TTL, stale_ttl=ANALYTICS_STALE_TTL, max_entries=ANALYTICS_CACHE_SIZE
+)
+
+analytics_session = contextmanager(get_read_db("analytics"))
 
 
 def get_inventory_analytics(db: Session, days: int):
     """
     Computes pharmacy inventory analytics, fully compatible with frontend.
+    Served from analytics_cache (stale-while-revalidate per `days`).
     """
+    key = (days, rollup_today())
+    return analytics_cache.get_or_compute(
+        key,
+        lambda: compute_inventory_analytics(db, days),
+        refresh=lambda: _refresh_inventory_analytics(days),
+    )
 
-    # Time window for filtering prescribing activity
-    now = datetime.now()
-    start_date = now - timedelta(days=days)
 
-    # -------------------------------------------------
-    # 1) TOTAL MEDICINES IN INVENTORY
-    # -------------------------------------------------
-    total_medicines = (
-        db.query(func.count(Medicine.id))
-        .scalar()
-        or 0
-    )
+def _refresh_inventory_analytics(days: int):
+    # Background rebuild: the request's session is closed by then, use our own
+    with analytics_session() as db:
+        return compute_inventory_analytics(db, days)
+
+
+def compute_inventory_analytics(db: Session, days: int):
+    """Three statements: stock per category, top prescribed, monthly usage."""
+
+    # Time window for filtering prescribing activity (whole days, as the rollup is daily)
+    today = rollup_today()
+    start_day = today - timedelta(days=days)
 
     # -------------------------------------------------
-    # 2) LOW STOCK COUNT (<= 10 units)
+    # 1) STOCK LEVELS BY CATEGORY + INVENTORY COUNTERS
+    #    (one pass over medicines; totals are summed from the category rows)
     # -------------------------------------------------
-    low_stock_count = (
-        db.query(func.count(Medicine.id))
-        .filter(Medicine.quantity <= 10)
-        .scalar()
-        or 0
+    low_stock = case((Medicine.quantity <= 10, 1), else_=0)
+    expiring = case(
+        (Medicine.expiry_date <= (today + timedelta(days=90)), 1),  # NULL expiry -> else
+        else_=0,
     )
 
-    # -------------------------------------------------
-    # 3) EXPIRING SOON (within next 90 days)
-    # -------------------------------------------------
-    expiring_soon = (
-        db.query(func.count(Medicine.id))
-        .filter(
-            Medicine.expiry_date != None,
-            Medicine.expiry_date <= (date.today() + timedelta(days=90))
+    category_rows = (
+        db.query(
+            Medicine.category,
+            func.count(Medicine.id).label("medicines"),
+            func.sum(Medicine.quantity).label("total"),
+            func.sum(low_stock).label("low"),
+            func.sum(expiring).label("expiring"),
+            func.sum(Medicine.quantity * func.coalesce(Medicine.cost, 0)).label("value"),
         )
-        .scalar()
-        or 0
+        .group_by(Medicine.category)
+        .all()
     )
 
-    # -------------------------------------------------
-    # 4) TOTAL VALUE OF INVENTORY (quantity × cost)
-    # -------------------------------------------------
-    total_value = (
-        db.query(func.sum(Medicine.quantity * func.coalesce(Medicine.cost, 0)))
-        .scalar()
-        or 0
-    )
+    total_medicines = sum(row.medicines for row in category_rows)
+    low_stock_count = sum(int(row.low or 0) for row in category_rows)
+    expiring_soon = sum(int(row.expiring or 0) for row in category_rows)
+    total_value = sum(row.value or 0 for row in category_rows)
+
+    stock_levels = [
+        {
+            "category": row.category or "Uncategorized",
+            "total": int(row.total or 0),
+            "low": int(row.low or 0)
+        }
+        for row in category_rows
+    ]
 
     # -------------------------------------------------
-    # 5) MOST PRESCRIBED MEDICINES (last X days)
+    # 2) MOST PRESCRIBED MEDICINES (last X days, from the daily rollup)
     # -------------------------------------------------
     most_prescribed_raw = (
         db.query(
             Medicine.name,
             Medicine.category,
-            func.sum(PrescriptionMedicine.quantity_prescribed).label("count")
+            func.sum(DailyMedicineStats.quantity_prescribed).label("count")
         )
-        .join(PrescriptionMedicine, PrescriptionMedicine.medicine_id == Medicine.id)
-        .join(Prescription, Prescription.id == PrescriptionMedicine.prescription_id)
-        .filter(Prescription.created_at >= start_date)
+        .join(DailyMedicineStats, DailyMedicineStats.medicine_id == Medicine.id)
+        .filter(DailyMedicineStats.day >= start_day)
         .group_by(Medicine.id)
-        .order_by(func.sum(PrescriptionMedicine.quantity_prescribed).desc())
+        .order_by(func.sum(DailyMedicineStats.quantity_prescribed).desc())
         .limit(5)
         .all()
     )
@@ -85,67 +115,35 @@ def get_inventory_analytics(db: Session, days: int):
     ]
 
     # -------------------------------------------------
-    # 6) STOCK LEVELS BY CATEGORY
+    # 3) MONTHLY USAGE (Issued last 5 months)
+    #    daily rollup rows grouped by month
     # -------------------------------------------------
-    stock_levels_raw = (
-        db.query(
-            Medicine.category,
-            func.sum(Medicine.quantity).label("total"),
-            func.sum(
-                case(
-                    (Medicine.quantity <= 10, 1),
-                    else_=0
-                )
-            ).label("low")
+    months = [add_months(today, -i) for i in range(4, -1, -1)]  # oldest -> newest
+    month = month_start(DailyMedicineStats.day)
+
+    issued_by_month = {
+        month_key(row.month): int(row.issued or 0)
+        for row in (
+            db.query(
+                month.label("month"),
+                func.sum(DailyMedicineStats.quantity_prescribed).label("issued"),
+            )
+            .filter(DailyMedicineStats.day >= months[0], DailyMedicineStats.day < add_months(today, 1))
+            .group_by(month)
+            .all()
         )
-        .group_by(Medicine.category)
-        .all()
-    )
+    }
 
-    stock_levels = [
+    monthly_usage = [
         {
-            "category": row[0] or "Uncategorized",
-            "total": int(row[1] or 0),
-            "low": int(row[2] or 0)
+            "month": first_day.strftime("%b"),
+            "issued": issued_by_month.get(month_key(first_day), 0),
+            # No receiving tracking in DB → always 0
+            "received": 0
         }
-        for row in stock_levels_raw
+        for first_day in months
     ]
 
-    # -------------------------------------------------
-    # 7) MONTHLY USAGE (Issued last 5 months)
-    # -------------------------------------------------
-    monthly_usage = []
-    today = date.today()
-
-    for i in range(5):
-        # Compute month & year
-        month = (today.month - i - 1) % 12 + 1
-        year = today.year - ((today.month - i - 1) // 12)
-
-        # ISSUED count
-        issued = (
-            db.query(func.sum(PrescriptionMedicine.quantity_prescribed))
-            .join(Prescription, Prescription.id == PrescriptionMedicine.prescription_id)
-            .filter(
-                extract("month", Prescription.created_at) == month,
-                extract("year", Prescription.created_at) == year
-            )
-            .scalar()
-            or 0
-        )
-
-        # No receiving tracking in DB → always 0
-        received = 0
-
-        monthly_usage.append({
-            "month": date(year, month, 1).strftime("%b"),
-            "issued": int(issued),
-            "received": received
-        })
-
-    # Oldest → newest order
-    monthly_usage.reverse()
-
     # -------------------------------------------------
     # FINAL RESPONSE
     # -------------------------------------------------
@@ -158,4 +156,4 @@ def get_inventory_analytics(db: Session, days: int):
         "mostPrescribed": most_prescribed,
         "stockLevels": stock_levels,
         "monthlyUsage": monthly_usage,
-    }
\ No newline at end of file
+    }
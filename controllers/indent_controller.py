@@ -1,13 +1,14 @@
 import os
 import cloudinary.uploader
 from datetime import datetime
-import openpyxl
 from io import BytesIO
 from models.indent import Indent
 from models.medicine import Medicine
 from sqlalchemy.orm import Session
-import requests
 from cloudinary.utils import cloudinary_url
+import httpx
+
+from utils import http_client
 
 
 def upload_indent(file, uploaded_by: str, db: Session):
@@ -63,14 +64,20 @@ def upload_indent(file, uploaded_by: str, db: Session):
 
 def approve_indent(indent_id: int, approved_by: str, db: Session):
     """Approve indent: update medicine stock and mark indent as approved."""
+    import openpyxl
+
     indent = db.query(Indent).filter(Indent.id == indent_id).first()
     if not indent:
         return {"error": "Indent not found"}
     if indent.status != "pending":
         return {"error": "Indent already processed"}
 
-    response = requests.get(indent.file_url)
-    workbook = openpyxl.load_workbook(BytesIO(response.content))
+    try:
+        sheet_file = http_client.download(indent.file_url).file
+    except (httpx.HTTPError, http_client.ResponseTooLarge) as e:
+        return {"error": f"Could not fetch indent file: {e}"}
+    with sheet_file:
+        workbook = openpyxl.load_workbook(sheet_file)
     sheet = workbook.active
 
     inserted, updated = 0, 0
@@ -1,12 +1,12 @@
 from sqlalchemy.orm import Session
 from models.inventory import InventoryItem
 from schemas.inventory_schema import InventoryItemCreate, InventoryItemUpdate
-import pandas as pd
 import io
-from openpyxl import Workbook
 
 
 def get_inventory_excel(db: Session):
+    import pandas as pd
+
     items = db.query(InventoryItem).all()
     data = [
         {"ID": i.id, "Name": i.name, "Category": i.category, "Quantity": i.quantity}
@@ -21,6 +21,8 @@ def get_inventory_excel(db: Session):
     return output
 
 def bulk_upload_inventory(db: Session, file):
+    import pandas as pd
+
     df = pd.read_excel(file)
     count = 0
 
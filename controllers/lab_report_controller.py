@@ -1,12 +1,14 @@
 # controllers/lab_report_controller.py
 from io import BytesIO
-import requests
 import mimetypes
+import os
+import tempfile
 from urllib.parse import urlparse
 from sqlalchemy.orm import Session, selectinload
 from sqlalchemy import or_, and_, cast, String, case, desc
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import BinaryIO, Optional, Dict, Any, List
 from io import BytesIO
 
 from models.prescription import Prescription
@@ -14,7 +16,12 @@ from models.lab_report import LabReport
 from models.prescription_medicine import PrescriptionMedicine
 from models.student import Student
 from schemas.lab_report_schema import LabReportCreate, LabReportUpdate
-from utils.pdf_utils import create_cover_pdf, merge_pdfs, embed_image_into_pdf
+from services import pdf_render_service
+from utils import http_client
+from utils.file_cache import DiskLRUCache, close_and_remove, iter_file
+from utils.search import text_search
+from utils.pagination import count_rows, decode_cursor, fetch_page, keyset_after, next_cursor_for
+from utils.zip_stream import iter_zip
 
 from fastapi import HTTPException
 
@@ -25,77 +32,69 @@ def get_lab_reports(
     limit: int = 10,
     search: Optional[str] = None,
     status: Optional[str] = None,
-    date: Optional[str] = None
+    date: Optional[str] = None,
+    cursor: Optional[str] = None,
+    count: str = "exact"
 ) -> Dict[str, Any]:
     """
     Fetch paginated lab reports with related prescription and student.
     Filters: search (student name / student id / test name / other_name), status, date.
     Orders: 'Lab Test Requested' first, then newest first by created_at.
+    Paging: `cursor` (keyset on priority, created_at, id) or the legacy `page`.
+    Total: `count` = exact | estimate | none (see utils.pagination.count_rows).
     """
 
     if page < 1:
         page = 1
     skip = (page - 1) * limit
 
-    # Use selectinload for efficient eager loading
     query = (
         db.query(LabReport)
-        .options(
-            selectinload(LabReport.prescription).selectinload(Prescription.student)
-        )
         .outerjoin(LabReport.prescription)   # outerjoin to allow prescription/student to be null-safe
         .outerjoin(Prescription.student)     # outerjoin student, because prescription may be for "others"
     )
 
-    filters = []
-
-    # --- Search filter ---
-    if search and search.strip():
-        s = search.strip()
-        search_term = f"%{s}%"
-        # include student.name, student.id_number, test_name, prescription.other_name
-        filters.append(
-            or_(
-                Student.name.ilike(search_term),
-                Student.id_number.ilike(search_term),
-                LabReport.test_name.ilike(search_term),
-                Prescription.other_name.ilike(search_term),
-                cast(LabReport.id, String).ilike(search_term),
-            )
-        )
-
-    # --- Status filter ---
-    if status and status.lower() != "all":
-        filters.append(LabReport.status.ilike(f"%{status}%"))
-
-    # --- Date filter ---
-    if date:
-        try:
-            date_obj = datetime.strptime(date, "%Y-%m-%d").date()
-            filters.append(
-                and_(
-                    LabReport.created_at >= datetime.combine(date_obj, datetime.min.time()),
-                    LabReport.created_at < datetime.combine(date_obj, datetime.max.time()),
-                )
-            )
-        except ValueError:
-            pass  # ignore invalid date
+    filters = _lab_report_filters(search, status, date)
 
     if filters:
         query = query.filter(and_(*filters))
 
     # --- PRIORITY SORT: "Lab Test Requested" first, then newest ---
-    priority_order = case(
-        (LabReport.status == "Lab Test Requested", 1),
-        else_=2
-    ).label("priority")
+    priority_order = _priority_order()
+
+    # --- Total (bare filtered query, before eager loads) ---
+    total = count_rows(query, LabReport.id, count)
 
-    query = query.order_by(priority_order, desc(LabReport.created_at))
+    # Use selectinload for efficient eager loading
+    query = (
+        query.options(
+            selectinload(LabReport.prescription).selectinload(Prescription.student)
+        )
+        .order_by(priority_order, desc(LabReport.created_at), desc(LabReport.id))
+    )
 
     # --- Pagination ---
-    total = query.count()
-    reports = query.offset(skip).limit(limit).all()
-    has_more = (page * limit) < total
+    if cursor:
+        c = decode_cursor(cursor, ("priority", "created_at", "id"))
+        query = query.filter(
+            keyset_after([
+                (priority_order, c["priority"], "asc"),
+                (LabReport.created_at, c["created_at"], "desc"),
+                (LabReport.id, c["id"], "desc"),
+            ])
+        )
+    else:
+        query = query.offset(skip)
+
+    reports, has_more = fetch_page(query, limit)
+
+    next_cursor = next_cursor_for(
+        reports,
+        has_more,
+        priority=lambda r: 1 if r.status == "Lab Test Requested" else 2,
+        created_at=lambda r: r.created_at,
+        id=lambda r: r.id,
+    )
 
     # --- Serialization ---
     data = []
@@ -145,10 +144,58 @@ def get_lab_reports(
         "page": page,
         "limit": limit,
         "total": total,
-        "has_more": has_more
+        "has_more": has_more,
+        "next_cursor": next_cursor
     }
 
 
+def _lab_report_filters(search: Optional[str], status: Optional[str], date: Optional[str]) -> list:
+    """WHERE clauses for the list filters (needs the prescription / student outer joins)."""
+    filters = []
+
+    # --- Search filter ---
+    if search and search.strip():
+        s = search.strip()
+        # include student.name, student.id_number, test_name, prescription.other_name
+        # (trigram-indexed); a numeric term also matches the report id exactly
+        filters.append(
+            text_search(
+                s,
+                Student.name,
+                Student.id_number,
+                LabReport.test_name,
+                Prescription.other_name,
+                id_column=LabReport.id,
+            )
+        )
+
+    # --- Status filter ---
+    if status and status.lower() != "all":
+        filters.append(LabReport.status.ilike(f"%{status}%"))
+
+    # --- Date filter ---
+    if date:
+        try:
+            date_obj = datetime.strptime(date, "%Y-%m-%d").date()
+            filters.append(
+                and_(
+                    LabReport.created_at >= datetime.combine(date_obj, datetime.min.time()),
+                    LabReport.created_at < datetime.combine(date_obj, datetime.max.time()),
+                )
+            )
+        except ValueError:
+            pass  # ignore invalid date
+
+    return filters
+
+
+def _priority_order():
+    return case(
+        (LabReport.status == "Lab Test Requested", 1),
+        else_=2
+    )
+
+
 def get_lab_report(db: Session, report_id: int):
     """
     Fetch a single lab report by ID along with its related prescription, student, and
@@ -254,6 +301,8 @@ def update_lab_report(db: Session, report_id: int, lab_report: LabReportUpdate):
         db.commit()
         db.refresh(pres)
 
+    invalidate_lab_report_pdf(report_id)
+
     # Return serialized updated lab report
     return get_lab_report(db, report_id)
 
@@ -265,31 +314,233 @@ def delete_lab_report(db: Session, report_id: int):
 
     db.delete(db_report)
     db.commit()
+    invalidate_lab_report_pdf(report_id)
     return {"ok": True}
 
 
-def generate_lab_report_pdf(db: Session, lab_report) -> (BytesIO, str): # type: ignore
-    # ... keep your existing implementation here (no changes)
-    cover_buf = create_cover_pdf(lab_report)
-    result_url = getattr(lab_report, "result_url", None)
-    if not result_url:
-        filename = f"LabReport_{lab_report.id}.pdf"
-        return cover_buf, filename
+# ===================================================================
+# PDF DOWNLOAD
+# ===================================================================
+
+# Generated PDFs, shared by the workers on this host (see utils/file_cache.py)
+LAB_PDF_CACHE_DIR = os.getenv("LAB_PDF_CACHE_DIR", os.path.join(tempfile.gettempdir(), "hms-lab-report-pdfs"))
+LAB_PDF_CACHE_MAX_MB = int(os.getenv("LAB_PDF_CACHE_MAX_MB", "512"))
+lab_pdf_cache = DiskLRUCache(LAB_PDF_CACHE_DIR, LAB_PDF_CACHE_MAX_MB * 1024 * 1024, suffix=".pdf")
+
+
+def _pdf_cache_prefix(report_id: int) -> str:
+    return f"labreport-{report_id}-"
+
+
+def _pdf_cache_key(lab_report) -> str:
+    # Any edit bumps updated_at, so an edited report never matches an old entry
+    updated = lab_report.updated_at.isoformat() if lab_report.updated_at else ""
+    return f"{lab_report.id}|{updated}|{lab_report.result_url or ''}"
+
+
+def invalidate_lab_report_pdf(report_id: int):
+    lab_pdf_cache.discard_prefix(_pdf_cache_prefix(report_id))
+
+
+def get_lab_report_pdf(db: Session, lab_report) -> (BinaryIO, str, list): # type: ignore
+    """
+    The report's PDF from the cache, building (and caching) it on a miss.
+    A PDF whose attachment could not be fetched is returned but not cached.
+    Returns (open file, filename, temp paths to delete once the file is closed).
+    """
+    filename = f"LabReport_{lab_report.id}.pdf"
+    prefix, key = _pdf_cache_prefix(lab_report.id), _pdf_cache_key(lab_report)
+
+    cached = lab_pdf_cache.open(prefix, key)
+    if cached:
+        return cached, filename, []
+
+    output_path, complete = _render_lab_report_pdf(lab_report)
+    if complete:
+        return lab_pdf_cache.put_file(prefix, key, output_path), filename, []
+
+    return open(output_path, "rb"), filename, [output_path]
+
+
+def _render_lab_report_pdf(lab_report, batch: bool = False) -> (str, bool): # type: ignore
+    """
+    Cover page plus the attached PDF / image, built in the PDF render pool into a
+    temp file of the cache directory. Returns (path, complete); complete is False
+    when the attachment could not be fetched (the PDF then only has the cover).
+    batch: wait for a batch render slot instead of failing fast (exports).
+    """
+    output_path = lab_pdf_cache.temp_path()
+    attachment_path, content_type, complete = None, "", True
     try:
-        resp = requests.get(result_url, stream=True, timeout=15)
-        resp.raise_for_status()
+        if lab_report.result_url:
+            attachment_path, content_type = _fetch_attachment(lab_report.result_url)
+            complete = attachment_path is not None
+        render = pdf_render_service.render_batch if batch else pdf_render_service.render
+        render(
+            pdf_render_service.lab_report_job,
+            pdf_render_service.lab_report_snapshot(lab_report),
+            attachment_path,
+            content_type,
+            output_path,
+        )
     except Exception:
-        return cover_buf, f"LabReport_{lab_report.id}.pdf"
-    content_type = resp.headers.get("Content-Type")
+        os.remove(output_path)
+        raise
+    finally:
+        if attachment_path:
+            os.remove(attachment_path)
+    return output_path, complete
+
+
+def _fetch_attachment(result_url: str) -> (Optional[str], str): # type: ignore
+    """Download result_url to a named temp file (the render process reads it); (None, "") on failure."""
+    fd, path = tempfile.mkstemp(suffix=".attachment")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            attachment = http_client.download(result_url, file=f)
+    except Exception:
+        os.remove(path)
+        return None, ""
+
+    content_type = attachment.content_type
     if not content_type:
         ext = urlparse(result_url).path.split('.')[-1]
         content_type = mimetypes.guess_type(f"file.{ext}")[0] or ""
-    if "pdf" in (content_type or "").lower():
-        remote_pdf_bytes = BytesIO(resp.content)
-        merged = merge_pdfs([cover_buf, remote_pdf_bytes])
-        return merged, f"LabReport_{lab_report.id}.pdf"
-    if (content_type or "").startswith("image/"):
-        image_bytes = BytesIO(resp.content)
-        combined = embed_image_into_pdf(cover_buf, image_bytes)
-        return combined, f"LabReport_{lab_report.id}.pdf"
-    return cover_buf, f"LabReport_{lab_report.id}.pdf"
+    return path, content_type
+
+
+# ===================================================================
+# BATCH EXPORT
+# ===================================================================
+
+LAB_EXPORT_MAX_REPORTS = int(os.getenv("LAB_EXPORT_MAX_REPORTS", "100"))
+# Export renders wait for one of the PDF_RENDER_BATCH_MAX batch slots (shared by all
+# exports of this worker) and never take the slots kept for single downloads, so
+# more reports at once than that would only queue for a slot.
+LAB_EXPORT_CONCURRENCY = min(
+    int(os.getenv("LAB_EXPORT_CONCURRENCY", "4")), pdf_render_service.PDF_RENDER_BATCH_MAX
+)
+
+
+def get_export_reports(
+    db: Session,
+    ids: Optional[List[int]] = None,
+    search: Optional[str] = None,
+    status: Optional[str] = None,
+    date: Optional[str] = None,
+) -> list:
+    """
+    Reports to export: the given ids (in that order), or everything matching the
+    get_lab_reports filters (in list order). 404 if none, 400 for an empty id list or
+    past LAB_EXPORT_MAX_REPORTS.
+    """
+    if ids is not None and not ids:
+        raise HTTPException(status_code=400, detail="ids must not be empty")
+
+    query = (
+        db.query(LabReport)
+        .outerjoin(LabReport.prescription)
+        .outerjoin(Prescription.student)
+        .options(selectinload(LabReport.prescription).selectinload(Prescription.student))
+    )
+    if ids is not None:
+        query = query.filter(LabReport.id.in_(ids))
+    else:
+        filters = _lab_report_filters(search, status, date)
+        if filters:
+            query = query.filter(and_(*filters))
+
+    reports = (
+        query.order_by(_priority_order(), desc(LabReport.created_at), desc(LabReport.id))
+        .limit(LAB_EXPORT_MAX_REPORTS + 1)
+        .all()
+    )
+    if ids is not None:
+        position = {report_id: i for i, report_id in enumerate(ids)}
+        reports.sort(key=lambda r: position[r.id])
+    if not reports:
+        raise HTTPException(status_code=404, detail="No lab reports match the export")
+    if len(reports) > LAB_EXPORT_MAX_REPORTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Export is limited to {LAB_EXPORT_MAX_REPORTS} reports; narrow the selection",
+        )
+    return reports
+
+
+def export_lab_reports(db: Session, reports: list, fmt: str = "pdf"):
+    """
+    Every report's PDF, as one merged PDF or a ZIP of PDF files.
+    Returns (chunk iterator, media type, filename, open file or None, temp paths);
+    close the file and delete the paths once the response is done (close_and_remove).
+
+    Up to LAB_EXPORT_CONCURRENCY reports are built at once, so attachments are
+    fetched concurrently and covers rendered in parallel in the PDF render pool;
+    reports already in the PDF cache are not rebuilt. Everything stays in files:
+    the merge runs in the render pool and the ZIP is written as it is streamed.
+    """
+    snapshots = [pdf_render_service.lab_report_snapshot(r) for r in reports]
+    paths = _export_pdf_paths(snapshots)
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+    if fmt == "zip":
+        members = [(f"LabReport_{snap.id}.pdf", path) for snap, path in zip(snapshots, paths)]
+        chunks = _remove_after(iter_zip(members), paths)
+        return chunks, "application/zip", f"LabReports_{stamp}.zip", None, paths
+
+    output_path = lab_pdf_cache.temp_path()
+    try:
+        pdf_render_service.render_batch(pdf_render_service.merge_job, paths, output_path)
+    except Exception:
+        close_and_remove(None, [output_path])
+        raise
+    finally:
+        close_and_remove(None, paths)   # inputs are closed once the merge is done
+    merged = open(output_path, "rb")
+    return (
+        iter_file(merged, remove=[output_path]), "application/pdf", f"LabReports_{stamp}.pdf",
+        merged, [output_path],
+    )
+
+
+def _export_pdf_paths(snapshots: list) -> List[str]:
+    """Build (or take from the cache) each report's PDF concurrently; private temp paths, in order."""
+    with ThreadPoolExecutor(max_workers=max(LAB_EXPORT_CONCURRENCY, 1)) as executor:
+        futures = [executor.submit(_lab_report_pdf_path, snap) for snap in snapshots]
+
+    paths, error = [], None
+    for future in futures:
+        try:
+            paths.append(future.result())
+        except Exception as e:
+            error = error or e
+    if error:
+        close_and_remove(None, paths)
+        raise error
+    return paths
+
+
+def _lab_report_pdf_path(lab_report) -> str:
+    """
+    Path of a private copy of the report's PDF (a temp file in the cache directory,
+    removed by the caller), built and cached like get_lab_report_pdf on a miss.
+    """
+    prefix, key = _pdf_cache_prefix(lab_report.id), _pdf_cache_key(lab_report)
+
+    cached = lab_pdf_cache.checkout(prefix, key)
+    if cached:
+        return cached
+
+    output_path, complete = _render_lab_report_pdf(lab_report, batch=True)
+    if complete:
+        private = lab_pdf_cache.link_temp(output_path)
+        lab_pdf_cache.put_file(prefix, key, output_path).close()
+        return private
+    return output_path
+
+
+def _remove_after(chunks, paths: List[str]):
+    try:
+        yield from chunks
+    finally:
+        close_and_remove(None, paths)
@@ -2,7 +2,7 @@ from io import BytesIO
 from sqlalchemy.orm import Session
 from models.medicine import Medicine
 from schemas.medicine_schema import MedicineCreate, MedicineUpdate
-import openpyxl
+from utils.search import contains
 
 # ========== CRUD ==========
 
@@ -10,6 +10,45 @@ def get_medicines(db: Session, skip: int = 0, limit: int = 100):
     return db.query(Medicine).offset(skip).limit(limit).all()
 
 
+def list_medicines(
+    db: Session,
+    page: int = 1,
+    limit: int = 20,
+    search: str = "",
+    brand: str = "",
+    category: str = "",
+):
+    if page < 1:
+        page = 1
+
+    skip = (page - 1) * limit
+
+    query = db.query(Medicine)
+
+    # Search filter
+    if search.strip():
+        query = query.filter(contains(Medicine.name, search.strip()))
+
+    # Brand filter
+    if brand.strip() and brand.lower().strip() != "all":
+        query = query.filter(Medicine.brand.ilike(f"%{brand.strip()}%"))
+
+    # Category filter (NEW)
+    if category.strip() and category.lower().strip() != "all":
+        query = query.filter(Medicine.category.ilike(f"%{category.strip()}%"))
+
+    total = query.count()
+    medicines = query.offset(skip).limit(limit).all()
+
+    return {
+        "data": medicines,
+        "page": page,
+        "limit": limit,
+        "total": total,
+        "has_more": (page * limit) < total,
+    }
+
+
 def get_medicine(db: Session, medicine_id: int):
     return db.query(Medicine).filter(Medicine.id == medicine_id).first()
 
@@ -48,6 +87,8 @@ def delete_medicine(db: Session, medicine_id: int):
 # ========== DOWNLOAD INVENTORY ==========
 
 def get_medicine_inventory_excel(db: Session) -> BytesIO:
+    import openpyxl
+
     medicines = db.query(Medicine).all()
 
     wb = openpyxl.Workbook()
@@ -82,6 +123,8 @@ def get_medicine_inventory_excel(db: Session) -> BytesIO:
 # ========== IMPORT MEDICINE EXCEL ==========
 
 def import_medicine_inventory_excel(file, db: Session):
+    import openpyxl
+
     try:
         workbook = openpyxl.load_workbook(BytesIO(file.file.read()))
         sheet = workbook.active
@@ -140,6 +183,7 @@ def import_medicine_inventory_excel(file, db: Session):
 # ========== INDENT APPROVAL ==========
 
 def approve_indent_excel(file, db: Session):
+    import openpyxl
     from models.medicine import Medicine
 
     contents = file.file.read()
@@ -1,7 +1,11 @@
+import os
+import tempfile
+from typing import BinaryIO, Optional
+
 import cloudinary
 from fastapi import HTTPException, UploadFile
-from sqlalchemy import asc, desc, cast, String, func, case, or_, and_
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import asc, desc, cast, String, func, case, or_, and_, select
+from sqlalchemy.orm import Session, joinedload, selectinload
 from datetime import datetime
 
 from models.student import Student
@@ -11,12 +15,24 @@ from models.prescription_medicine import PrescriptionMedicine
 from models.medicine import Medicine
 
 from schemas.prescription_schema import PrescriptionCreate, PrescriptionUpdate
+from services import pdf_render_service
+from services.rollup_service import day_bounds, rollup_today
+from utils.cache import SnapshotCache
+from utils.search import text_search
+from utils.pagination import count_rows, decode_cursor, fetch_page, keyset_after, next_cursor_for
 
 
 # ===================================================================
 # HELPER: SAFE STUDENT SERIALIZER (handles student=None)
 # ===================================================================
 
+def student_match(search: str):
+    """Prescriptions whose student's name / id number matches (trigram-indexed on students)."""
+    return Prescription.student_id.in_(
+        select(Student.id).where(text_search(search, Student.name, Student.id_number))
+    )
+
+
 def serialize_student(student):
     if not student:
         return None
@@ -29,6 +45,58 @@ def serialize_student(student):
     }
 
 
+# ===================================================================
+# HELPER: LIST LOADING (page first, then batched IN-queries)
+# ===================================================================
+
+def list_load_options():
+    """
+    Loader options for list pages.
+    The page query selects only the LIMITed prescription rows; students, medicines
+    (with Medicine) and lab reports are then fetched with one IN-query each, instead
+    of joinedload building prescriptions x medicines x lab_reports before LIMIT.
+    """
+    return (
+        selectinload(Prescription.student),
+        selectinload(Prescription.medicines).selectinload(PrescriptionMedicine.medicine),
+        selectinload(Prescription.lab_reports),
+    )
+
+
+# ===================================================================
+# HELPER: KEYSET PAGINATION ON (created_at, id)
+# ===================================================================
+
+def paginate_prescriptions(query, page: int, limit: int, cursor: str = None):
+    """
+    Returns (rows, has_more, next_cursor).
+    With a cursor, seeks straight past the last seen (created_at, id) so every page
+    costs the same; without one, falls back to offset paging for existing clients.
+    has_more comes from reading one extra row, so it does not depend on the total.
+    The query must already be ordered by created_at DESC, id DESC.
+    """
+    if cursor:
+        c = decode_cursor(cursor, ("created_at", "id"))
+        query = query.filter(
+            keyset_after([
+                (Prescription.created_at, c["created_at"], "desc"),
+                (Prescription.id, c["id"], "desc"),
+            ])
+        )
+    else:
+        query = query.offset((page - 1) * limit)
+
+    rows, has_more = fetch_page(query, limit)
+
+    next_cursor = next_cursor_for(
+        rows,
+        has_more,
+        created_at=lambda p: p.created_at,
+        id=lambda p: p.id,
+    )
+    return rows, has_more, next_cursor
+
+
 # ===================================================================
 # GET PRESCRIPTIONS (LIST)
 # ===================================================================
@@ -40,37 +108,24 @@ def get_prescriptions(
     search: str = None,
     status: str = None,
     date: str = None,
+    cursor: str = None,
+    count: str = "exact",
 ):
-    skip = (page - 1) * limit
-
-    query = (
-        db.query(Prescription)
-        .options(
-            joinedload(Prescription.student),
-            joinedload(Prescription.medicines).joinedload(PrescriptionMedicine.medicine),
-            joinedload(Prescription.lab_reports),
-        )
-        .order_by(desc(Prescription.created_at))
-    )
+    query = db.query(Prescription)
 
     filters = []
 
     # --- Search ---
     if search and search.strip():
         search = search.strip()
-        term = f"%{search}%"
 
         filters.append(
             or_(
-                cast(Prescription.id, String).ilike(term),
-                Prescription.other_name.ilike(term),
-                Student.name.ilike(term),
-                Student.id_number.ilike(term),
+                text_search(search, Prescription.other_name, id_column=Prescription.id),
+                student_match(search),
             )
         )
 
-        query = query.outerjoin(Student)
-
     # --- Status ---
     if status and status.lower() != "all":
         filters.append(Prescription.status.ilike(f"%{status}%"))
@@ -91,9 +146,14 @@ def get_prescriptions(
     if filters:
         query = query.filter(and_(*filters))
 
-    total = query.count()
-    rows = query.offset(skip).limit(limit).all()
-    has_more = (page * limit) < total
+    # Count on the bare filtered query, before eager loads are attached
+    total = count_rows(query, Prescription.id, count)
+
+    query = (
+        query.options(*list_load_options())
+        .order_by(desc(Prescription.created_at), desc(Prescription.id))
+    )
+    rows, has_more, next_cursor = paginate_prescriptions(query, page, limit, cursor)
 
     result = []
     for pres in rows:
@@ -144,6 +204,7 @@ def get_prescriptions(
         "limit": limit,
         "total": total,
         "has_more": has_more,
+        "next_cursor": next_cursor,
     }
 
 
@@ -234,38 +295,30 @@ def get_prescriptions_by_studentid(
     limit: int = 10,
     search: str = "",
     status: str = "all",
-    date: str = None
+    date: str = None,
+    cursor: str = None,
+    count: str = "exact",
 ):
     if page < 1:
         page = 1
 
-    skip = (page - 1) * limit
-
-    q = (
-        db.query(Prescription)
-        .filter(Prescription.student_id == student_id)
-        .options(
-            joinedload(Prescription.student),
-            joinedload(Prescription.medicines).joinedload(PrescriptionMedicine.medicine),
-            joinedload(Prescription.lab_reports),
-        )
-    )
+    q = db.query(Prescription).filter(Prescription.student_id == student_id)
 
     filters = []
 
     # --- Search ---
     if search.strip():
         s = search.strip()
-        search_term = f"%{s}%"
 
         filters.append(
-            or_(
-                cast(Prescription.id, String).ilike(search_term),
-                Prescription.nurse_notes.ilike(search_term),
-                Prescription.doctor_notes.ilike(search_term),
-                Prescription.other_name.ilike(search_term),
-                Prescription.patient_type.ilike(search_term),
-                Prescription.visit_type.ilike(search_term),
+            text_search(
+                s,
+                Prescription.nurse_notes,
+                Prescription.doctor_notes,
+                Prescription.other_name,
+                Prescription.patient_type,
+                Prescription.visit_type,
+                id_column=Prescription.id,
             )
         )
 
@@ -290,18 +343,15 @@ def get_prescriptions_by_studentid(
     if filters:
         q = q.filter(and_(*filters))
 
-    # Total count
-    total = q.count()
+    # Total count (bare filtered query, no eager loads)
+    total = count_rows(q, Prescription.id, count)
 
     # Sorting + pagination
-    rows = (
-        q.order_by(desc(Prescription.created_at))
-        .offset(skip)
-        .limit(limit)
-        .all()
+    q = (
+        q.options(*list_load_options())
+        .order_by(desc(Prescription.created_at), desc(Prescription.id))
     )
-
-    has_more = (page * limit) < total
+    rows, has_more, next_cursor = paginate_prescriptions(q, page, limit, cursor)
 
     # ---- Serialize ----
     result = []
@@ -357,6 +407,7 @@ def get_prescriptions_by_studentid(
         "limit": limit,
         "total": total,
         "has_more": has_more,
+        "next_cursor": next_cursor,
     }
 
 
@@ -540,6 +591,13 @@ from models.prescription import Prescription
 from models.prescription_medicine import PrescriptionMedicine
 from models.lab_report import LabReport
 
+# Statuses of the pharmacist queue (ready for medicine issuance)
+PRESCRIBED_QUEUE_STATUSES = [
+    "Medication Prescribed by Doctor",
+    "Medication Prescribed and Lab Test Requested",
+    "Medication Prescribed by Nurse (Emergency)",
+]
+
 
 def get_prescribed_queue(
     db: Session,
@@ -548,46 +606,27 @@ def get_prescribed_queue(
     search: str = None,
     date: str = None,
     status: str = None,          # <-- important (avoid 422)
+    cursor: str = None,
+    count: str = "exact",
 ):
     """
     Fetch prescriptions where status is:
       - Medication Prescribed by Doctor
       - Medication Prescribed and Lab Test Requested
       - Medication Prescribed by Nurse (Emergency)
-    Supports pagination, search, date filter.
+    Supports pagination (page or keyset cursor), search, date filter.
     """
 
-    skip = (page - 1) * limit
-
-    VALID_STATUSES = [
-        "Medication Prescribed by Doctor",
-        "Medication Prescribed and Lab Test Requested",
-        "Medication Prescribed by Nurse (Emergency)",
-    ]
-
-    q = (
-        db.query(Prescription)
-        .options(
-            joinedload(Prescription.student),
-            joinedload(Prescription.medicines).joinedload(PrescriptionMedicine.medicine),
-            joinedload(Prescription.lab_reports),
-        )
-        .filter(Prescription.status.in_(VALID_STATUSES))
-    )
+    q = db.query(Prescription).filter(Prescription.status.in_(PRESCRIBED_QUEUE_STATUSES))
 
     # --- SEARCH ---
     if search and search.strip():
-        s = f"%{search.lower().strip()}%"
-        q = (
-            q.outerjoin(Student)
-             .filter(
-                 or_(
-                     cast(Prescription.id, String).ilike(s),
-                     Prescription.other_name.ilike(s),
-                     Student.name.ilike(s),
-                     Student.id_number.ilike(s),
-                 )
-             )
+        s = search.strip()
+        q = q.filter(
+            or_(
+                text_search(s, Prescription.other_name, id_column=Prescription.id),
+                student_match(s),
+            )
         )
 
     # --- DATE FILTER ---
@@ -603,16 +642,13 @@ def get_prescribed_queue(
         except:
             pass
 
-    total = q.count()
+    total = count_rows(q, Prescription.id, count)
 
-    rows = (
-        q.order_by(desc(Prescription.created_at))
-        .offset(skip)
-        .limit(limit)
-        .all()
+    q = (
+        q.options(*list_load_options())
+        .order_by(desc(Prescription.created_at), desc(Prescription.id))
     )
-
-    has_more = (page * limit) < total
+    rows, has_more, next_cursor = paginate_prescriptions(q, page, limit, cursor)
 
     # --- SERIALIZE ---
     data = []
@@ -675,4 +711,118 @@ def get_prescribed_queue(
         "limit": limit,
         "total": total,
         "has_more": has_more,
+        "next_cursor": next_cursor,
     }
+
+
+# ===================================================================
+# PRESCRIPTION PDF
+# ===================================================================
+
+# Rendered PDFs per worker, keyed on the prescription's version (see _pdf_cache_key)
+PRESCRIPTION_PDF_CACHE_SIZE = int(os.getenv("PRESCRIPTION_PDF_CACHE_SIZE", "256"))
+PRESCRIPTION_PDF_CACHE_TTL = float(os.getenv("PRESCRIPTION_PDF_CACHE_TTL", "3600"))
+prescription_pdf_cache = SnapshotCache(ttl=PRESCRIPTION_PDF_CACHE_TTL, max_entries=PRESCRIPTION_PDF_CACHE_SIZE)
+
+PRESCRIPTION_PRINT_MAX = int(os.getenv("PRESCRIPTION_PRINT_MAX", "500"))
+
+PRINT_QUEUES = {
+    "all": None,
+    "pending": ["Initiated by Nurse"],
+    "prescribed": PRESCRIBED_QUEUE_STATUSES,
+}
+
+
+def _pdf_cache_key(pres) -> tuple:
+    """
+    (id, updated_at) plus the versions of what the PDF prints from other tables:
+    issuing medicines or editing a lab result does not always touch the prescription row.
+    """
+    return (
+        pres.id,
+        pres.updated_at,
+        pres.student.updated_at if pres.student else None,
+        tuple(
+            (med.id, med.updated_at, med.medicine.updated_at if med.medicine else None)
+            for med in pres.medicines
+        ),
+        tuple((lab.id, lab.updated_at) for lab in pres.lab_reports),
+    )
+
+
+def get_prescription_pdf(db: Session, prescription_id: int) -> (bytes, str): # type: ignore
+    """The full prescription as PDF bytes, rendered once per version of the prescription."""
+    pres = (
+        db.query(Prescription)
+        .options(
+            joinedload(Prescription.student),
+            joinedload(Prescription.medicines).joinedload(PrescriptionMedicine.medicine),
+            joinedload(Prescription.lab_reports),
+        )
+        .filter(Prescription.id == prescription_id)
+        .first()
+    )
+    if not pres:
+        raise HTTPException(status_code=404, detail="Prescription not found")
+
+    snapshot = pdf_render_service.prescription_snapshot(pres)
+    pdf_bytes = prescription_pdf_cache.get_or_compute(
+        _pdf_cache_key(pres),
+        # reportlab runs in the PDF render pool, not on this worker
+        lambda: pdf_render_service.render(pdf_render_service.prescription_job, snapshot),
+    )
+    return pdf_bytes, f"prescription_{prescription_id}.pdf"
+
+
+def print_prescriptions(db: Session, date: Optional[str] = None, queue: str = "all") -> (BinaryIO, str, str): # type: ignore
+    """
+    Every prescription of a day and / or queue ("pending", "prescribed") as one
+    multi-page PDF, oldest first (the pharmacy's end-of-day paper trail).
+    Without a date, queue "all" means today. Days are ROLLUP_TIMEZONE calendar days.
+    Returns (open file, filename, temp path).
+    """
+    if queue not in PRINT_QUEUES:
+        raise HTTPException(status_code=400, detail=f"Unknown queue: {queue}")
+    if not date and queue == "all":
+        date = rollup_today().strftime("%Y-%m-%d")
+
+    q = db.query(Prescription)
+    if PRINT_QUEUES[queue]:
+        q = q.filter(Prescription.status.in_(PRINT_QUEUES[queue]))
+    if date:
+        try:
+            d = datetime.strptime(date, "%Y-%m-%d").date()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="date must be YYYY-MM-DD")
+        start, end = day_bounds(d)
+        q = q.filter(Prescription.created_at >= start, Prescription.created_at < end)
+
+    rows = (
+        q.options(*list_load_options())
+        .order_by(asc(Prescription.created_at), asc(Prescription.id))
+        .limit(PRESCRIPTION_PRINT_MAX + 1)
+        .all()
+    )
+    if not rows:
+        raise HTTPException(status_code=404, detail="No prescriptions to print")
+    if len(rows) > PRESCRIPTION_PRINT_MAX:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Printing is limited to {PRESCRIPTION_PRINT_MAX} prescriptions; narrow the selection",
+        )
+
+    name = "_".join(part for part in ("prescriptions", date, queue if queue != "all" else None) if part)
+    fd, output_path = tempfile.mkstemp(suffix=".pdf")
+    os.close(fd)
+    try:
+        pdf_render_service.render(
+            pdf_render_service.prescriptions_job,
+            [pdf_render_service.prescription_snapshot(pres) for pres in rows],
+            output_path,
+            name,
+        )
+    except Exception:
+        os.remove(output_path)
+        raise
+    # deleted by the caller after the file is closed (close_and_remove)
+    return open(output_path, "rb"), f"{name}.pdf", output_path
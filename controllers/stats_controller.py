@@ -1,19 +1,21 @@
 from sqlalchemy.orm import Session
 from models.prescription import Prescription
 from models.lab_report import LabReport
+from models.daily_stats import DailyPrescriptionStats, DailyLabTestStats
 from sqlalchemy import func
 from datetime import datetime, timedelta, date
+from services.rollup_service import rollup_today
 
 def get_hospital_stats(db: Session):
-    today = date.today()
+    today = rollup_today()
 
-    # Total patients visited today (based on prescriptions created today)
+    # Total patients visited today (based on prescriptions created today), from the daily rollup
     total_patients_today = (
-        db.query(func.count(Prescription.id))
-        .filter(func.date(Prescription.created_at) == today)
+        db.query(func.coalesce(func.sum(DailyPrescriptionStats.prescriptions), 0))
+        .filter(DailyPrescriptionStats.day == today)
         .scalar()
     )
-    total_prescriptions = db.query(Prescription).count()
+    total_prescriptions = db.query(func.coalesce(func.sum(DailyPrescriptionStats.prescriptions), 0)).scalar()
     pending_prescriptions = db.query(Prescription).filter(Prescription.status == "Initiated by Nurse").count()
     # completed_prescriptions = db.query(Prescription).filter(Prescription.status == "completed").count()
     lab_reports_pending = db.query(LabReport).filter(LabReport.status == "Lab Test Requested").count()
@@ -44,8 +46,8 @@ def get_lab_tech_stats(db: Session):
         LabReport.updated_at >= datetime.combine(today, datetime.min.time())
     ).count()
 
-    # Total tests
-    total_tests = db.query(LabReport).count()
+    # Total tests (daily rollup: one row per day and test name)
+    total_tests = db.query(func.coalesce(func.sum(DailyLabTestStats.requested), 0)).scalar()
 
     # Urgent tests (older than 24 hours and still pending)
     urgent_tests = db.query(LabReport).filter(
@@ -1,17 +1,134 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+from threading import Lock
 import os
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_engine(DATABASE_URL,connect_args={"sslmode": "require"})
+# Connection pool (size workers so that workers x (size + overflow) stays under
+# Postgres max_connections)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+# Optional read replica for GET-only endpoints (see get_read_db)
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL")
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "10"))
+REPLICA_CHECK_INTERVAL = float(os.getenv("REPLICA_CHECK_INTERVAL", "5"))
+# An unreachable replica fails the in-request lag probe after this long, not the OS TCP timeout
+REPLICA_CONNECT_TIMEOUT = int(os.getenv("REPLICA_CONNECT_TIMEOUT", "3"))
+
+# Per-router read policy: "replica" (use it when healthy) or "primary".
+# e.g. DB_READ_ROUTING="prescriptions=primary,analytics=replica"
+DB_READ_POLICY = os.getenv("DB_READ_POLICY", "replica")
+DB_READ_ROUTING = dict(
+    item.strip().split("=", 1)
+    for item in os.getenv("DB_READ_ROUTING", "").split(",")
+    if "=" in item
+)
+
+
+class PoolStats:
+    """Running totals of how long requests waited for a pooled connection."""
+
+    def __init__(self):
+        self._lock = Lock()
+        self.waits = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.timeouts = 0
+
+    def record(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            self.waits += 1
+            self.total_wait += seconds
+            self.max_wait = max(self.max_wait, seconds)
+            if timed_out:
+                self.timeouts += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "checkouts": self.waits,
+                "avg_wait_ms": round(self.total_wait / self.waits * 1000, 3) if self.waits else 0.0,
+                "max_wait_ms": round(self.max_wait * 1000, 3),
+                "timeouts": self.timeouts,
+            }
+
+
+pool_stats = PoolStats()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records the time each checkout spends waiting for a free connection."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except PoolTimeoutError:
+            pool_stats.record(time.perf_counter() - start, timed_out=True)
+            raise
+        pool_stats.record(time.perf_counter() - start)
+        return conn
+
+
+engine = create_engine(
+    DATABASE_URL,
+    connect_args={"sslmode": "require"},
+    poolclass=InstrumentedQueuePool,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_pre_ping=DB_POOL_PRE_PING,
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+replica_engine = create_engine(
+    DATABASE_REPLICA_URL,
+    connect_args={"sslmode": "require", "connect_timeout": REPLICA_CONNECT_TIMEOUT},
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_pre_ping=DB_POOL_PRE_PING,
+) if DATABASE_REPLICA_URL else None
+ReplicaSessionLocal = sessionmaker(
+    autocommit=False, autoflush=False, bind=replica_engine
+) if replica_engine else None
+
+
+def get_pool_status() -> dict:
+    """Live pool occupancy plus checkout wait statistics for the primary engine."""
+    pool = engine.pool
+    return {
+        "pool_size": pool.size(),
+        "max_overflow": DB_MAX_OVERFLOW,
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": max(pool.overflow(), 0),
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pre_ping": DB_POOL_PRE_PING,
+        **pool_stats.snapshot(),
+        "replica_configured": replica_engine is not None,
+        "replica_healthy": replica_health.healthy if replica_engine else None,
+        "replica_lag_seconds": replica_health.lag if replica_engine else None,
+    }
+
 # Dependency for FastAPI
 def get_db():
     db = SessionLocal()
@@ -19,3 +136,151 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# ===================================================================
+# READ REPLICA HEALTH
+# ===================================================================
+
+# Seconds the replica is behind the primary; 0 when it has replayed everything it
+# received (an idle primary would otherwise look like growing lag)
+REPLICA_LAG_SQL = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+
+class ReplicaHealth:
+    """Last replica lag probe, refreshed at most every REPLICA_CHECK_INTERVAL seconds."""
+
+    def __init__(self):
+        self._lock = Lock()
+        self.checked_at = 0.0
+        self.healthy = False
+        self.lag = None
+
+    def claim_check(self) -> bool:
+        """True for the one caller that should run the next probe."""
+        with self._lock:
+            now = time.monotonic()
+            if now - self.checked_at < REPLICA_CHECK_INTERVAL:
+                return False
+            self.checked_at = now
+            return True
+
+    def update(self, lag):
+        """lag=None means the replica could not be reached."""
+        with self._lock:
+            self.lag = float(lag) if lag is not None else None
+            self.healthy = lag is not None and float(lag) <= REPLICA_MAX_LAG_SECONDS
+
+
+replica_health = ReplicaHealth()
+
+
+def read_policy(router: str) -> str:
+    return DB_READ_ROUTING.get(router, DB_READ_POLICY)
+
+
+def replica_is_usable() -> bool:
+    if replica_engine is None:
+        return False
+    if replica_health.claim_check():
+        try:
+            with replica_engine.connect() as conn:
+                replica_health.update(conn.execute(REPLICA_LAG_SQL).scalar())
+        except Exception:
+            replica_health.update(None)
+    return replica_health.healthy
+
+
+def get_read_db(router: str):
+    """
+    Dependency factory for read-only endpoints of `router`.
+    Yields a replica session when the router's policy is "replica" and the replica is
+    reachable and within REPLICA_MAX_LAG_SECONDS; otherwise a primary session.
+    """
+    def dependency():
+        use_replica = read_policy(router) == "replica" and replica_is_usable()
+        db = (ReplicaSessionLocal if use_replica else SessionLocal)()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    return dependency
+
+
+# ===================================================================
+# ASYNC ENGINE (asyncpg) FOR READ-HEAVY ENDPOINTS
+# ===================================================================
+
+def to_async_url(url: str) -> str:
+    """postgresql[+psycopg2]:// -> postgresql+asyncpg:// (sslmode is passed as connect_args instead)."""
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "postgresql":
+        parsed = parsed.set(drivername="postgresql+asyncpg").difference_update_query(["sslmode"])
+    elif parsed.get_backend_name() == "sqlite":
+        parsed = parsed.set(drivername="sqlite+aiosqlite")
+    return parsed.render_as_string(hide_password=False)
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or (to_async_url(DATABASE_URL) if DATABASE_URL else None)
+ASYNC_REPLICA_URL = to_async_url(DATABASE_REPLICA_URL) if DATABASE_REPLICA_URL else None
+
+# url -> (engine, sessionmaker); created on first use so scripts that only need
+# the sync engine don't import asyncpg
+_async_engines = {}
+
+
+def _async_sessionmaker_for(url: str):
+    if url not in _async_engines:
+        connect_args = {"ssl": "require"} if url.startswith("postgresql") else {}
+        if url == ASYNC_REPLICA_URL and connect_args:
+            connect_args["timeout"] = REPLICA_CONNECT_TIMEOUT   # asyncpg connect timeout
+        async_engine = create_async_engine(
+            url,
+            connect_args=connect_args,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_pre_ping=DB_POOL_PRE_PING,
+        )
+        _async_engines[url] = (
+            async_engine,
+            async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False),
+        )
+    return _async_engines[url][1]
+
+
+# Async dependency for FastAPI (read paths)
+async def get_async_db():
+    async with _async_sessionmaker_for(ASYNC_DATABASE_URL)() as db:
+        yield db
+
+
+async def async_replica_is_usable() -> bool:
+    if ASYNC_REPLICA_URL is None:
+        return False
+    if replica_health.claim_check():
+        try:
+            async with _async_sessionmaker_for(ASYNC_REPLICA_URL)() as db:
+                replica_health.update((await db.execute(REPLICA_LAG_SQL)).scalar())
+        except Exception:
+            replica_health.update(None)
+    return replica_health.healthy
+
+
+def get_async_read_db(router: str):
+    """Async counterpart of get_read_db: replica when allowed and healthy, else primary."""
+    async def dependency():
+        use_replica = read_policy(router) == "replica" and await async_replica_is_usable()
+        url = ASYNC_REPLICA_URL if use_replica else ASYNC_DATABASE_URL
+        async with _async_sessionmaker_for(url)() as db:
+            yield db
+
+    return dependency
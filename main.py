@@ -1,7 +1,9 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from routes import ai_routes, analytics_routes, anamoly_routes, auth_routes, staff_profile_router, stats_routes, student_routes, lab_report_routes, medicine_routes, prescription_medicine_routes, prescription_routes, inventory_routes, user_routes, admin_router, indent_router
-from database import Base, engine
 
 from models.student import Student
 from models.user import User
@@ -10,12 +12,32 @@ from models.medicine import Medicine
 from models.lab_report import LabReport
 from models.prescription_medicine import PrescriptionMedicine
 from models.inventory import InventoryItem
+from models.daily_stats import DailyPrescriptionStats, DailyMedicineStats, DailyLabTestStats
+from models.anomaly import AnomalyFinding, AnomalyScanState
+from models.ai_job import AiJob
+from services import rollup_service  # keeps the daily rollups current on every write
+from services import anomaly_service
+from services import transcription_service, ai_job_service, pdf_render_service
+from utils import http_client
+
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Background anomaly scan (ANOMALY_SCAN_INTERVAL=0 disables it, e.g. when run by cron)
+    scanner = None
+    if anomaly_service.ANOMALY_SCAN_INTERVAL > 0:
+        scanner = asyncio.create_task(anomaly_service.run_scheduler())
+    yield
+    if scanner:
+        scanner.cancel()
+    await ai_job_service.shutdown()
+    await transcription_service.aclose()
+    http_client.close()
+    pdf_render_service.shutdown()
 
-# Create tables
-Base.metadata.create_all(bind=engine)
 
-app = FastAPI()
+# Tables are created by migrations (`alembic upgrade head`), not at startup
+app = FastAPI(lifespan=lifespan)
 
 # Add CORS middleware
 app.add_middleware(
@@ -0,0 +1,67 @@
+# migrations/env.py
+from logging.config import fileConfig
+
+from alembic import context
+
+from database import Base, engine
+
+# Import every model so Base.metadata knows all tables
+from models.student import Student
+from models.user import User
+from models.staff_profile import StaffProfile
+from models.prescription import Prescription
+from models.medicine import Medicine
+from models.lab_report import LabReport
+from models.prescription_medicine import PrescriptionMedicine
+from models.inventory import InventoryItem
+from models.indent import Indent
+from models.daily_stats import DailyPrescriptionStats, DailyMedicineStats, DailyLabTestStats
+from models.anomaly import AnomalyFinding, AnomalyScanState
+from models.ai_job import AiJob
+
+config = context.config
+
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+
+def include_object(obj, name, type_, reflected, compare_to):
+    """Trigram indexes (migration 0003) live only in migrations; don't autogenerate drops for them."""
+    if type_ == "index" and reflected and compare_to is None and name.endswith("_trgm"):
+        return False
+    return True
+
+
+def run_migrations_offline():
+    """Emit SQL to stdout instead of running it (alembic upgrade head --sql)."""
+    context.configure(
+        url=engine.url.render_as_string(hide_password=False),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        include_object=include_object,
+        dialect_opts={"paramstyle": "named"},
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    """Run against the same engine the app uses (same URL and connect_args)."""
+    with engine.connect() as connection:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            include_object=include_object,
+        )
+
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
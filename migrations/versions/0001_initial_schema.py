@@ -0,0 +1,163 @@
+"""initial schema
+
+Tables as they were created by Base.metadata.create_all before migrations existed.
+Databases created that way should run `alembic stamp 0001` once, then upgrade.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+USER_ROLES = (
+    "admin", "doctor", "nurse", "pharmacist", "lab_technician", "store_keeper", "student",
+)
+
+
+def upgrade():
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("username", sa.String(), nullable=False),
+        sa.Column("email", sa.String(), nullable=False, unique=True),
+        sa.Column("hashed_password", sa.String(), nullable=False),
+        sa.Column("role", sa.Enum(*USER_ROLES, name="userrole"), nullable=False),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_username", "users", ["username"], unique=True)
+
+    op.create_table(
+        "staff_profiles",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False, unique=True),
+        sa.Column("name", sa.String(255), nullable=False),
+        sa.Column("email", sa.String(255), nullable=False, unique=True),
+        sa.Column("phone", sa.String(20), nullable=True),
+        sa.Column("employeeid", sa.String(50), nullable=True, unique=True),
+        sa.Column("department", sa.String(100), nullable=True),
+        sa.Column("position", sa.String(100), nullable=True),
+        sa.Column("qualification", sa.String(255), nullable=True),
+        sa.Column("experience", sa.String(50), nullable=True),
+        sa.Column("joindate", sa.Date(), nullable=True),
+        sa.Column("address", sa.String(255), nullable=True),
+        sa.Column("licensenumber", sa.String(100), nullable=True),
+    )
+    op.create_index("ix_staff_profiles_id", "staff_profiles", ["id"])
+
+    op.create_table(
+        "students",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("id_number", sa.String(), nullable=False),
+        sa.Column("email", sa.String(), nullable=False, unique=True),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("branch", sa.String(), nullable=True),
+        sa.Column("section", sa.String(), nullable=True),
+    )
+    op.create_index("ix_students_id", "students", ["id"])
+    op.create_index("ix_students_id_number", "students", ["id_number"], unique=True)
+
+    op.create_table(
+        "medicines",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("brand", sa.String(), nullable=True),
+        sa.Column("quantity", sa.Integer(), nullable=True),
+        sa.Column("cost", sa.Float(), nullable=True),
+        sa.Column("tax", sa.Float(), nullable=True),
+        sa.Column("total_cost", sa.Float(), nullable=True),
+        sa.Column("category", sa.String(), nullable=True),
+        sa.Column("expiry_date", sa.Date(), nullable=True),
+    )
+    op.create_index("ix_medicines_id", "medicines", ["id"])
+
+    op.create_table(
+        "inventory_items",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(255), nullable=False),
+        sa.Column("category", sa.String(100), nullable=False),
+        sa.Column("quantity", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_inventory_items_id", "inventory_items", ["id"])
+
+    op.create_table(
+        "indents",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("file_name", sa.String(), nullable=False),
+        sa.Column("file_url", sa.String(), nullable=False),
+        sa.Column("uploaded_by", sa.String(), nullable=False),
+        sa.Column("status", sa.String(), nullable=True),
+        sa.Column("uploaded_at", sa.DateTime(), nullable=True),
+        sa.Column("approved_by", sa.String(), nullable=True),
+        sa.Column("approved_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_indents_id", "indents", ["id"])
+
+    op.create_table(
+        "prescriptions",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("student_id", sa.Integer(), sa.ForeignKey("students.id"), nullable=True),
+        sa.Column("other_name", sa.String(255), nullable=True),
+        sa.Column("nurse_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("doctor_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=True),
+        sa.Column("nurse_notes", sa.Text(), nullable=True),
+        sa.Column("doctor_notes", sa.Text(), nullable=True),
+        sa.Column("nurse_image_url", sa.String(255), nullable=True),
+        sa.Column("doctor_image_url", sa.String(255), nullable=True),
+        sa.Column("audio_url", sa.String(255), nullable=True),
+        sa.Column("ai_summary", sa.Text(), nullable=True),
+        sa.Column("weight", sa.String(20), nullable=True),
+        sa.Column("bp", sa.String(20), nullable=True),
+        sa.Column("temperature", sa.String(20), nullable=True),
+        sa.Column("age", sa.Integer(), nullable=True),
+        sa.Column("patient_type", sa.String(20), nullable=True),
+        sa.Column("visit_type", sa.String(20), nullable=True),
+        sa.Column("status", sa.String(50), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_prescriptions_id", "prescriptions", ["id"])
+
+    op.create_table(
+        "lab_reports",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("prescription_id", sa.Integer(), sa.ForeignKey("prescriptions.id"), nullable=False),
+        sa.Column("test_name", sa.String(100), nullable=False),
+        sa.Column("status", sa.String(50), nullable=True),
+        sa.Column("result", sa.Text(), nullable=True),
+        sa.Column("result_url", sa.String(255), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_lab_reports_id", "lab_reports", ["id"])
+
+    op.create_table(
+        "prescription_medicines",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("prescription_id", sa.Integer(), sa.ForeignKey("prescriptions.id"), nullable=False),
+        sa.Column("medicine_id", sa.Integer(), sa.ForeignKey("medicines.id"), nullable=False),
+        sa.Column("quantity_prescribed", sa.Integer(), nullable=False),
+        sa.Column("quantity_issued", sa.Integer(), nullable=True),
+    )
+    op.create_index("ix_prescription_medicines_id", "prescription_medicines", ["id"])
+
+
+def downgrade():
+    op.drop_table("prescription_medicines")
+    op.drop_table("lab_reports")
+    op.drop_table("prescriptions")
+    op.drop_table("indents")
+    op.drop_table("inventory_items")
+    op.drop_table("medicines")
+    op.drop_table("students")
+    op.drop_table("staff_profiles")
+    op.drop_table("users")
+    sa.Enum(name="userrole").drop(op.get_bind(), checkfirst=True)
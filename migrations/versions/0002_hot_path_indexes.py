@@ -0,0 +1,43 @@
+"""composite indexes for queue filters, sorts and joins
+
+- prescriptions: (created_at, id) for the newest-first list and its keyset cursor,
+  (status, created_at) for the pharmacist / doctor queues,
+  (student_id, created_at) for a student's history
+- lab_reports: prescription_id for the join back, created_at for the list sort,
+  (status, created_at) / (status, updated_at) for the lab queue and lab-tech stats
+- prescription_medicines: prescription_id and medicine_id for the joins
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_prescriptions_created_at_id", "prescriptions", ["created_at", "id"]),
+    ("ix_prescriptions_status_created_at", "prescriptions", ["status", "created_at"]),
+    ("ix_prescriptions_student_id_created_at", "prescriptions", ["student_id", "created_at"]),
+    ("ix_lab_reports_prescription_id", "lab_reports", ["prescription_id"]),
+    ("ix_lab_reports_created_at", "lab_reports", ["created_at"]),
+    ("ix_lab_reports_status_created_at", "lab_reports", ["status", "created_at"]),
+    ("ix_lab_reports_status_updated_at", "lab_reports", ["status", "updated_at"]),
+    ("ix_prescription_medicines_prescription_id", "prescription_medicines", ["prescription_id"]),
+    ("ix_prescription_medicines_medicine_id", "prescription_medicines", ["medicine_id"]),
+]
+
+
+def upgrade():
+    # if_not_exists: create_all may already have built these from the model definitions
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, if_not_exists=True)
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
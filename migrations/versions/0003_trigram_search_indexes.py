@@ -0,0 +1,53 @@
+"""pg_trgm GIN indexes for substring search
+
+ILIKE '%term%' cannot use a B-tree index; a trigram GIN index can. These back the
+search boxes over patient names / id numbers, other_name, medicine names and lab
+test names (utils/search.py).
+
+PostgreSQL only: on other databases (SQLite in local runs) this revision is a no-op
+and the same ILIKE predicates run as scans. The indexes are not declared on the
+models, so migrations/env.py keeps autogenerate from dropping them.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+TRGM_INDEXES = [
+    ("ix_students_name_trgm", "students", "name"),
+    ("ix_students_id_number_trgm", "students", "id_number"),
+    ("ix_prescriptions_other_name_trgm", "prescriptions", "other_name"),
+    ("ix_medicines_name_trgm", "medicines", "name"),
+    ("ix_lab_reports_test_name_trgm", "lab_reports", "test_name"),
+]
+
+
+def upgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for name, table, column in TRGM_INDEXES:
+        op.create_index(
+            name,
+            table,
+            [column],
+            postgresql_using="gin",
+            postgresql_ops={column: "gin_trgm_ops"},
+            if_not_exists=True,
+        )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    for name, table, _ in reversed(TRGM_INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
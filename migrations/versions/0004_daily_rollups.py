@@ -0,0 +1,51 @@
+"""daily rollup tables for clinic activity
+
+- daily_prescription_stats: prescriptions per (day, visit_type, patient_type)
+- daily_medicine_stats: quantity prescribed / issued per (day, medicine_id)
+- daily_lab_test_stats: lab tests requested / completed per (day, test_name)
+
+Kept current by services/rollup_service.py. Populate them after upgrading with
+`python -m services.rollup_service backfill`.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "daily_prescription_stats",
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("visit_type", sa.String(20), primary_key=True),
+        sa.Column("patient_type", sa.String(20), primary_key=True),
+        sa.Column("prescriptions", sa.Integer(), nullable=False),
+    )
+    op.create_table(
+        "daily_medicine_stats",
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("medicine_id", sa.Integer(), primary_key=True),
+        sa.Column("quantity_prescribed", sa.Integer(), nullable=False),
+        sa.Column("quantity_issued", sa.Integer(), nullable=False),
+    )
+    op.create_table(
+        "daily_lab_test_stats",
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("test_name", sa.String(100), primary_key=True),
+        sa.Column("requested", sa.Integer(), nullable=False),
+        sa.Column("completed", sa.Integer(), nullable=False),
+    )
+
+
+def downgrade():
+    op.drop_table("daily_lab_test_stats")
+    op.drop_table("daily_medicine_stats")
+    op.drop_table("daily_prescription_stats")
@@ -0,0 +1,73 @@
+"""anomaly findings store and scan watermarks
+
+- anomaly_findings: persisted output of services/anomaly_service.py (open while
+  resolved_at is NULL)
+- anomaly_scan_state: single row with the last scan times (the next scan's watermark)
+- updated_at on medicines, students and prescription_medicines, and updated_at
+  indexes on prescriptions / lab_reports, so a scan only reads rows changed since
+  the previous one
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+WATERMARKED_TABLES = ["medicines", "students", "prescription_medicines"]
+
+
+def upgrade():
+    for table in WATERMARKED_TABLES:
+        # batch mode so SQLite (local runs) can add a column with a non-constant default
+        with op.batch_alter_table(table) as batch:
+            batch.add_column(
+                sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now())
+            )
+        op.create_index(f"ix_{table}_updated_at", table, ["updated_at"])
+
+    op.create_index("ix_prescriptions_updated_at", "prescriptions", ["updated_at"], if_not_exists=True)
+    op.create_index("ix_lab_reports_updated_at", "lab_reports", ["updated_at"], if_not_exists=True)
+
+    op.create_table(
+        "anomaly_findings",
+        sa.Column("id", sa.String(200), primary_key=True),
+        sa.Column("type", sa.String(50), nullable=False),
+        sa.Column("severity", sa.String(10), nullable=False),
+        sa.Column("message", sa.Text(), nullable=False),
+        sa.Column("details", sa.Text(), nullable=True),
+        sa.Column("first_seen", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("last_seen", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("resolved_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_anomaly_findings_type", "anomaly_findings", ["type"])
+    op.create_index("ix_anomaly_findings_resolved_at", "anomaly_findings", ["resolved_at"])
+
+    op.create_table(
+        "anomaly_scan_state",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("last_started_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("last_finished_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("last_full_scan_at", sa.DateTime(timezone=True), nullable=True),
+    )
+
+
+def downgrade():
+    op.drop_table("anomaly_scan_state")
+    op.drop_index("ix_anomaly_findings_resolved_at", table_name="anomaly_findings")
+    op.drop_index("ix_anomaly_findings_type", table_name="anomaly_findings")
+    op.drop_table("anomaly_findings")
+
+    op.drop_index("ix_lab_reports_updated_at", table_name="lab_reports", if_exists=True)
+    op.drop_index("ix_prescriptions_updated_at", table_name="prescriptions", if_exists=True)
+
+    for table in reversed(WATERMARKED_TABLES):
+        op.drop_index(f"ix_{table}_updated_at", table_name=table)
+        with op.batch_alter_table(table) as batch:
+            batch.drop_column("updated_at")
@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text
+from sqlalchemy.sql import func
+from database import Base
+
+
+class AiJob(Base):
+    """A background transcribe + summarize run (services/ai_job_service.py)."""
+    __tablename__ = "ai_jobs"
+
+    id = Column(String(32), primary_key=True)   # uuid4 hex
+    # queued -> uploading -> transcribing -> summarizing -> completed | failed
+    status = Column(String(20), nullable=False, default="queued")
+
+    # When set, the summary is written to this prescription's ai_summary on completion
+    prescription_id = Column(Integer, ForeignKey("prescriptions.id"), nullable=True)
+
+    transcribed_text = Column(Text, nullable=True)
+    summary = Column(Text, nullable=True)
+    error = Column(Text, nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    finished_at = Column(DateTime(timezone=True), nullable=True)
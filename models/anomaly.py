@@ -0,0 +1,26 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text
+from database import Base
+
+
+class AnomalyFinding(Base):
+    """One finding of services/anomaly_service.py; id is "<rule>:<entity key>"."""
+    __tablename__ = "anomaly_findings"
+
+    id = Column(String(200), primary_key=True)
+    type = Column(String(50), nullable=False, index=True)
+    severity = Column(String(10), nullable=False)
+    message = Column(Text, nullable=False)
+    details = Column(Text, nullable=True)
+    first_seen = Column(DateTime(timezone=True), nullable=False)
+    last_seen = Column(DateTime(timezone=True), nullable=False)
+    resolved_at = Column(DateTime(timezone=True), nullable=True, index=True)  # NULL = open
+
+
+class AnomalyScanState(Base):
+    """Single row (id=1): when the last scan ran, used as the next scan's watermark."""
+    __tablename__ = "anomaly_scan_state"
+
+    id = Column(Integer, primary_key=True)
+    last_started_at = Column(DateTime(timezone=True), nullable=True)
+    last_finished_at = Column(DateTime(timezone=True), nullable=True)
+    last_full_scan_at = Column(DateTime(timezone=True), nullable=True)
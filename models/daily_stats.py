@@ -0,0 +1,32 @@
+from sqlalchemy import Column, Integer, String, Date
+from database import Base
+
+
+# Day-keyed rollups of clinic activity, maintained by services/rollup_service.py.
+# "day" is the date the prescription / lab report was created.
+
+class DailyPrescriptionStats(Base):
+    __tablename__ = "daily_prescription_stats"
+
+    day = Column(Date, primary_key=True)
+    visit_type = Column(String(20), primary_key=True, default="")     # "" when not set
+    patient_type = Column(String(20), primary_key=True, default="")   # "" when not set
+    prescriptions = Column(Integer, nullable=False, default=0)
+
+
+class DailyMedicineStats(Base):
+    __tablename__ = "daily_medicine_stats"
+
+    day = Column(Date, primary_key=True)
+    medicine_id = Column(Integer, primary_key=True)
+    quantity_prescribed = Column(Integer, nullable=False, default=0)
+    quantity_issued = Column(Integer, nullable=False, default=0)
+
+
+class DailyLabTestStats(Base):
+    __tablename__ = "daily_lab_test_stats"
+
+    day = Column(Date, primary_key=True)
+    test_name = Column(String(100), primary_key=True)
+    requested = Column(Integer, nullable=False, default=0)
+    completed = Column(Integer, nullable=False, default=0)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from database import Base
@@ -7,7 +7,7 @@ class LabReport(Base):
     __tablename__ = "lab_reports"
 
     id = Column(Integer, primary_key=True, index=True)
-    prescription_id = Column(Integer, ForeignKey("prescriptions.id"), nullable=False)
+    prescription_id = Column(Integer, ForeignKey("prescriptions.id"), nullable=False, index=True)
     test_name = Column(String(100   ), nullable=False)
     status = Column(String(50), default="Lab Test Requested")
     result = Column(Text, nullable=True)  # can be a file path or S3 link
@@ -16,3 +16,11 @@ class LabReport(Base):
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     prescription = relationship("Prescription", back_populates="lab_reports")
+
+    # Lab queue / stats filter on status and sort or cut off by time
+    __table_args__ = (
+        Index("ix_lab_reports_created_at", "created_at"),
+        Index("ix_lab_reports_status_created_at", "status", "created_at"),
+        Index("ix_lab_reports_status_updated_at", "status", "updated_at"),
+        Index("ix_lab_reports_updated_at", "updated_at"),
+    )
@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, Float, Date
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime
+from sqlalchemy.sql import func
 from database import Base
 
 class Medicine(Base):
@@ -13,3 +14,5 @@ class Medicine(Base):
     total_cost = Column(Float, nullable=True)
     category = Column(String, nullable=True)
     expiry_date = Column(Date, nullable=True)
+    # Watermark for the incremental anomaly scan
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), index=True)
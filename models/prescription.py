@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from database import Base
@@ -46,3 +46,11 @@ class Prescription(Base):
     lab_reports = relationship("LabReport", back_populates="prescription")
 
     student = relationship("Student")
+
+    # Queue screens filter on status / student and sort newest first
+    __table_args__ = (
+        Index("ix_prescriptions_created_at_id", "created_at", "id"),
+        Index("ix_prescriptions_status_created_at", "status", "created_at"),
+        Index("ix_prescriptions_student_id_created_at", "student_id", "created_at"),
+        Index("ix_prescriptions_updated_at", "updated_at"),
+    )
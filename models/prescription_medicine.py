@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, ForeignKey
+from sqlalchemy import Column, Integer, ForeignKey, DateTime
+from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from database import Base
 
@@ -6,10 +7,12 @@ class PrescriptionMedicine(Base):
     __tablename__ = "prescription_medicines"
 
     id = Column(Integer, primary_key=True, index=True)
-    prescription_id = Column(Integer, ForeignKey("prescriptions.id"), nullable=False)
-    medicine_id = Column(Integer, ForeignKey("medicines.id"), nullable=False)
+    prescription_id = Column(Integer, ForeignKey("prescriptions.id"), nullable=False, index=True)
+    medicine_id = Column(Integer, ForeignKey("medicines.id"), nullable=False, index=True)
     quantity_prescribed = Column(Integer, nullable=False)
     quantity_issued = Column(Integer, nullable=True)  # set when pharmacist issues
+    # Watermark for the incremental anomaly scan
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), index=True)
 
     prescription = relationship("Prescription", back_populates="medicines")
     medicine = relationship("Medicine")
@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy.sql import func
 from database import Base
 
 class Student(Base):
@@ -10,3 +11,5 @@ class Student(Base):
     name = Column(String, nullable=False)
     branch = Column(String, nullable=True)
     section = Column(String, nullable=True)
+    # Watermark for the incremental anomaly scan
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), index=True)
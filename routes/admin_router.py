@@ -1,19 +1,31 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Response
 from sqlalchemy.orm import Session
-from database import get_db
+from database import get_db, get_read_db
 from controllers import admin_controller
 from schemas.admin_schemas import (
-    DashboardStats, UserOut, StudentOut, PrescriptionOut,
+    DashboardStats, DbPoolStats, HttpStats, UserOut, StudentOut, PrescriptionOut,
     MedicineOut, MedicineAnalytics, AnomalyAlert
 )
 from typing import List
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
 
+# Dashboard / analytics reads may be served from the read replica (DB_READ_ROUTING "admin")
+read_db = get_read_db("admin")
+
 @router.get("/dashboard-stats", response_model=DashboardStats)
-def dashboard_stats(db: Session = Depends(get_db)):
+def dashboard_stats(db: Session = Depends(read_db)):
     return admin_controller.get_dashboard_stats(db)
 
+@router.get("/db-pool", response_model=DbPoolStats)
+def db_pool_stats():
+    return admin_controller.get_db_pool_stats()
+
+@router.get("/http-stats", response_model=HttpStats)
+def http_stats():
+    """Outbound HTTP per host (this worker), slowest first."""
+    return admin_controller.get_http_stats()
+
 @router.get("/users", response_model=List[UserOut])
 def get_users(db: Session = Depends(get_db)):
     return admin_controller.get_users(db)
@@ -59,9 +71,17 @@ def delete_medicine(id: int, db: Session = Depends(get_db)):
     return admin_controller.delete_medicine(id, db)
 
 @router.get("/analytics/medicines", response_model=List[MedicineAnalytics])
-def get_medicine_analytics(db: Session = Depends(get_db)):
+def get_medicine_analytics(db: Session = Depends(read_db)):
     return admin_controller.get_medicine_analytics(db)
 
 @router.get("/anomalies", response_model=List[AnomalyAlert])
-def get_anomalies(db: Session = Depends(get_db)):
-    return admin_controller.get_anomalies(db)
+def get_anomalies(response: Response, db: Session = Depends(get_db)):
+    snapshot = admin_controller.get_anomalies(db)
+    # Freshness of the stored snapshot (the body stays a plain list)
+    if snapshot["generated_at"]:
+        response.headers["X-Anomalies-Generated-At"] = snapshot["generated_at"].isoformat()
+    return snapshot["anomalies"]
+
+@router.get("/anomalies/summary")
+def get_anomaly_summary(db: Session = Depends(get_db)):
+    return admin_controller.get_anomaly_summary(db)
@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
-from database import get_db
+from database import get_read_db
 from controllers.analytics_controller import get_inventory_analytics
 
 router = APIRouter(
@@ -8,10 +8,13 @@ router = APIRouter(
     tags=["Pharmacist Analytics"]
 )
 
+# Read-only; may be served from the read replica (DB_READ_ROUTING "analytics")
+read_db = get_read_db("analytics")
+
 @router.get("/medicines")
 def pharmacist_analytics(
     days: int = Query(30, ge=1, le=365),
-    db: Session = Depends(get_db)
+    db: Session = Depends(read_db)
 ):
     """
     Returns inventory analytics filtered by last X days.
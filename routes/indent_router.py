@@ -21,8 +21,8 @@ async def upload_indent(
 
 
 @router.post("/approve/{indent_id}")
-async def approve_indent(indent_id: int, approved_by: str = Form(...), db: Session = Depends(get_db)):
-    """Admin approves an indent and updates stock."""
+def approve_indent(indent_id: int, approved_by: str = Form(...), db: Session = Depends(get_db)):
+    """Admin approves an indent and updates stock (sync: it downloads the sheet and writes to the DB)."""
     result = ctrl.approve_indent(indent_id, approved_by, db)
     if "error" in result:
         raise HTTPException(status_code=400, detail=result["error"])
@@ -3,19 +3,22 @@ from click import File
 from fastapi import APIRouter, Depends, HTTPException, UploadFile
 from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from database import get_db
+from database import get_db, get_read_db
 from schemas.inventory_schema import InventoryItemCreate, InventoryItemUpdate, InventoryItemOut
 from controllers import inventory_controller
 
 router = APIRouter(prefix="/inventory", tags=["Inventory"])
 
+# Excel export may be served from the read replica (DB_READ_ROUTING "inventory")
+read_db = get_read_db("inventory")
+
 @router.post("/bulk-upload")
 async def bulk_upload_inventory(file: UploadFile = File(...), db: Session = Depends(get_db)):
     result = inventory_controller.bulk_upload_inventory(db, file.file)
     return result
 
 @router.get("/download")
-def download_inventory(db: Session = Depends(get_db)):
+def download_inventory(db: Session = Depends(read_db)):
     excel_buffer = inventory_controller.get_inventory_excel(db)
     return StreamingResponse(
         excel_buffer,
@@ -1,27 +1,56 @@
 from os import stat
 import cloudinary
-from reportlab.pdfgen import canvas
 from io import BytesIO
 from fastapi.responses import FileResponse, StreamingResponse
 from fastapi import APIRouter, Depends, Form, HTTPException, Query, UploadFile, status
+from starlette.background import BackgroundTask
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from models.lab_report import LabReport
-from database import get_db
+from database import get_async_read_db, get_db, get_read_db
 from controllers import lab_report_controller as ctrl
-from schemas.lab_report_schema import LabReportCreate, LabReportDetailedResponse, LabReportUpdate
+from utils.file_cache import close_and_remove, iter_file
+from schemas.lab_report_schema import LabReportCreate, LabReportDetailedResponse, LabReportExportRequest, LabReportUpdate
 
 router = APIRouter(prefix="/lab-reports", tags=["Lab Reports"])
 
+# GET lists and the batch export may be served from the read replica (DB_READ_ROUTING "lab_reports")
+read_db = get_async_read_db("lab_reports")
+sync_read_db = get_read_db("lab_reports")
+
 @router.get("/")
-def read_lab_reports(
+async def read_lab_reports(
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1, le=200),
     search: str = Query(None),
     status: str = Query("all"),
     date: str = Query(None),
-    db: Session = Depends(get_db)
+    cursor: str = Query(None),
+    count: str = Query("exact", pattern="^(exact|estimate|none)$"),
+    db: AsyncSession = Depends(read_db)
 ):
-    return ctrl.get_lab_reports(db, page=page, limit=limit, search=search, status=status, date=date)
+    return await db.run_sync(
+        ctrl.get_lab_reports, page=page, limit=limit, search=search, status=status, date=date, cursor=cursor, count=count
+    )
+
+@router.post("/export")
+def export_lab_reports(request: LabReportExportRequest, db: Session = Depends(sync_read_db)):
+    """
+    Many reports in one download: a merged PDF (format "pdf") or a ZIP with one
+    PDF per report (format "zip"). Select by `ids` or by the list filters.
+    """
+    reports = ctrl.get_export_reports(
+        db, ids=request.ids, search=request.search, status=request.status, date=request.date
+    )
+    chunks, media_type, filename, pdf_file, temp_paths = ctrl.export_lab_reports(db, reports, request.format)
+
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+        # also runs if the client leaves before the body is read
+        background=BackgroundTask(close_and_remove, pdf_file, temp_paths),
+    )
 
 @router.get("/{report_id}", response_model=LabReportDetailedResponse)
 def read_lab_report(report_id: int, db: Session = Depends(get_db)):
@@ -89,12 +118,13 @@ def download_lab_report(lab_report_id: int, db: Session = Depends(get_db)):
     if not lab_report:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Lab report not found")
 
-    # generate_lab_report_pdf returns (BytesIO, filename)
-    pdf_buffer, filename = ctrl.generate_lab_report_pdf(db, lab_report)
+    # repeated downloads stream the cached file; an uncached one is a temp file
+    pdf_file, filename, temp_paths = ctrl.get_lab_report_pdf(db, lab_report)
 
-    pdf_buffer.seek(0)
     return StreamingResponse(
-        pdf_buffer,
+        iter_file(pdf_file, remove=temp_paths),
         media_type="application/pdf",
-        headers={"Content-Disposition": f"attachment; filename={filename}"}
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+        # also runs if the client leaves before the body is read
+        background=BackgroundTask(close_and_remove, pdf_file, temp_paths),
     )
@@ -1,17 +1,22 @@
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
 from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from database import get_db
+from database import get_async_read_db, get_db, get_read_db
 from controllers import medicine_controller as ctrl
 from models.medicine import Medicine
 from schemas.medicine_schema import MedicineCreate, MedicineUpdate
 
 router = APIRouter(prefix="/medicines", tags=["Medicines"])
 
+# List and export may be served from the read replica (DB_READ_ROUTING "medicines")
+read_db = get_read_db("medicines")
+async_read_db = get_async_read_db("medicines")
+
 
 # 1️⃣ Download Inventory
 @router.get("/download")
-def download_medicine_inventory(db: Session = Depends(get_db)):
+def download_medicine_inventory(db: Session = Depends(read_db)):
     excel_buffer = ctrl.get_medicine_inventory_excel(db)
     return StreamingResponse(
         excel_buffer,
@@ -38,44 +43,16 @@ async def approve_indent(file: UploadFile = File(...), db: Session = Depends(get
 
 # 3️⃣ List Medicines
 @router.get("/")
-def list_medicines(
+async def list_medicines(
     page: int = 1,
     limit: int = 20,
     search: str = "",
     brand: str = "",
     category: str = "",
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(async_read_db),
 ):
-    if page < 1:
-        page = 1
-
-    skip = (page - 1) * limit
-
-    query = db.query(Medicine)
-
-    # Search filter
-    if search.strip():
-        query = query.filter(Medicine.name.ilike(f"%{search.strip()}%"))
-
-    # Brand filter
-    if brand.strip() and brand.lower().strip() != "all":
-        query = query.filter(Medicine.brand.ilike(f"%{brand.strip()}%"))
-
-    # Category filter (NEW)
-    if category.strip() and category.lower().strip() != "all":
-        query = query.filter(Medicine.category.ilike(f"%{category.strip()}%"))
-
-    total = query.count()
-    medicines = query.offset(skip).limit(limit).all()
+    return await db.run_sync(ctrl.list_medicines, page, limit, search, brand, category)
 
-    return {
-        "data": medicines,
-        "page": page,
-        "limit": limit,
-        "total": total,
-        "has_more": (page * limit) < total,
-    }
-    
 
 # 4️⃣ Single Medicine Operations
 @router.get("/{medicine_id}")
@@ -10,19 +10,24 @@ from fastapi import (
     UploadFile,
 )
 from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from database import get_db
-from models.prescription import Prescription
+from database import get_async_db, get_async_read_db, get_db
 from controllers import prescription_controller as ctrl
+from utils.file_cache import close_and_remove, iter_file
 from schemas.prescription_schema import (
     PrescriptionCreate,
     PrescriptionUpdate,
     PrescriptionResponse,
 )
-from reportlab.pdfgen import canvas
 
 router = APIRouter(prefix="/prescriptions", tags=["Prescriptions"])
 
+# GET lists may be served from the read replica (DB_READ_ROUTING "prescriptions");
+# single-prescription reads stay on the primary
+read_db = get_async_read_db("prescriptions")
+
 
 # ================================================================
 # GET PENDING PRESCRIPTIONS
@@ -36,24 +41,28 @@ def get_pending_prescriptions(db: Session = Depends(get_db)):
 # GENERAL LIST WITH SEARCH, FILTERS, PAGINATION
 # ================================================================
 @router.get("/")
-def read_prescriptions(
+async def read_prescriptions(
     page: int = Query(1, ge=1),
     limit: int = Query(10, le=100),
     search: str = Query(None),
     status: str = Query(None),
     date: str = Query(None),
-    db: Session = Depends(get_db),
+    cursor: str = Query(None),
+    count: str = Query("exact", pattern="^(exact|estimate|none)$"),
+    db: AsyncSession = Depends(read_db),
 ):
-    return ctrl.get_prescriptions(db, page, limit, search, status, date)
+    return await db.run_sync(ctrl.get_prescriptions, page, limit, search, status, date, cursor, count)
 
 @router.get("/prescribed-queue")
-def prescribed_queue(
+async def prescribed_queue(
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1, le=100),
     search: str = Query(None),
     date: str = Query(None),
     status: str = Query(None),
-    db: Session = Depends(get_db),
+    cursor: str = Query(None),
+    count: str = Query("exact", pattern="^(exact|estimate|none)$"),
+    db: AsyncSession = Depends(read_db),
 ):
     """
     Pharmacist Queue:
@@ -62,44 +71,76 @@ def prescribed_queue(
       - Medication Prescribed and Lab Test Requested
       - Medication Prescribed by Nurse (Emergency)
     """
-    return ctrl.get_prescribed_queue(
-        db=db,
+    return await db.run_sync(
+        ctrl.get_prescribed_queue,
         page=page,
         limit=limit,
         search=search,
         date=date,
         status=status,
+        cursor=cursor,
+        count=count,
     )
 
+# ================================================================
+# BATCH PRINT (one multi-page PDF)
+# ================================================================
+@router.get("/print")
+def print_prescriptions(
+    date: str = Query(None),
+    queue: str = Query("all", pattern="^(all|pending|prescribed)$"),
+    db: Session = Depends(get_db),
+):
+    """
+    Every prescription of a day (YYYY-MM-DD) and / or a queue as one PDF, a page
+    or more per prescription. No date with queue "all" prints today's.
+    """
+    pdf_file, filename, temp_path = ctrl.print_prescriptions(db, date=date, queue=queue)
+
+    return StreamingResponse(
+        iter_file(pdf_file, remove=[temp_path]),
+        media_type="application/pdf",
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+        # also runs if the client leaves before the body is read
+        background=BackgroundTask(close_and_remove, pdf_file, [temp_path]),
+    )
+
+
 # ================================================================
 # GET BY ID
 # ================================================================
 @router.get("/{prescription_id}")
-def read_prescription(prescription_id: int, db: Session = Depends(get_db)):
-    return ctrl.get_prescription(db, prescription_id)
+async def read_prescription(prescription_id: int, db: AsyncSession = Depends(get_async_db)):
+    # Primary, not the replica: a prescription opened right after it was created
+    # may not have replicated yet
+    return await db.run_sync(ctrl.get_prescription, prescription_id)
 
 
 # ================================================================
 # GET PRESCRIPTIONS OF A STUDENT
 # ================================================================
 @router.get("/student/{student_id}")
-def get_prescriptions_by_student(
+async def get_prescriptions_by_student(
     student_id: int,
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1),
     search: str = "",
     status: str = "all",
     date: str = None,
-    db: Session = Depends(get_db),
+    cursor: str = None,
+    count: str = Query("exact", pattern="^(exact|estimate|none)$"),
+    db: AsyncSession = Depends(read_db),
 ):
-    return ctrl.get_prescriptions_by_studentid(
-        db=db,
+    return await db.run_sync(
+        ctrl.get_prescriptions_by_studentid,
         student_id=student_id,
         page=page,
         limit=limit,
         search=search,
         status=status,
-        date=date
+        date=date,
+        cursor=cursor,
+        count=count,
     )
 
 
@@ -200,53 +241,13 @@ def download_prescription(
     prescription_id: int,
     db: Session = Depends(get_db),
 ):
-    pres = db.query(Prescription).filter(Prescription.id == prescription_id).first()
-
-    if not pres:
-        raise HTTPException(status_code=404, detail="Prescription not found")
-
-    buffer = BytesIO()
-    pdf = canvas.Canvas(buffer)
-    pdf.setTitle(f"Prescription_{prescription_id}")
-
-    # ============================================================
-    # BUILD PDF (NOW SUPPORTS OTHER PATIENTS)
-    # ============================================================
-
-    pdf.setFont("Helvetica-Bold", 14)
-    pdf.drawString(50, 820, "Medicare Hospital – Prescription")
-
-    pdf.setFont("Helvetica", 11)
-    pdf.drawString(50, 790, f"Prescription ID: {pres.id}")
-
-    if pres.student_id:
-        pdf.drawString(50, 770, f"Patient Type: Student")
-        pdf.drawString(50, 750, f"Student ID: {pres.student_id}")
-    else:
-        pdf.drawString(50, 770, f"Patient Type: Others")
-        pdf.drawString(50, 750, f"Patient Name: {pres.other_name or 'N/A'}")
-
-    pdf.drawString(50, 730, f"Nurse ID: {pres.nurse_id}")
-    pdf.drawString(50, 710, f"Doctor ID: {pres.doctor_id or 'Not Assigned'}")
-
-    pdf.drawString(50, 690, f"Age: {pres.age or 'N/A'}")
-    pdf.drawString(50, 670, f"Temperature: {pres.temperature or 'N/A'}")
-    pdf.drawString(50, 650, f"BP: {pres.bp or 'N/A'}")
-    pdf.drawString(50, 630, f"Weight: {pres.weight or 'N/A'}")
-
-    pdf.drawString(50, 610, f"Status: {pres.status}")
-
-    pdf.drawString(50, 580, "Nurse Notes:")
-    pdf.drawString(50, 560, pres.nurse_notes or "N/A")
-
-    pdf.showPage()
-    pdf.save()
-    buffer.seek(0)
+    # Rendered once per version of the prescription (medicines and lab tests included)
+    pdf_bytes, filename = ctrl.get_prescription_pdf(db, prescription_id)
 
     return StreamingResponse(
-        buffer,
+        BytesIO(pdf_bytes),
         media_type="application/pdf",
         headers={
-            "Content-Disposition": f"attachment; filename=prescription_{prescription_id}.pdf"
+            "Content-Disposition": f"attachment; filename={filename}"
         },
-    )
\ No newline at end of file
+    )
@@ -1,14 +1,17 @@
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from controllers.stats_controller import get_hospital_stats, get_lab_tech_stats
-from database import get_db
+from database import get_async_read_db
 
 router = APIRouter()
 
+# Dashboard counters may be served from the read replica (DB_READ_ROUTING "stats")
+read_db = get_async_read_db("stats")
+
 @router.get("/doctor-stats")
-def fetch_stats(db: Session = Depends(get_db)):
-    return get_hospital_stats(db)
+async def fetch_stats(db: AsyncSession = Depends(read_db)):
+    return await db.run_sync(get_hospital_stats)
 
 @router.get("/lab-tech-stats")
-def fetch_stats(db: Session = Depends(get_db)):
-    return get_lab_tech_stats(db)
+async def fetch_stats(db: AsyncSession = Depends(read_db)):
+    return await db.run_sync(get_lab_tech_stats)
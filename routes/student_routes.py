@@ -1,12 +1,15 @@
 from fastapi import APIRouter, Depends, File, UploadFile
 from sqlalchemy.orm import Session
 from typing import List
-from database import get_db
+from database import get_db, get_read_db
 from schemas.student_schema import StudentCreate, StudentOut, StudentBase
 from controllers import student_controller
 
 router = APIRouter(prefix="/students", tags=["Students"])
 
+# CSV export may be served from the read replica (DB_READ_ROUTING "students")
+read_db = get_read_db("students")
+
 @router.post("/", response_model=StudentOut)
 def create_student(student: StudentCreate, db: Session = Depends(get_db)):
     return student_controller.create_student(db, student)
@@ -42,7 +45,7 @@ def upload_students(file: UploadFile = File(...), db: Session = Depends(get_db))
     return student_controller.upload_students_csv(db, file)
 
 @router.get("/download-csv")
-def download_students(db: Session = Depends(get_db)):
+def download_students(db: Session = Depends(read_db)):
     """
     Download all students as CSV.
     """
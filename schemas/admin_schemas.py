@@ -143,6 +143,39 @@ class DashboardStats(BaseModel):
     totalStockValue: float
 
 
+class DbPoolStats(BaseModel):
+    pool_size: int
+    max_overflow: int
+    checked_in: int
+    checked_out: int
+    overflow: int
+    pool_timeout: float
+    pool_recycle: int
+    pre_ping: bool
+    checkouts: int
+    avg_wait_ms: float
+    max_wait_ms: float
+    timeouts: int
+    replica_configured: bool
+    replica_healthy: Optional[bool] = None
+    replica_lag_seconds: Optional[float] = None
+
+
+class HostHttpStats(BaseModel):
+    host: str
+    requests: int
+    errors: int
+    avg_ms: float
+    max_ms: float
+    bytes: int
+
+
+class HttpStats(BaseModel):
+    max_connections: int
+    max_per_host: int
+    hosts: List[HostHttpStats]
+
+
 class MedicineAnalytics(BaseModel):
     name: str
     prescriptionCount: int
@@ -0,0 +1,19 @@
+# schemas/ai_job_schema.py
+from pydantic import BaseModel
+from typing import Optional
+from datetime import datetime
+
+
+class AiJobResponse(BaseModel):
+    id: str
+    status: str
+    prescription_id: Optional[int] = None
+    transcribed_text: Optional[str] = None
+    summary: Optional[str] = None
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
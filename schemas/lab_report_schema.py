@@ -1,6 +1,6 @@
 # schemas/lab_report_schema.py
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Literal, Optional
 from datetime import datetime
 
 from schemas.student_schema import StudentOut
@@ -22,6 +22,15 @@ class LabReportUpdate(BaseModel):
     result_url: Optional[str] = None
 
 
+class LabReportExportRequest(BaseModel):
+    """Either `ids`, or the same filters as GET /lab-reports/ (search, status, date)."""
+    ids: Optional[List[int]] = None
+    search: Optional[str] = None
+    status: Optional[str] = "all"
+    date: Optional[str] = None
+    format: Literal["pdf", "zip"] = "pdf"
+
+
 # ---------------- Response Schemas ----------------
 class LabReportResponse(BaseModel):
     id: int
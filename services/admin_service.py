@@ -1,9 +1,7 @@
-import json
 import os
 from fastapi import HTTPException
-import requests
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, select
 from models.staff_profile import StaffProfile
 from models.student import Student
 from models.user import User
@@ -11,59 +9,76 @@ from models.prescription import Prescription
 from models.lab_report import LabReport
 from models.prescription_medicine import PrescriptionMedicine
 from models.medicine import Medicine
-from schemas.admin_schemas import DashboardStats, MedicineAnalytics, AnomalyAlert
+from models.daily_stats import DailyPrescriptionStats
+from services import anomaly_service, llm_client
+from services.rollup_service import rollup_today
+from schemas.admin_schemas import DashboardStats, DbPoolStats, HttpStats, MedicineAnalytics, AnomalyAlert
+from database import get_pool_status
 from datetime import date, datetime
+from utils import http_client
+from utils.cache import SnapshotCache, invalidate_on_write
 from dotenv import load_dotenv
 load_dotenv()
 
-def get_dashboard_stats(db: Session) -> DashboardStats:
-    today = date.today()
-
-    # Total patients visited today (based on prescriptions created today)
-    total_patients_today = (
-        db.query(func.count(Prescription.id))
-        .filter(func.date(Prescription.created_at) == today)
-        .scalar()
-    )
+# Snapshot served to the (frequently polling) admin dashboard; cleared on writes
+DASHBOARD_STATS_TTL = float(os.getenv("DASHBOARD_STATS_TTL", "15"))
+dashboard_stats_cache = SnapshotCache(ttl=DASHBOARD_STATS_TTL)
+invalidate_on_write(
+    dashboard_stats_cache,
+    ["prescriptions", "lab_reports", "medicines", "users", "students"],
+)
 
-    # Total prescriptions
-    total_prescriptions = db.query(func.count(Prescription.id)).scalar()
 
-    # Pending lab tests (where LabReport.status = "Lab Test Requested")
-    pending_lab_tests = (
-        db.query(func.count(LabReport.id))
-        .filter(LabReport.status == "Lab Test Requested")
-        .scalar()
-    )
+def get_dashboard_stats(db: Session) -> DashboardStats:
+    # Keyed by day so "today" rolls over even while the snapshot is fresh
+    today = rollup_today()
+    return dashboard_stats_cache.get_or_compute(today, lambda: _compute_dashboard_stats(db, today))
+
+
+def _compute_dashboard_stats(db: Session, today: date) -> DashboardStats:
+    """All dashboard counters in one statement (one scalar subquery per counter)."""
+    def scalar(query):
+        return query.scalar_subquery()
+
+    row = db.execute(select(
+        # Total patients visited today (prescriptions created today), from the daily rollup
+        scalar(
+            select(func.coalesce(func.sum(DailyPrescriptionStats.prescriptions), 0))
+            .where(DailyPrescriptionStats.day == today)
+        ).label("total_patients_today"),
+        scalar(
+            select(func.coalesce(func.sum(DailyPrescriptionStats.prescriptions), 0))
+        ).label("total_prescriptions"),
+        scalar(
+            select(func.count(LabReport.id)).where(LabReport.status == "Lab Test Requested")
+        ).label("pending_lab_tests"),
+        scalar(
+            select(func.count(Medicine.id)).where(Medicine.quantity < 10)
+        ).label("low_stock_medicines"),
+        # Active users (assuming all users are active)
+        scalar(select(func.count(User.id))).label("active_users"),
+        scalar(select(func.count(Student.id))).label("total_students"),
+        scalar(
+            select(func.sum(Medicine.quantity * func.coalesce(Medicine.cost, 0)))
+        ).label("total_stock_value"),
+    )).one()
 
-    # Low stock medicines (quantity < 10)
-    low_stock_medicines = (
-        db.query(func.count(Medicine.id))
-        .filter(Medicine.quantity < 10)
-        .scalar()
+    return DashboardStats(
+        totalPatientsToday=row.total_patients_today,
+        totalPrescriptions=row.total_prescriptions,
+        pendingLabTests=row.pending_lab_tests,
+        lowStockMedicines=row.low_stock_medicines,
+        activeUsers=row.active_users,
+        totalStudents=row.total_students,
+        totalStockValue=row.total_stock_value or 0,
     )
 
-    # Active users (assuming all users are active)
-    active_users = db.query(func.count(User.id)).scalar()
+# ---------------------- DB POOL -----------------------
+def get_db_pool_stats() -> DbPoolStats:
+    return DbPoolStats(**get_pool_status())
 
-    # Total students
-    total_students = db.query(func.count(Student.id)).scalar()
-
-    total_stock_value = (
-        db.query(func.sum(Medicine.quantity * func.coalesce(Medicine.cost, 0)))
-        .scalar()
-        or 0
-    )
-
-    return DashboardStats(
-        totalPatientsToday=total_patients_today,
-        totalPrescriptions=total_prescriptions,
-        pendingLabTests=pending_lab_tests,
-        lowStockMedicines=low_stock_medicines,
-        activeUsers=active_users,
-        totalStudents=total_students,
-        totalStockValue=total_stock_value,
-    )
+def get_http_stats() -> HttpStats:
+    return HttpStats(**http_client.get_http_stats())
 
 # ---------------------- USERS -----------------------
 def get_all_users(db: Session):
@@ -197,180 +212,28 @@ def get_medicine_analytics(db: Session):
     return analytics
 
 # ---------------------- ANOMALIES -----------------------
-AI_URL = os.getenv("AI_URL", "https://api.openai.com/v1/chat/completions")
-AI_KEY = os.getenv("AI_KEY")
-
-
 def call_ai(prompt: str):
-    """
-    Handles AI call (OpenAI / custom model / LM Studio / FastAPI LLM server).
-    """
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {AI_KEY}"
-    }
-
-    body = {
-        "model": "gpt-4o-mini",     # Change as needed
-        "messages": [
-            {"role": "system", "content": "You are an anomaly detection engine."},
-            {"role": "user", "content": prompt}
-        ],
-        "temperature": 0,
-    }
-
-    response = requests.post(AI_URL, headers=headers, json=body)
-    response.raise_for_status()
-    return response.json()["choices"][0]["message"]["content"]
+    """AI call for admin reports (OpenAI-compatible endpoint, see services/llm_client.py)."""
+    return llm_client.complete(
+        prompt,
+        provider="openai",
+        system="You summarize hospital anomaly reports.",
+    )
 
 
 def get_anomalies(db: Session):
-    """
-    Collect all hospital data & send to AI model for anomaly detection.
-    """
-
-    # ---- 1. Collect medicines ----
-    medicines = db.query(Medicine).all()
-    medicines_data = [
-        {
-            "id": m.id,
-            "name": m.name,
-            "brand": m.brand,
-            "category": m.category,
-            "expiry_date": m.expiry_date.isoformat() if m.expiry_date else None,
-            "quantity": m.quantity,
-            "cost": m.cost,
-            "tax": m.tax,
-            "total_cost": m.total_cost,
-        }
-        for m in medicines
-    ]
-
-    # ---- 2. Collect prescriptions ----
-    prescriptions = db.query(Prescription).all()
-    prescriptions_data = [
-        {
-            "id": p.id,
-            "student_id": p.student_id,
-            "other_name": p.other_name,
-            "patient_type": p.patient_type,
-            "visit_type": p.visit_type,
-            "status": p.status,
-            "age": p.age,
-            "created_at": p.created_at.isoformat() if p.created_at else None,
-        }
-        for p in prescriptions
-    ]
-
-    # ---- 3. Collect medicine usage ----
-    prescribed_data = db.query(PrescriptionMedicine).all()
-    prescribed_usage = [
-        {
-            "prescription_id": pm.prescription_id,
-            "medicine_id": pm.medicine_id,
-            "quantity_prescribed": pm.quantity_prescribed,
-            "quantity_issued": pm.quantity_issued,
-        }
-        for pm in prescribed_data
-    ]
-
-    # ---- 4. Collect lab reports ----
-    lab_reports = db.query(LabReport).all()
-    lab_reports_data = [
-        {
-            "id": lr.id,
-            "prescription_id": lr.prescription_id,
-            "test_name": lr.test_name,
-            "status": lr.status,
-            "result_uploaded": bool(lr.result or lr.result_url),
-        }
-        for lr in lab_reports
-    ]
-
-    # ---- 5. Collect students ----
-    students = db.query(Student).all()
-    students_data = [
-        {
-            "id": s.id,
-            "id_number": s.id_number,
-            "name": s.name,
-            "branch": s.branch,
-            "section": s.section,
-            "email": s.email,
-        }
-        for s in students
-    ]
-
-    # ---- 6. Construct dataset ----
-    full_dataset = {
-        "timestamp": datetime.now().isoformat(),
-        "medicines": medicines_data,
-        "prescriptions": prescriptions_data,
-        "medicine_usage": prescribed_usage,
-        "lab_reports": lab_reports_data,
-        "students": students_data,
-    }
-
-    # Convert to text for AI
-    dataset_json = json.dumps(full_dataset, indent=2)
-
-    # ---- 7. Send prompt to AI ----
-    prompt = f"""
-        You are an expert AI anomaly detection engine for a Hospital Management System.
-
-        Analyze the following dataset and identify ALL types of anomalies:
-
-        Dataset:
-        {dataset_json}
-
-        Find anomalies in:
-
-        1. **Medicine Inventory**
-        - Negative stock
-        - Expired medicines
-        - Quantity issued > stock
-        - Inconsistent total_cost
-        - Missing categories
-        - Expiry date too near
-        - Medicine prescribed but not in stock
-
-        2. **Prescriptions**
-        - Prescription with no medicines issued
-        - Missing vital fields
-        - Invalid patient type
-        - Duplicate prescriptions
-        - Wrong status flows
-
-        3. **Medicine Usage**
-        - quantity_issued > quantity_prescribed
-        - Missing prescription reference
-
-        4. **Lab Reports**
-        - Completed without result uploaded
-        - Pending for too long
-        - Lab report without prescription
-
-        5. **Students**
-        - Duplicate ID numbers
-        - Missing fields
-
-        Return output in JSON EXACTLY like this:
-        {{
-        "anomalies": [
-            {{
-            "type": "StockMismatch",
-            "severity": "high",
-            "message": "",
-            "details": ""
-            }}
-        ]
-        }}
-    """
+    """Latest stored anomaly snapshot: {"generated_at", "anomalies"} (services/anomaly_service.py)."""
+    return anomaly_service.latest_snapshot(db)
 
-    result = call_ai(prompt)
 
+def get_anomaly_summary(db: Session):
+    """Optional AI step: summarize the stored findings (never the raw tables)."""
+    snapshot = anomaly_service.latest_snapshot(db)
+    alerts = snapshot["anomalies"]
+    dataset = anomaly_service.summary_dataset(db)
+    summary = call_ai(anomaly_service.summary_prompt(dataset)) if dataset else "No anomalies found."
     return {
-        "success": True,
-        "generated_at": datetime.now(),
-        "anomalies": json.loads(result)
+        "generated_at": snapshot["generated_at"],
+        "count": len(alerts),
+        "summary": summary,
     }
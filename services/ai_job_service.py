@@ -0,0 +1,244 @@
+# services/ai_job_service.py
+"""
+Background transcribe + summarize jobs (POST /ai/jobs).
+
+The request only spools the upload and inserts an ai_jobs row; the pipeline in
+services/transcription_service.py then runs as an asyncio task in the same worker,
+writing every stage change to the row. Status is read from the database, so
+GET /ai/jobs/{id} and the SSE stream work from any worker.
+
+A running job touches its row every AI_JOB_HEARTBEAT_SECONDS (also while it waits
+for a transcription slot); one that has not moved for AI_JOB_STALE_SECONDS (its
+worker died or restarted) is reported as failed the next time it is read. A
+finished job is never changed again.
+"""
+import asyncio
+import json
+import logging
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from tempfile import SpooledTemporaryFile
+from typing import Optional
+
+from fastapi import HTTPException, UploadFile
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from models.ai_job import AiJob
+from models.prescription import Prescription
+from services import transcription_service
+
+logger = logging.getLogger(__name__)
+
+# Uploads up to this size stay in memory until the job reads them; larger ones go to disk
+AI_JOB_SPOOL_MAX_MEMORY = int(os.getenv("AI_JOB_SPOOL_MAX_MEMORY", str(8 * 1024 * 1024)))
+AI_JOB_STALE_SECONDS = float(
+    os.getenv("AI_JOB_STALE_SECONDS", str(transcription_service.TRANSCRIBE_TIMEOUT + 300))
+)
+AI_JOB_HEARTBEAT_SECONDS = min(60.0, AI_JOB_STALE_SECONDS / 3)
+# How often the SSE stream re-reads the job, and the keep-alive period for idle streams
+AI_JOB_SSE_POLL_SECONDS = float(os.getenv("AI_JOB_SSE_POLL_SECONDS", "1"))
+AI_JOB_SSE_KEEPALIVE_SECONDS = 15.0
+
+FINISHED = ("completed", "failed")
+
+# Strong references to running jobs (asyncio only keeps weak ones)
+_tasks = set()
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def _aware(value: Optional[datetime]) -> Optional[datetime]:
+    # SQLite hands back naive datetimes
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+# ===================================================================
+# CREATE
+# ===================================================================
+
+async def _spool(file: UploadFile) -> UploadFile:
+    """Copy the upload into a file the job owns (the request's file is closed after the response)."""
+    spool = SpooledTemporaryFile(max_size=AI_JOB_SPOOL_MAX_MEMORY)
+    while chunk := await file.read(transcription_service.UPLOAD_CHUNK_SIZE):
+        spool.write(chunk)
+    spool.seek(0)
+    return UploadFile(spool, filename=file.filename, headers=file.headers)
+
+
+def _insert_job(prescription_id: Optional[int]) -> AiJob:
+    """Check the prescription and insert the queued job (blocking; run in a thread)."""
+    db = SessionLocal()
+    try:
+        if prescription_id is not None:
+            if not db.query(Prescription.id).filter(Prescription.id == prescription_id).first():
+                raise HTTPException(404, "Prescription not found")
+
+        job = AiJob(id=uuid.uuid4().hex, status="queued", prescription_id=prescription_id)
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        return job   # detached, attributes loaded
+    finally:
+        db.close()
+
+
+async def create_job(file: UploadFile, prescription_id: Optional[int] = None) -> AiJob:
+    transcription_service.check_keys()
+
+    upload = await _spool(file)
+    try:
+        # DB round-trips in a thread, like _update: the event loop keeps serving
+        job = await asyncio.to_thread(_insert_job, prescription_id)
+    except Exception:
+        await upload.close()
+        raise
+
+    task = asyncio.create_task(_run(job.id, upload))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return job
+
+
+# ===================================================================
+# RUN
+# ===================================================================
+
+def _update(job_id: str, **fields):
+    """
+    Write job fields in their own transaction (no fields: just touch updated_at);
+    a completed job also fills the prescription's ai_summary. Finished jobs are left
+    alone, e.g. one get_job() already reported as failed.
+    """
+    db = SessionLocal()
+    try:
+        job = db.get(AiJob, job_id)
+        if job is None or job.status in FINISHED:
+            return
+        for field, value in fields.items():
+            setattr(job, field, value)
+        job.updated_at = _now()
+
+        if fields.get("status") == "completed" and job.prescription_id is not None:
+            pres = db.get(Prescription, job.prescription_id)
+            if pres is not None:
+                pres.ai_summary = job.summary
+
+        db.commit()
+    finally:
+        db.close()
+
+
+async def _set(job_id: str, **fields):
+    await asyncio.to_thread(_update, job_id, **fields)
+
+
+async def _heartbeat(job_id: str):
+    """Keep updated_at fresh while the job runs or waits for a slot, so it never looks stale."""
+    while True:
+        await asyncio.sleep(AI_JOB_HEARTBEAT_SECONDS)
+        try:
+            await _set(job_id)
+        except Exception:
+            logger.exception("AI job %s heartbeat failed", job_id)
+
+
+async def _run(job_id: str, upload: UploadFile):
+    async def on_status(status: str):
+        await _set(job_id, status=status)
+
+    heartbeat = asyncio.create_task(_heartbeat(job_id))
+    try:
+        result = await transcription_service.transcribe_and_summarize(upload, on_status)
+        await _set(
+            job_id,
+            status="completed",
+            transcribed_text=result["transcribed_text"],
+            summary=result["summary"],
+            finished_at=_now(),
+        )
+    except asyncio.CancelledError:
+        await _set(job_id, status="failed", error="Interrupted by server shutdown", finished_at=_now())
+        raise
+    except Exception as e:
+        error = e.detail if isinstance(e, HTTPException) else str(e)
+        logger.warning("AI job %s failed: %s", job_id, error)
+        await _set(job_id, status="failed", error=f"AI processing failed: {error}", finished_at=_now())
+    finally:
+        heartbeat.cancel()
+        await upload.close()
+
+
+async def shutdown():
+    """Cancel this worker's running jobs (they are marked failed). Called from main.py lifespan."""
+    for task in list(_tasks):
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+
+
+# ===================================================================
+# READ
+# ===================================================================
+
+def get_job(db: Session, job_id: str) -> AiJob:
+    job = db.get(AiJob, job_id)
+    if job is None:
+        raise HTTPException(404, "Job not found")
+
+    updated_at = _aware(job.updated_at)
+    if job.status not in FINISHED and updated_at and updated_at < _now() - timedelta(seconds=AI_JOB_STALE_SECONDS):
+        job.status = "failed"
+        job.error = "Job was interrupted"
+        job.finished_at = _now()
+        db.commit()
+        db.refresh(job)
+    return job
+
+
+def _snapshot(job_id: str) -> dict:
+    db = SessionLocal()
+    try:
+        job = get_job(db, job_id)
+        return {
+            "id": job.id,
+            "status": job.status,
+            "prescription_id": job.prescription_id,
+            "transcribed_text": job.transcribed_text,
+            "summary": job.summary,
+            "error": job.error,
+            "updated_at": job.updated_at.isoformat() if job.updated_at else None,
+        }
+    finally:
+        db.close()
+
+
+async def stream_job(job_id: str, is_disconnected):
+    """
+    Server-sent events for one job: a `status` event whenever the job changes and a
+    final `completed` / `failed` event carrying the result, then the stream ends.
+    """
+    last = None
+    idle = 0.0
+    while True:
+        if await is_disconnected():
+            return
+
+        snapshot = await asyncio.to_thread(_snapshot, job_id)
+        if snapshot != last:
+            last = snapshot
+            idle = 0.0
+            event = snapshot["status"] if snapshot["status"] in FINISHED else "status"
+            yield f"event: {event}\ndata: {json.dumps(snapshot)}\n\n"
+            if snapshot["status"] in FINISHED:
+                return
+        elif idle >= AI_JOB_SSE_KEEPALIVE_SECONDS:
+            idle = 0.0
+            yield ": keep-alive\n\n"
+
+        await asyncio.sleep(AI_JOB_SSE_POLL_SECONDS)
+        idle += AI_JOB_SSE_POLL_SECONDS
@@ -0,0 +1,513 @@
+# services/anomaly_service.py
+"""
+Rule-based anomaly detection with a persisted result store.
+
+Every check is a SQL rule. Findings are stored in anomaly_findings (models/anomaly.py)
+with stable ids ("<rule>:<entity key>"), so the same problem keeps the same id and
+first_seen between scans. Endpoints read the stored snapshot; scan() refreshes it:
+
+- incremental: each rule only evaluates rows changed since the previous scan
+  (updated_at / created_at watermark, minus ANOMALY_SCAN_OVERLAP_SECONDS for
+  transactions still in flight), plus rows whose verdict changes with time alone
+  (stock that expired, lab tests that crossed the pending limit). Open findings of
+  evaluated rows that no longer match are resolved.
+- full: every ANOMALY_FULL_SCAN_HOURS (or with --full) all rows are evaluated, which
+  also resolves findings whose rows were deleted.
+
+Scans run in the background every ANOMALY_SCAN_INTERVAL seconds (main.py), or with
+
+    python -m services.anomaly_service scan [--full]
+
+An LLM is only used, optionally, to summarize the findings (summary_dataset() +
+summary_prompt(): counts plus the most urgent findings, within a token budget).
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import and_, case, func, or_, select, text
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from models.anomaly import AnomalyFinding, AnomalyScanState
+from models.lab_report import LabReport
+from models.medicine import Medicine
+from models.prescription import Prescription
+from models.prescription_medicine import PrescriptionMedicine
+from models.student import Student
+from utils.prompt_dataset import AI_PROMPT_TOKEN_BUDGET, PromptDataset
+
+logger = logging.getLogger(__name__)
+
+NEAR_EXPIRY_DAYS = int(os.getenv("ANOMALY_NEAR_EXPIRY_DAYS", "30"))
+LAB_PENDING_HOURS = int(os.getenv("ANOMALY_LAB_PENDING_HOURS", "48"))
+# Missing-vitals check only looks at recent prescriptions
+VITALS_LOOKBACK_DAYS = int(os.getenv("ANOMALY_VITALS_LOOKBACK_DAYS", "7"))
+# Per-type cap on findings listed in a response; the rest are reported as one count
+MAX_FINDINGS_PER_RULE = int(os.getenv("ANOMALY_MAX_FINDINGS_PER_RULE", "50"))
+
+# Background scan period in seconds (0 disables the in-process scheduler)
+ANOMALY_SCAN_INTERVAL = float(os.getenv("ANOMALY_SCAN_INTERVAL", "300"))
+ANOMALY_FULL_SCAN_HOURS = float(os.getenv("ANOMALY_FULL_SCAN_HOURS", "24"))
+ANOMALY_SCAN_OVERLAP_SECONDS = float(os.getenv("ANOMALY_SCAN_OVERLAP_SECONDS", "300"))
+
+LAB_REQUESTED = "Lab Test Requested"
+LAB_COMPLETED = "Lab Test Completed"
+
+SEVERITY_ORDER = {"high": 0, "medium": 1, "low": 2}
+
+# pg_try_advisory_xact_lock key, so only one worker scans at a time
+SCAN_LOCK_KEY = 804_213
+
+
+class Rule:
+    """
+    One anomaly check.
+
+    key        - column identifying the entity (finding id is "<type>:<key>")
+    condition  - now -> predicate that makes a row an anomaly (HAVING when grouped)
+    changed    - (since, now) -> predicate for rows whose verdict may have changed
+                 since the watermark
+    describe   - row -> (message, details)
+    personal   - findings name people (e.g. student ID numbers); LLM prompts get
+                 only their counts
+    """
+
+    def __init__(self, type: str, severity: str, key, columns, condition: Callable,
+                 changed: Callable, describe: Callable, joins=(), grouped: bool = False,
+                 personal: bool = False):
+        self.type = type
+        self.severity = severity
+        self.key = key
+        self.columns = columns
+        self.condition = condition
+        self.changed = changed
+        self.describe = describe
+        self.joins = joins
+        self.grouped = grouped
+        self.personal = personal
+
+    def _base(self, db: Session, *entities):
+        query = db.query(self.key.label("key"), *entities)
+        for target, onclause in self.joins:
+            query = query.join(target, onclause)
+        return query
+
+    def findings_query(self, db: Session, now: datetime, since: Optional[datetime]):
+        query = self._base(db, *self.columns)
+        if since is not None:
+            query = query.filter(self.changed(since, now))
+        if self.grouped:
+            return query.group_by(self.key).having(self.condition(now))
+        return query.filter(self.condition(now))
+
+    def scope_query(self, db: Session, now: datetime, since: datetime):
+        """Keys evaluated by an incremental run (anomalous or not)."""
+        return self._base(db).filter(self.changed(since, now)).distinct()
+
+    def finding_id(self, key) -> str:
+        return f"{self.type}:{key}"
+
+
+def _touched(model, since):
+    """Rows inserted or updated since the watermark."""
+    return or_(model.updated_at >= since, model.created_at >= since)
+
+
+_vitals = (Prescription.weight, Prescription.bp, Prescription.temperature)
+_student_id = func.upper(func.trim(Student.id_number))
+
+
+def _missing_vitals(row):
+    missing = [column.key for column in _vitals if not getattr(row, column.key)]
+    return (
+        f"Prescription #{row.key} is missing vitals: {', '.join(missing)}",
+        f"prescriptions.id={row.key} empty: {', '.join(missing)}",
+    )
+
+
+RULES = [
+    Rule(
+        "NegativeStock", "high", Medicine.id, (Medicine.name, Medicine.quantity),
+        condition=lambda now: Medicine.quantity < 0,
+        changed=lambda since, now: Medicine.updated_at >= since,
+        describe=lambda m: (
+            f"{m.name} has negative stock ({m.quantity})",
+            f"medicines.id={m.key} quantity={m.quantity}",
+        ),
+    ),
+    Rule(
+        "ExpiredMedicine", "high", Medicine.id, (Medicine.name, Medicine.quantity, Medicine.expiry_date),
+        condition=lambda now: and_(Medicine.expiry_date < now.date(), Medicine.quantity > 0),
+        # edited, or expired since the last scan
+        changed=lambda since, now: or_(
+            Medicine.updated_at >= since,
+            Medicine.expiry_date.between(since.date(), now.date()),
+        ),
+        describe=lambda m: (
+            f"{m.name} expired on {m.expiry_date} with {m.quantity} units in stock",
+            f"medicines.id={m.key} expiry_date={m.expiry_date} quantity={m.quantity}",
+        ),
+    ),
+    Rule(
+        "NearExpiry", "medium", Medicine.id, (Medicine.name, Medicine.quantity, Medicine.expiry_date),
+        condition=lambda now: and_(
+            Medicine.expiry_date >= now.date(),
+            Medicine.expiry_date <= now.date() + timedelta(days=NEAR_EXPIRY_DAYS),
+            Medicine.quantity > 0,
+        ),
+        # edited, entered the window or expired since the last scan
+        changed=lambda since, now: or_(
+            Medicine.updated_at >= since,
+            Medicine.expiry_date.between(since.date(), now.date() + timedelta(days=NEAR_EXPIRY_DAYS)),
+        ),
+        describe=lambda m: (
+            f"{m.name} expires on {m.expiry_date} ({m.quantity} units in stock)",
+            f"medicines.id={m.key} expiry_date={m.expiry_date} within {NEAR_EXPIRY_DAYS} days",
+        ),
+    ),
+    Rule(
+        "IssuedExceedsPrescribed", "high", PrescriptionMedicine.id,
+        (PrescriptionMedicine.prescription_id, Medicine.name,
+         PrescriptionMedicine.quantity_prescribed, PrescriptionMedicine.quantity_issued),
+        joins=[(Medicine, Medicine.id == PrescriptionMedicine.medicine_id)],
+        condition=lambda now: PrescriptionMedicine.quantity_issued > PrescriptionMedicine.quantity_prescribed,
+        changed=lambda since, now: PrescriptionMedicine.updated_at >= since,
+        describe=lambda pm: (
+            f"Prescription #{pm.prescription_id}: {pm.quantity_issued} {pm.name} issued, "
+            f"{pm.quantity_prescribed} prescribed",
+            f"prescription_medicines.id={pm.key} quantity_prescribed={pm.quantity_prescribed} "
+            f"quantity_issued={pm.quantity_issued}",
+        ),
+    ),
+    Rule(
+        # id_number is unique as stored, so look for ids that differ only in case / spaces
+        "DuplicateStudentId", "high", _student_id, (func.count(Student.id).label("students"),),
+        grouped=True,
+        personal=True,
+        condition=lambda now: func.count(Student.id) > 1,
+        # every student sharing a normalized id with a changed student
+        changed=lambda since, now: _student_id.in_(
+            select(_student_id).where(Student.updated_at >= since).scalar_subquery()
+        ),
+        describe=lambda s: (
+            f"ID number {s.key} is used by {s.students} student records",
+            f"upper(trim(students.id_number))={s.key} count={s.students}",
+        ),
+    ),
+    Rule(
+        "LabPendingTooLong", "medium", LabReport.id,
+        (LabReport.prescription_id, LabReport.test_name, LabReport.created_at),
+        condition=lambda now: and_(
+            LabReport.status == LAB_REQUESTED,
+            LabReport.created_at < now - timedelta(hours=LAB_PENDING_HOURS),
+        ),
+        # touched, or crossed the pending limit since the last scan
+        changed=lambda since, now: or_(
+            _touched(LabReport, since),
+            LabReport.created_at.between(
+                since - timedelta(hours=LAB_PENDING_HOURS), now - timedelta(hours=LAB_PENDING_HOURS)
+            ),
+        ),
+        describe=lambda lr: (
+            f"{lr.test_name} for prescription #{lr.prescription_id} pending since {lr.created_at:%Y-%m-%d %H:%M}",
+            f"lab_reports.id={lr.key} status='{LAB_REQUESTED}' older than {LAB_PENDING_HOURS}h",
+        ),
+    ),
+    Rule(
+        "LabCompletedWithoutResult", "medium", LabReport.id, (LabReport.prescription_id, LabReport.test_name),
+        condition=lambda now: and_(
+            LabReport.status == LAB_COMPLETED,
+            or_(LabReport.result.is_(None), LabReport.result == ""),
+            or_(LabReport.result_url.is_(None), LabReport.result_url == ""),
+        ),
+        changed=lambda since, now: _touched(LabReport, since),
+        describe=lambda lr: (
+            f"{lr.test_name} for prescription #{lr.prescription_id} is completed but has no result",
+            f"lab_reports.id={lr.key} status='{LAB_COMPLETED}' result and result_url empty",
+        ),
+    ),
+    Rule(
+        "MissingVitals", "low", Prescription.id, _vitals,
+        condition=lambda now: and_(
+            Prescription.created_at >= now - timedelta(days=VITALS_LOOKBACK_DAYS),
+            or_(*[or_(column.is_(None), column == "") for column in _vitals]),
+        ),
+        # touched, or left the lookback window since the last scan
+        changed=lambda since, now: or_(
+            _touched(Prescription, since),
+            Prescription.created_at.between(
+                since - timedelta(days=VITALS_LOOKBACK_DAYS), now - timedelta(days=VITALS_LOOKBACK_DAYS)
+            ),
+        ),
+        describe=_missing_vitals,
+    ),
+]
+
+
+def _alert(rule: Rule, row, now: datetime) -> Dict:
+    message, details = rule.describe(row)
+    return {
+        "id": rule.finding_id(row.key),
+        "type": rule.type,
+        "severity": rule.severity,
+        "message": message,
+        "timestamp": now,
+        "details": details,
+    }
+
+
+def run_rules(db: Session, now: datetime = None, since: Optional[datetime] = None) -> List[Dict]:
+    """Evaluate every rule (only rows changed since `since`, if given); AnomalyAlert dicts."""
+    now = now or datetime.now(timezone.utc)
+    return [
+        _alert(rule, row, now)
+        for rule in RULES
+        for row in rule.findings_query(db, now, since).yield_per(500)
+    ]
+
+
+# ===================================================================
+# SCAN + RESULT STORE
+# ===================================================================
+
+def _chunks(items: list, size: int = 500):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _store(db: Session, alerts: List[Dict], now: datetime):
+    """Insert new findings, refresh (and reopen) existing ones."""
+    by_id = {alert["id"]: alert for alert in alerts}
+    for ids in _chunks(list(by_id)):
+        existing = {f.id: f for f in db.query(AnomalyFinding).filter(AnomalyFinding.id.in_(ids))}
+        for finding_id in ids:
+            alert = by_id[finding_id]
+            finding = existing.get(finding_id)
+            if finding is None:
+                finding = AnomalyFinding(id=finding_id, type=alert["type"], first_seen=now)
+                db.add(finding)
+            elif finding.resolved_at is not None:
+                finding.first_seen = now  # came back after being resolved
+            finding.severity = alert["severity"]
+            finding.message = alert["message"]
+            finding.details = alert["details"]
+            finding.last_seen = now
+            finding.resolved_at = None
+
+
+def _resolve(db: Session, rule: Rule, found: set, now: datetime, scope: Optional[set]):
+    """Resolve open findings of `rule` that were evaluated this run and did not match."""
+    open_ids = {
+        finding_id for (finding_id,) in
+        db.query(AnomalyFinding.id).filter(AnomalyFinding.type == rule.type, AnomalyFinding.resolved_at.is_(None))
+    }
+    candidates = open_ids if scope is None else open_ids & scope
+    stale = list(candidates - found)
+    for ids in _chunks(stale):
+        db.query(AnomalyFinding).filter(AnomalyFinding.id.in_(ids)).update(
+            {AnomalyFinding.resolved_at: now}, synchronize_session=False
+        )
+    return len(stale)
+
+
+def _try_lock(db: Session) -> bool:
+    if db.get_bind().dialect.name != "postgresql":
+        return True
+    return db.execute(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": SCAN_LOCK_KEY}).scalar()
+
+
+def _aware(value: datetime) -> datetime:
+    # timestamptz comes back aware on PostgreSQL; naive values (e.g. SQLite) were written as UTC
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def scan(db: Session, full: bool = False) -> Optional[Dict]:
+    """
+    Refresh the stored findings. Returns scan stats, or None if another worker
+    is already scanning.
+    """
+    if not _try_lock(db):
+        return None
+
+    # Aware UTC throughout: a naive local time would be read in the DB session's timezone
+    now = datetime.now(timezone.utc)
+    state = db.get(AnomalyScanState, 1) or AnomalyScanState(id=1)
+    full = (
+        full
+        or state.last_started_at is None
+        or state.last_full_scan_at is None
+        or _aware(state.last_full_scan_at) <= now - timedelta(hours=ANOMALY_FULL_SCAN_HOURS)
+    )
+    since = None if full else _aware(state.last_started_at) - timedelta(seconds=ANOMALY_SCAN_OVERLAP_SECONDS)
+
+    found_total = resolved_total = 0
+    for rule in RULES:
+        alerts = [_alert(rule, row, now) for row in rule.findings_query(db, now, since).yield_per(500)]
+        _store(db, alerts, now)
+
+        scope = None
+        if since is not None:
+            scope = {rule.finding_id(key) for (key,) in rule.scope_query(db, now, since).yield_per(1000)}
+        resolved_total += _resolve(db, rule, {a["id"] for a in alerts}, now, scope)
+        found_total += len(alerts)
+
+    state.last_started_at = now
+    state.last_finished_at = datetime.now(timezone.utc)
+    if full:
+        state.last_full_scan_at = now
+    db.add(state)
+    db.commit()
+
+    return {"full": full, "since": since, "findings": found_total, "resolved": resolved_total}
+
+
+def latest_snapshot(db: Session) -> Dict:
+    """
+    Open findings, most severe first, capped at MAX_FINDINGS_PER_RULE per type.
+    Only reads the store: before the scheduler's first scan has finished this is
+    an empty snapshot with generated_at None.
+    """
+    state = db.get(AnomalyScanState, 1)
+    if state is None or state.last_finished_at is None:
+        return {"generated_at": None, "anomalies": []}
+
+    open_findings = (
+        db.query(AnomalyFinding)
+        .filter(AnomalyFinding.resolved_at.is_(None))
+        .order_by(AnomalyFinding.type, AnomalyFinding.first_seen.desc(), AnomalyFinding.id)
+        .yield_per(500)
+    )
+
+    alerts, per_type = [], {}
+    for finding in open_findings:
+        per_type[finding.type] = per_type.get(finding.type, 0) + 1
+        if per_type[finding.type] <= MAX_FINDINGS_PER_RULE:
+            alerts.append({
+                "id": finding.id,
+                "type": finding.type,
+                "severity": finding.severity,
+                "message": finding.message,
+                "timestamp": finding.first_seen,
+                "details": finding.details,
+            })
+
+    generated_at = state.last_finished_at
+    for rule_type, total in per_type.items():
+        if total > MAX_FINDINGS_PER_RULE:
+            severity = next(a["severity"] for a in alerts if a["type"] == rule_type)
+            alerts.append({
+                "id": f"{rule_type}:more",
+                "type": rule_type,
+                "severity": severity,
+                "message": f"{total - MAX_FINDINGS_PER_RULE} more {rule_type} findings not listed",
+                "timestamp": generated_at,
+                "details": f"{total} open findings of this type; only the first {MAX_FINDINGS_PER_RULE} are listed.",
+            })
+
+    alerts.sort(key=lambda a: SEVERITY_ORDER.get(a["severity"], 3))
+    return {"generated_at": generated_at, "anomalies": alerts}
+
+
+def _scan_with_new_session(full: bool = False):
+    db = SessionLocal()
+    try:
+        return scan(db, full=full)
+    finally:
+        db.close()
+
+
+async def run_scheduler(interval: float = ANOMALY_SCAN_INTERVAL):
+    """Background loop started by main.py: scan every `interval` seconds in a thread."""
+    while True:
+        try:
+            await asyncio.to_thread(_scan_with_new_session)
+        except Exception:
+            logger.exception("Anomaly scan failed")
+        await asyncio.sleep(interval)
+
+
+# ===================================================================
+# OPTIONAL LLM SUMMARY
+# ===================================================================
+
+def _open_findings_by_type(db: Session) -> Dict[str, Dict[str, int]]:
+    counts: Dict[str, Dict[str, int]] = {}
+    rows = (
+        db.query(AnomalyFinding.type, AnomalyFinding.severity, func.count())
+        .filter(AnomalyFinding.resolved_at.is_(None))
+        .group_by(AnomalyFinding.type, AnomalyFinding.severity)
+    )
+    for rule_type, severity, count in rows:
+        counts.setdefault(rule_type, {})[severity] = count
+    return counts
+
+
+def summary_dataset(db: Session, budget: int = AI_PROMPT_TOKEN_BUDGET) -> Optional[str]:
+    """
+    Compact JSON of the open findings for an LLM: counts per type and severity, then
+    individual findings, most severe and most recent first, streamed from the
+    database until the token budget is spent. Findings of `personal` rules are only
+    counted. None when nothing is open.
+    """
+    counts = _open_findings_by_type(db)
+    if not counts:
+        return None
+
+    personal = [rule.type for rule in RULES if rule.personal]
+    listable = sum(n for rule_type, by_severity in counts.items() if rule_type not in personal
+                   for n in by_severity.values())
+
+    stmt = (
+        select(AnomalyFinding.type, AnomalyFinding.severity, AnomalyFinding.message)
+        .where(AnomalyFinding.resolved_at.is_(None), AnomalyFinding.type.notin_(personal))
+        .order_by(
+            case(SEVERITY_ORDER, value=AnomalyFinding.severity, else_=len(SEVERITY_ORDER)),
+            AnomalyFinding.last_seen.desc(),
+            AnomalyFinding.id,
+        )
+        .execution_options(yield_per=200)
+    )
+
+    data = PromptDataset(budget)
+    data.add("open_by_type", counts)
+    with db.execute(stmt) as result:
+        data.add_rows(
+            "findings",
+            ({"type": row.type, "severity": row.severity, "message": row.message} for row in result),
+            total=listable,
+        )
+    return data.render()
+
+
+def summary_prompt(dataset: str) -> str:
+    """Prompt asking an LLM to summarize rule findings (summary_dataset(), not raw data) for an admin."""
+    return f"""
+You are assisting the admin of a campus Hospital Management System.
+The anomaly rules below have already been checked; do not invent new findings.
+open_by_type counts every open finding; findings lists the most urgent ones
+(findings_omitted = how many more exist). Summarize them in at most 6 short bullet
+points, most urgent first, and suggest the next action for each. Plain text, no
+markdown headers.
+
+FINDINGS ({date.today().isoformat()}):
+{dataset}
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the anomaly scan once.")
+    parser.add_argument("command", choices=["scan"])
+    parser.add_argument("--full", action="store_true", help="evaluate all rows, not only changed ones")
+    args = parser.parse_args()
+
+    result = _scan_with_new_session(full=args.full)
+    print("Another scan is already running." if result is None else f"Scan done: {result}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+# services/llm_client.py
+"""
+The one way this app calls an LLM.
+
+- requests go through the shared pooled client (utils/http_client.py)
+- hard timeouts: LLM_TIMEOUT seconds per attempt, LLM_CONNECT_TIMEOUT to connect
+- bounded retries on connection errors, timeouts, 429 and 5xx (LLM_MAX_RETRIES,
+  exponential backoff, Retry-After honoured up to LLM_MAX_BACKOFF)
+- responses cached by a hash of (provider, model, system, prompt, temperature) for
+  LLM_CACHE_TTL seconds, at most LLM_CACHE_SIZE entries (LRU)
+
+Providers:
+- "openai": any OpenAI-compatible chat completions endpoint (AI_URL, AI_KEY, AI_MODEL)
+- "gemini": Gemini REST API (GEMINI_API_KEY, GEMINI_MODEL)
+- "stub": deterministic local answer, no network; LLM_STUB_LATENCY_MS simulates latency
+
+Each call site names its provider; LLM_PROVIDER, when set, forces one provider for
+every call (LLM_PROVIDER=stub to load-test AI endpoints offline).
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from typing import Optional
+
+import httpx
+from dotenv import load_dotenv
+from fastapi import HTTPException
+
+from utils import http_client
+from utils.cache import SnapshotCache
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+LLM_PROVIDER = os.getenv("LLM_PROVIDER")   # unset: each call site's own provider
+
+AI_URL = os.getenv("AI_URL", "https://api.openai.com/v1/chat/completions")
+AI_KEY = os.getenv("AI_KEY")
+AI_MODEL = os.getenv("AI_MODEL", "gpt-4o-mini")
+
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.0-flash-lite")
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL", "https://generativelanguage.googleapis.com/v1beta")
+
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_MAX_BACKOFF = 8.0
+
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "600"))
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "256"))
+LLM_STUB_LATENCY_MS = float(os.getenv("LLM_STUB_LATENCY_MS", "0"))
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+response_cache = SnapshotCache(ttl=LLM_CACHE_TTL, max_entries=LLM_CACHE_SIZE)
+
+
+def resolve_provider(provider: str) -> str:
+    return LLM_PROVIDER or provider
+
+
+def check_configured(provider: str):
+    """Raise 500 if `provider` (after LLM_PROVIDER) is missing its API key."""
+    provider = resolve_provider(provider)
+    if provider == "gemini" and not GEMINI_API_KEY:
+        raise HTTPException(500, "Missing GEMINI_API_KEY")
+    if provider == "openai" and not AI_KEY:
+        raise HTTPException(500, "Missing AI_KEY")
+
+
+# ===================================================================
+# PUBLIC API
+# ===================================================================
+
+def complete(
+    prompt: str,
+    *,
+    provider: str = "gemini",
+    system: Optional[str] = None,
+    model: Optional[str] = None,
+    temperature: float = 0,
+    use_cache: bool = True,
+) -> str:
+    """Text answer to `prompt`. Blocking; use acomplete() from async code."""
+    provider = resolve_provider(provider)
+    if provider not in _BACKENDS:
+        raise HTTPException(500, f"Unknown LLM provider: {provider}")
+    check_configured(provider)
+
+    call = lambda: _BACKENDS[provider](prompt, system, model, temperature)
+    if not use_cache:
+        return call()
+
+    key = hashlib.sha256(
+        "\x00".join([provider, model or "", system or "", prompt, str(temperature)]).encode()
+    ).hexdigest()
+    return response_cache.get_or_compute(key, call)
+
+
+async def acomplete(prompt: str, **kwargs) -> str:
+    return await asyncio.to_thread(complete, prompt, **kwargs)
+
+
+# ===================================================================
+# TRANSPORT
+# ===================================================================
+
+def _backoff(attempt: int, response: Optional[httpx.Response]) -> float:
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    if retry_after and retry_after.isdigit():
+        return min(float(retry_after), LLM_MAX_BACKOFF)
+    return min(0.5 * 2 ** attempt, LLM_MAX_BACKOFF)
+
+
+def _post(url: str, **kwargs) -> dict:
+    """POST with bounded retries; raises HTTPException(500, "AI Error: ...") when it gives up."""
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        response = None
+        try:
+            response = http_client.request(
+                "POST", url, timeout=httpx.Timeout(LLM_TIMEOUT, connect=LLM_CONNECT_TIMEOUT), **kwargs
+            )
+            if response.status_code not in RETRY_STATUSES:
+                response.raise_for_status()
+                return response.json()
+            error = f"HTTP {response.status_code}"
+        except httpx.HTTPStatusError as e:
+            raise HTTPException(500, f"AI Error: HTTP {e.response.status_code}")
+        except http_client.ResponseTooLarge:
+            raise HTTPException(500, "AI Error: response too large")
+        except httpx.TransportError as e:
+            error = f"{type(e).__name__}: {e}"
+
+        if attempt == LLM_MAX_RETRIES:
+            raise HTTPException(500, f"AI Error: {error}")
+        logger.warning("LLM call failed (%s), retry %d of %d", error, attempt + 1, LLM_MAX_RETRIES)
+        time.sleep(_backoff(attempt, response))
+
+
+# ===================================================================
+# PROVIDERS
+# ===================================================================
+
+def _openai(prompt: str, system: Optional[str], model: Optional[str], temperature: float) -> str:
+    messages = [{"role": "system", "content": system}] if system else []
+    messages.append({"role": "user", "content": prompt})
+    data = _post(
+        AI_URL,
+        headers={"Authorization": f"Bearer {AI_KEY}"},
+        json={"model": model or AI_MODEL, "messages": messages, "temperature": temperature},
+    )
+    return data["choices"][0]["message"]["content"].strip()
+
+
+def _gemini(prompt: str, system: Optional[str], model: Optional[str], temperature: float) -> str:
+    body = {
+        "contents": [{"role": "user", "parts": [{"text": prompt}]}],
+        "generationConfig": {"temperature": temperature},
+    }
+    if system:
+        body["systemInstruction"] = {"parts": [{"text": system}]}
+    data = _post(
+        f"{GEMINI_BASE_URL}/models/{model or GEMINI_MODEL}:generateContent",
+        headers={"x-goog-api-key": GEMINI_API_KEY},
+        json=body,
+    )
+    try:
+        parts = data["candidates"][0]["content"]["parts"]
+    except (KeyError, IndexError):
+        raise HTTPException(500, "AI Error: empty Gemini response")
+    return "".join(part.get("text", "") for part in parts).strip()
+
+
+def _stub(prompt: str, system: Optional[str], model: Optional[str], temperature: float) -> str:
+    """Same prompt, same answer: a digest of the prompt plus its last line (e.g. the dictation)."""
+    if LLM_STUB_LATENCY_MS:
+        time.sleep(LLM_STUB_LATENCY_MS / 1000)
+    digest = hashlib.sha256(prompt.encode()).hexdigest()[:12]
+    lines = [line.strip() for line in prompt.splitlines() if line.strip()]
+    excerpt = lines[-1][:200] if lines else ""
+    return f"[stub {digest}] {excerpt}"
+
+
+_BACKENDS = {"openai": _openai, "gemini": _gemini, "stub": _stub}
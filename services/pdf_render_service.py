@@ -0,0 +1,247 @@
+# services/pdf_render_service.py
+"""
+PDF rendering off the API worker.
+
+reportlab / PyPDF2 / PIL work is CPU-bound and holds the GIL, so it runs in a small
+process pool (PDF_RENDER_WORKERS processes, each importing those libraries once at
+start). Callers block on the result in their threadpool thread; at most
+PDF_RENDER_MAX_PENDING renders may be queued or running per API worker (a render
+that timed out still counts until its process finishes), beyond that requests get
+503 + Retry-After, so a burst of downloads cannot take every
+threadpool slot from the other endpoints.
+
+Batch work (lab report exports) goes through render_batch() instead: it waits
+up to PDF_RENDER_TIMEOUT for a slot rather than failing, and only ever uses
+PDF_RENDER_BATCH_MAX of the slots, so single downloads keep the rest.
+
+Jobs receive plain data (SimpleNamespace snapshots, file paths), never ORM objects.
+PDF_RENDER_WORKERS=0 renders in the calling thread (same limits, no processes).
+"""
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from threading import Condition, Lock
+from types import SimpleNamespace
+from typing import Callable, Optional
+
+from fastapi import HTTPException
+
+logger = logging.getLogger(__name__)
+
+PDF_RENDER_WORKERS = int(os.getenv("PDF_RENDER_WORKERS", str(min(2, os.cpu_count() or 1))))
+PDF_RENDER_MAX_PENDING = int(os.getenv("PDF_RENDER_MAX_PENDING", str(max(PDF_RENDER_WORKERS, 1) * 4)))
+PDF_RENDER_BATCH_MAX = max(1, min(
+    int(os.getenv("PDF_RENDER_BATCH_MAX", str(PDF_RENDER_MAX_PENDING // 2))),
+    PDF_RENDER_MAX_PENDING - 1,
+))
+PDF_RENDER_TIMEOUT = float(os.getenv("PDF_RENDER_TIMEOUT", "120"))
+
+_pool: Optional[ProcessPoolExecutor] = None
+_lock = Lock()
+_slot_freed = Condition(_lock)
+_pending = 0
+
+
+def _warm_up():
+    """Process initializer: pay the heavy imports once per render process."""
+    import PIL.Image  # noqa: F401
+    import PyPDF2  # noqa: F401
+    import reportlab.pdfgen.canvas  # noqa: F401
+    import utils.pdf_utils  # noqa: F401
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _lock:
+        if _pool is None:
+            # spawn: forking a threaded server process is unsafe
+            _pool = ProcessPoolExecutor(
+                max_workers=PDF_RENDER_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_warm_up,
+            )
+        return _pool
+
+
+def shutdown():
+    global _pool
+    with _lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def _release(_future=None):
+    global _pending
+    with _lock:
+        _pending -= 1
+        _slot_freed.notify()
+
+
+def _reset_broken_pool():
+    # A render process died (e.g. out of memory); start a fresh pool next time
+    global _pool
+    logger.exception("PDF render pool broke")
+    with _lock:
+        _pool = None
+
+
+def _busy() -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="PDF rendering is busy, please retry shortly",
+        headers={"Retry-After": "5"},
+    )
+
+
+def render(fn: Callable, *args):
+    """
+    Run `fn(*args)` in the render pool and return its result (picklable arguments only).
+    503 at once when PDF_RENDER_MAX_PENDING renders are already queued or running.
+    """
+    global _pending
+    with _lock:
+        if _pending >= PDF_RENDER_MAX_PENDING:
+            raise _busy()
+        _pending += 1
+    return _run(fn, args)
+
+
+def render_batch(fn: Callable, *args):
+    """
+    render() for one step of a batch: waits for one of the PDF_RENDER_BATCH_MAX
+    batch slots (503 only after PDF_RENDER_TIMEOUT), leaving the others to render().
+    """
+    global _pending
+    with _lock:
+        if not _slot_freed.wait_for(lambda: _pending < PDF_RENDER_BATCH_MAX, timeout=PDF_RENDER_TIMEOUT):
+            raise _busy()
+        _pending += 1
+    return _run(fn, args)
+
+
+def _run(fn: Callable, args: tuple):
+    """
+    Run a render that already holds a slot. The slot is held until the render really
+    ends: after a 504 the process is still working, so the slot is released by the
+    future's done callback, not here.
+    """
+    if PDF_RENDER_WORKERS <= 0:
+        try:
+            return fn(*args)
+        finally:
+            _release()
+
+    try:
+        future = _get_pool().submit(fn, *args)
+    except BrokenProcessPool:
+        _release()
+        _reset_broken_pool()
+        raise HTTPException(status_code=500, detail="PDF rendering failed")
+    except BaseException:
+        _release()
+        raise
+    future.add_done_callback(_release)
+
+    try:
+        return future.result(timeout=PDF_RENDER_TIMEOUT)
+    except FutureTimeout:
+        future.cancel()   # only helps if it has not started yet
+        raise HTTPException(status_code=504, detail="PDF rendering timed out")
+    except BrokenProcessPool:
+        _reset_broken_pool()
+        raise HTTPException(status_code=500, detail="PDF rendering failed")
+
+
+# ===================================================================
+# SNAPSHOTS (API process)
+# ===================================================================
+
+def lab_report_snapshot(lab_report) -> SimpleNamespace:
+    """The fields create_cover_pdf reads, detached from the session."""
+    student = lab_report.prescription.student if lab_report.prescription else None
+    return SimpleNamespace(
+        id=lab_report.id,
+        prescription=SimpleNamespace(student=SimpleNamespace(
+            id_number=getattr(student, "id_number", "N/A"),
+            name=getattr(student, "name", "N/A"),
+        )) if lab_report.prescription else None,
+        test_name=lab_report.test_name,
+        status=lab_report.status,
+        result=lab_report.result,
+        result_url=lab_report.result_url,
+        created_at=lab_report.created_at,
+        updated_at=lab_report.updated_at,
+    )
+
+
+def prescription_snapshot(pres) -> SimpleNamespace:
+    """Everything draw_prescription prints (load student, medicines.medicine and lab_reports first)."""
+    fields = (
+        "id", "student_id", "other_name", "nurse_id", "doctor_id", "age",
+        "temperature", "bp", "weight", "status", "nurse_notes", "doctor_notes",
+        "visit_type", "created_at",
+    )
+    student = pres.student
+    return SimpleNamespace(
+        **{field: getattr(pres, field) for field in fields},
+        student=SimpleNamespace(id_number=student.id_number, name=student.name) if student else None,
+        medicines=[
+            SimpleNamespace(
+                name=med.medicine.name if med.medicine else None,
+                quantity_prescribed=med.quantity_prescribed,
+                quantity_issued=med.quantity_issued,
+            )
+            for med in pres.medicines
+        ],
+        lab_reports=[
+            SimpleNamespace(test_name=lab.test_name, status=lab.status, result=lab.result)
+            for lab in pres.lab_reports
+        ],
+    )
+
+
+# ===================================================================
+# JOBS (render processes)
+# ===================================================================
+
+def lab_report_job(report: SimpleNamespace, attachment_path: Optional[str], content_type: str, output_path: str):
+    """Cover page plus the attachment (PDF pages or an image), written to output_path."""
+    from utils.pdf_utils import create_cover_pdf, embed_image_into_pdf, merge_pdfs
+
+    cover = create_cover_pdf(report)
+    with open(output_path, "wb") as output:
+        if attachment_path and "pdf" in content_type.lower():
+            with open(attachment_path, "rb") as attachment:
+                merge_pdfs([cover, attachment], output)
+        elif attachment_path and content_type.startswith("image/"):
+            with open(attachment_path, "rb") as attachment:
+                embed_image_into_pdf(cover, attachment, output)
+        else:
+            output.write(cover.getvalue())
+
+
+def prescription_job(pres: SimpleNamespace) -> bytes:
+    from utils.pdf_utils import create_prescription_pdf
+
+    return create_prescription_pdf(pres).getvalue()
+
+
+def prescriptions_job(prescriptions: list, output_path: str, title: str):
+    """Many prescriptions, one after another, written to output_path (batch printing)."""
+    from utils.pdf_utils import create_prescriptions_pdf
+
+    with open(output_path, "wb") as output:
+        create_prescriptions_pdf(prescriptions, output, title)
+
+
+def merge_job(paths: list, output_path: str):
+    """Concatenate the PDFs at `paths` into output_path (batch exports)."""
+    from contextlib import ExitStack
+
+    from utils.pdf_utils import merge_pdfs
+
+    with ExitStack() as stack, open(output_path, "wb") as output:
+        merge_pdfs([stack.enter_context(open(path, "rb")) for path in paths], output)
@@ -0,0 +1,271 @@
+# services/rollup_service.py
+"""
+Day-keyed rollups of prescriptions, prescribed/issued medicines and lab tests
+(models/daily_stats.py), so dashboards read O(days) rows instead of O(history).
+
+Kept up to date incrementally: before every ORM flush the changes to
+Prescription / PrescriptionMedicine / LabReport rows are turned into +/- deltas and
+applied as atomic upserts in the same transaction, so a rollback undoes them too.
+Writes that bypass the ORM (bulk Core inserts, manual SQL) are not tracked; run the
+backfill after those:
+
+    python -m services.rollup_service backfill [--since YYYY-MM-DD]
+
+A row's day is its created_at as a calendar date in ROLLUP_TIMEZONE (an IANA name,
+default UTC), both in the live hook and in the backfill; readers use rollup_today().
+"""
+import argparse
+import os
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Optional
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import delete, event, func, insert, select, update
+from sqlalchemy.orm import Session, attributes
+
+from database import SessionLocal
+from models.daily_stats import DailyLabTestStats, DailyMedicineStats, DailyPrescriptionStats
+from models.lab_report import LabReport
+from models.prescription import Prescription
+from models.prescription_medicine import PrescriptionMedicine
+
+LAB_TEST_COMPLETED = "Lab Test Completed"
+
+# The hospital's calendar day, e.g. Asia/Kolkata
+ROLLUP_TIMEZONE = os.getenv("ROLLUP_TIMEZONE", "UTC")
+ROLLUP_TZ = timezone.utc if ROLLUP_TIMEZONE.upper() == "UTC" else ZoneInfo(ROLLUP_TIMEZONE)
+
+# Attributes whose old value is needed to reverse a row's previous contribution
+TRACKED_ATTRIBUTES = [
+    Prescription.created_at, Prescription.visit_type, Prescription.patient_type,
+    PrescriptionMedicine.prescription_id, PrescriptionMedicine.medicine_id,
+    PrescriptionMedicine.quantity_prescribed, PrescriptionMedicine.quantity_issued,
+    LabReport.created_at, LabReport.test_name, LabReport.status,
+]
+
+
+def rollup_today() -> date:
+    """Today's rollup day (compare DailyXStats.day with this, not date.today())."""
+    return datetime.now(ROLLUP_TZ).date()
+
+
+def day_bounds(day: date) -> (datetime, datetime): # type: ignore
+    """[start, end) of a rollup day in UTC, for filtering created_at columns by day."""
+    start = datetime.combine(day, time.min, tzinfo=ROLLUP_TZ)
+    end = datetime.combine(day + timedelta(days=1), time.min, tzinfo=ROLLUP_TZ)
+    return start.astimezone(timezone.utc), end.astimezone(timezone.utc)
+
+
+def _day(created_at) -> date:
+    # Server-defaulted created_at is not known before the INSERT: the row is created now
+    if created_at is None:
+        return rollup_today()
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)   # naive DB values are UTC (SQLite)
+    return created_at.astimezone(ROLLUP_TZ).date()
+
+
+def _day_sql(column, dialect: str):
+    """SQL counterpart of _day() for the backfill."""
+    if dialect == "postgresql":
+        return func.date(func.timezone(ROLLUP_TIMEZONE, column))
+    return func.date(column)   # other backends store UTC text; only exact for ROLLUP_TIMEZONE=UTC
+
+
+def _value(obj, attr: str, old: bool):
+    """Current value, or the value as last loaded from the database when old=True."""
+    if not old:
+        return getattr(obj, attr)
+    history = attributes.get_history(obj, attr)
+    if history.deleted:
+        return history.deleted[0]
+    if history.unchanged:
+        return history.unchanged[0]
+    return None if history.added else getattr(obj, attr)
+
+
+def _prescription_day(session: Session, prescription_id) -> date:
+    pres = session.get(Prescription, prescription_id) if prescription_id is not None else None
+    return _day(pres.created_at) if pres is not None else rollup_today()
+
+
+def _contributions(session: Session, obj, old: bool):
+    """(rollup model, key, counters) rows that `obj` adds to the rollups."""
+    if isinstance(obj, Prescription):
+        key = {
+            "day": _day(_value(obj, "created_at", old)),
+            "visit_type": _value(obj, "visit_type", old) or "",
+            "patient_type": _value(obj, "patient_type", old) or "",
+        }
+        return [(DailyPrescriptionStats, key, {"prescriptions": 1})]
+
+    if isinstance(obj, PrescriptionMedicine):
+        key = {
+            "day": _prescription_day(session, _value(obj, "prescription_id", old)),
+            "medicine_id": _value(obj, "medicine_id", old),
+        }
+        counters = {
+            "quantity_prescribed": _value(obj, "quantity_prescribed", old) or 0,
+            "quantity_issued": _value(obj, "quantity_issued", old) or 0,
+        }
+        return [(DailyMedicineStats, key, counters)]
+
+    if isinstance(obj, LabReport):
+        key = {
+            "day": _day(_value(obj, "created_at", old)),
+            "test_name": _value(obj, "test_name", old),
+        }
+        counters = {
+            "requested": 1,
+            "completed": 1 if _value(obj, "status", old) == LAB_TEST_COMPLETED else 0,
+        }
+        return [(DailyLabTestStats, key, counters)]
+
+    return []
+
+
+def _is_tracked_change(obj) -> bool:
+    return any(
+        attributes.get_history(obj, attr.key, passive=attributes.PASSIVE_NO_INITIALIZE).has_changes()
+        for attr in TRACKED_ATTRIBUTES
+        if isinstance(obj, attr.class_)
+    )
+
+
+def _apply(connection, model, key: dict, counters: dict):
+    """Add `counters` to the rollup row at `key`, creating it if needed."""
+    table = model.__table__
+    dialect = connection.dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as upsert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as upsert
+        stmt = upsert(table).values(**key, **counters)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(key),
+            set_={name: table.c[name] + stmt.excluded[name] for name in counters},
+        )
+        connection.execute(stmt)
+        return
+
+    match = [table.c[name] == value for name, value in key.items()]
+    result = connection.execute(
+        update(table).where(*match).values({name: table.c[name] + delta for name, delta in counters.items()})
+    )
+    if result.rowcount == 0:
+        connection.execute(insert(table).values(**key, **counters))
+
+
+@event.listens_for(Session, "before_flush")
+def _update_rollups(session, flush_context, instances):
+    deltas = defaultdict(lambda: defaultdict(int))
+
+    def add(obj, old: bool, sign: int):
+        for model, key, counters in _contributions(session, obj, old):
+            bucket = deltas[(model, tuple(sorted(key.items())))]
+            for name, value in counters.items():
+                bucket[name] += sign * value
+
+    for obj in session.new:
+        add(obj, old=False, sign=1)
+    for obj in session.deleted:
+        add(obj, old=True, sign=-1)
+    for obj in session.dirty:
+        if obj not in session.deleted and _is_tracked_change(obj):
+            add(obj, old=True, sign=-1)
+            add(obj, old=False, sign=1)
+
+    connection = None
+    for (model, key), counters in deltas.items():
+        counters = {name: delta for name, delta in counters.items() if delta}
+        if not counters:
+            continue
+        connection = connection or session.connection()
+        _apply(connection, model, dict(key), counters)
+
+
+def _keep_old_value(target, value, oldvalue, initiator):
+    pass
+
+
+# active_history: load the previous value on assignment so it can be subtracted
+for _attr in TRACKED_ATTRIBUTES:
+    event.listen(_attr, "set", _keep_old_value, active_history=True)
+
+
+# ===================================================================
+# BACKFILL
+# ===================================================================
+
+def rebuild_rollups(db: Session, since: Optional[date] = None):
+    """
+    Recompute the rollups from the raw tables (all days, or days >= since).
+    Safe to re-run; run it when writes are quiet so no delta lands mid-rebuild.
+    """
+    start = datetime.combine(since, datetime.min.time(), tzinfo=ROLLUP_TZ) if since else None
+
+    dialect = db.get_bind().dialect.name
+    pres_day = _day_sql(Prescription.created_at, dialect)
+    lab_day = _day_sql(LabReport.created_at, dialect)
+    visit_type = func.coalesce(Prescription.visit_type, "")
+    patient_type = func.coalesce(Prescription.patient_type, "")
+
+    sources = [
+        (
+            DailyPrescriptionStats,
+            select(pres_day, visit_type, patient_type, func.count(Prescription.id))
+            .where(*([Prescription.created_at >= start] if start else []))
+            .group_by(pres_day, visit_type, patient_type),
+            ["day", "visit_type", "patient_type", "prescriptions"],
+        ),
+        (
+            DailyMedicineStats,
+            select(
+                pres_day,
+                PrescriptionMedicine.medicine_id,
+                func.coalesce(func.sum(PrescriptionMedicine.quantity_prescribed), 0),
+                func.coalesce(func.sum(PrescriptionMedicine.quantity_issued), 0),
+            )
+            .join(Prescription, Prescription.id == PrescriptionMedicine.prescription_id)
+            .where(*([Prescription.created_at >= start] if start else []))
+            .group_by(pres_day, PrescriptionMedicine.medicine_id),
+            ["day", "medicine_id", "quantity_prescribed", "quantity_issued"],
+        ),
+        (
+            DailyLabTestStats,
+            select(
+                lab_day,
+                LabReport.test_name,
+                func.count(LabReport.id),
+                func.count(LabReport.id).filter(LabReport.status == LAB_TEST_COMPLETED),
+            )
+            .where(*([LabReport.created_at >= start] if start else []))
+            .group_by(lab_day, LabReport.test_name),
+            ["day", "test_name", "requested", "completed"],
+        ),
+    ]
+
+    for model, source, columns in sources:
+        db.execute(delete(model).where(*([model.day >= since] if since else [])))
+        db.execute(insert(model).from_select(columns, source))
+    db.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the daily rollup tables.")
+    parser.add_argument("command", choices=["backfill"])
+    parser.add_argument("--since", type=date.fromisoformat, help="only rebuild days >= YYYY-MM-DD")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        rebuild_rollups(db, since=args.since)
+    finally:
+        db.close()
+    print(f"Rollups rebuilt{' since ' + args.since.isoformat() if args.since else ''}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+# services/transcription_service.py
+"""
+Doctor dictation -> AssemblyAI transcript -> Gemini patient-friendly summary.
+
+Everything here is non-blocking for the event loop: one shared httpx.AsyncClient
+(connection reuse), a streamed upload straight from the UploadFile, exponential
+backoff polling with asyncio.sleep, and the summary through services/llm_client.py
+in a worker thread. TRANSCRIBE_CONCURRENCY caps how many dictations a worker processes
+at once; further requests wait for a slot.
+
+SPEECH_PROVIDER=stub / LLM_PROVIDER=stub swap AssemblyAI / Gemini for local stubs
+(no network, no keys): the stub "transcribes" a UTF-8 upload to its text, and the
+stub LLM answers with a digest of the prompt plus the dictation. Use them for offline runs and tests.
+"""
+import asyncio
+import os
+from typing import Awaitable, Callable, Optional
+
+import httpx
+from dotenv import load_dotenv
+from fastapi import HTTPException, UploadFile
+
+from services import llm_client
+from utils import http_client
+
+load_dotenv()
+
+ASSEMBLY_KEY = os.getenv("ASSEMBLYAI_API_KEY")
+ASSEMBLYAI_BASE_URL = os.getenv("ASSEMBLYAI_BASE_URL", "https://api.assemblyai.com/v2")
+
+SPEECH_PROVIDER = os.getenv("SPEECH_PROVIDER", "assemblyai")   # assemblyai | stub
+
+TRANSCRIBE_CONCURRENCY = int(os.getenv("TRANSCRIBE_CONCURRENCY", "4"))
+# Give up on a transcript that is not done after this many seconds
+TRANSCRIBE_TIMEOUT = float(os.getenv("TRANSCRIBE_TIMEOUT", "300"))
+POLL_INITIAL_DELAY = 0.5
+POLL_MAX_DELAY = 5.0
+UPLOAD_CHUNK_SIZE = 256 * 1024
+
+SUMMARY_PROMPT = """
+You are a medical communication assistant.
+
+Rewrite the doctor’s dictation in simple language the patient can understand:
+
+• What medicines to take
+• When to take them
+• Why they are needed (if clear from context)
+• Any precautions
+
+Avoid medical jargon.
+
+Dictation:
+{transcribed_text}
+
+"""
+
+StatusCallback = Callable[[str], Awaitable[None]]
+
+_client: Optional[httpx.AsyncClient] = None
+_semaphore: Optional[asyncio.Semaphore] = None
+
+
+def get_client() -> httpx.AsyncClient:
+    """Shared AssemblyAI client, created on first use (closed by aclose() at shutdown)."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            base_url=ASSEMBLYAI_BASE_URL,
+            headers={"authorization": ASSEMBLY_KEY or ""},
+            timeout=httpx.Timeout(60.0, connect=10.0),
+            limits=httpx.Limits(max_connections=TRANSCRIBE_CONCURRENCY * 2, max_keepalive_connections=TRANSCRIBE_CONCURRENCY),
+            event_hooks=http_client.async_metric_hooks(),
+        )
+    return _client
+
+
+async def aclose():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(TRANSCRIBE_CONCURRENCY)
+    return _semaphore
+
+
+def check_keys():
+    # Missing keys fail these endpoints only, instead of the whole app at import
+    if SPEECH_PROVIDER != "stub" and not ASSEMBLY_KEY:
+        raise HTTPException(500, "Missing ASSEMBLYAI_API_KEY")
+    llm_client.check_configured("gemini")
+
+
+# ===================================================================
+# ASSEMBLYAI
+# ===================================================================
+
+async def _read_chunks(file: UploadFile):
+    while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+        yield chunk
+
+
+async def upload_audio(file: UploadFile) -> str:
+    """Stream the uploaded audio to AssemblyAI without buffering it to disk; returns its URL."""
+    res = await get_client().post("/upload", content=_read_chunks(file))
+    if res.status_code != 200:
+        raise HTTPException(500, "Upload failed")
+    return res.json()["upload_url"]
+
+
+async def start_transcript(audio_url: str) -> str:
+    res = await get_client().post("/transcript", json={"audio_url": audio_url, "language_detection": True})
+    if res.status_code != 200:
+        raise HTTPException(500, "Transcription start failed")
+    return res.json()["id"]
+
+
+async def wait_for_transcript(transcript_id: str) -> str:
+    """
+    Poll with exponential backoff (0.5s doubling to 5s) until done; returns the text.
+    Dropped connections, 429 and 5xx answers are retried like a pending transcript
+    until TRANSCRIBE_TIMEOUT; other error statuses fail at once.
+    """
+    delay = POLL_INITIAL_DELAY
+    deadline = asyncio.get_running_loop().time() + TRANSCRIBE_TIMEOUT
+    while True:
+        try:
+            res = await get_client().get(f"/transcript/{transcript_id}")
+        except httpx.TransportError:
+            res = None
+
+        if res is not None and res.status_code == 200:
+            poll = res.json()
+            if poll["status"] == "completed":
+                return poll["text"]
+            if poll["status"] == "error":
+                raise HTTPException(500, poll["error"])
+        elif res is not None and res.status_code != 429 and res.status_code < 500:
+            raise HTTPException(500, f"Transcription polling failed: HTTP {res.status_code}")
+
+        if asyncio.get_running_loop().time() + delay > deadline:
+            raise HTTPException(504, "Transcription timed out")
+
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, POLL_MAX_DELAY)
+
+
+async def transcribe(file: UploadFile, on_status: Optional[StatusCallback] = None) -> str:
+    if SPEECH_PROVIDER == "stub":
+        await _notify(on_status, "transcribing")
+        return await _stub_transcribe(file)
+
+    await _notify(on_status, "uploading")
+    audio_url = await upload_audio(file)
+    transcript_id = await start_transcript(audio_url)
+    await _notify(on_status, "transcribing")
+    return await wait_for_transcript(transcript_id)
+
+
+async def _stub_transcribe(file: UploadFile) -> str:
+    data = b"".join([chunk async for chunk in _read_chunks(file)])
+    try:
+        return data.decode("utf-8").strip()
+    except UnicodeDecodeError:
+        return f"[stub transcript of {len(data)} bytes of audio]"
+
+
+# ===================================================================
+# SUMMARY
+# ===================================================================
+
+async def summarize(transcribed_text: str) -> str:
+    return await llm_client.acomplete(
+        SUMMARY_PROMPT.format(transcribed_text=transcribed_text), provider="gemini"
+    )
+
+
+# ===================================================================
+# PIPELINE
+# ===================================================================
+
+async def _notify(on_status: Optional[StatusCallback], status: str):
+    if on_status:
+        await on_status(status)
+
+
+async def transcribe_and_summarize(file: UploadFile, on_status: Optional[StatusCallback] = None) -> dict:
+    """Run the pipeline; on_status(stage) is awaited as it enters each stage (used by AI jobs)."""
+    async with _get_semaphore():
+        transcribed_text = await transcribe(file, on_status)
+        await _notify(on_status, "summarizing")
+        summary = await summarize(transcribed_text)
+
+    return {
+        "transcribed_text": transcribed_text,
+        "summary": summary
+    }
@@ -0,0 +1,130 @@
+# utils/cache.py
+import logging
+import time
+from collections import OrderedDict
+from threading import Lock, Thread
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+
+class SnapshotCache:
+    """
+    In-process cache of computed values (one per key), each kept for `ttl` seconds.
+
+    With `stale_ttl`, an expired value is still served for that many more seconds
+    while one background thread recomputes it (stale-while-revalidate).
+
+    With `max_entries`, the least recently used keys are evicted beyond that many.
+
+    Values are per worker process: invalidate() only clears this worker, so the
+    TTL bounds how stale another worker can be.
+    """
+
+    def __init__(self, ttl: float, stale_ttl: float = 0, max_entries: Optional[int] = None):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self._lock = Lock()
+        self._values: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._expires: Dict[Hashable, float] = {}
+        self._refreshing = set()
+        self._generation = 0
+
+    def get_or_compute(
+        self,
+        key: Hashable,
+        compute: Callable[[], Any],
+        refresh: Optional[Callable[[], Any]] = None,
+    ):
+        """
+        Cached value for `key`, computing it inline on a miss.
+        `refresh` recomputes the value in the background (it must not use request
+        state such as the request's DB session); stale values are only served when given.
+        """
+        with self._lock:
+            if key in self._values:
+                self._values.move_to_end(key)
+                now = time.monotonic()
+                if now < self._expires[key]:
+                    return self._values[key]
+                if refresh is not None and now < self._expires[key] + self.stale_ttl:
+                    if key not in self._refreshing:
+                        self._refreshing.add(key)
+                        Thread(
+                            target=self._refresh, args=(key, refresh, self._generation), daemon=True
+                        ).start()
+                    return self._values[key]
+            generation = self._generation
+
+        value = compute()
+        self._store(key, value, generation)
+        return value
+
+    def _refresh(self, key, refresh, generation):
+        try:
+            self._store(key, refresh(), generation)
+        except Exception:
+            logger.exception("Background refresh of %r failed", key)
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _store(self, key, value, generation):
+        with self._lock:
+            # A write committed while we were computing: serve it, but don't keep it
+            if generation == self._generation:
+                self._values[key] = value
+                self._values.move_to_end(key)
+                self._expires[key] = time.monotonic() + self.ttl
+                while self.max_entries is not None and len(self._values) > self.max_entries:
+                    oldest, _ = self._values.popitem(last=False)
+                    del self._expires[oldest]
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._values.clear()
+            self._expires.clear()
+
+
+# ===================================================================
+# INVALIDATION ON COMMIT
+# ===================================================================
+
+# table name -> caches to clear when a commit writes to it
+_watchers: Dict[str, list] = {}
+_SESSION_KEY = "written_tables"
+
+
+def invalidate_on_write(cache: SnapshotCache, tables: Iterable[str]):
+    """Clear `cache` after any ORM commit that inserted, updated or deleted rows of `tables`."""
+    for table in tables:
+        _watchers.setdefault(table, []).append(cache)
+
+
+@event.listens_for(Session, "before_flush")
+def _record_written_tables(session, flush_context, instances):
+    written = session.info.setdefault(_SESSION_KEY, set())
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        table = getattr(obj, "__tablename__", None)
+        if table in _watchers:
+            written.add(table)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_written(session):
+    written = session.info.pop(_SESSION_KEY, None)
+    if not written:
+        return
+    caches = {id(cache): cache for table in written for cache in _watchers[table]}
+    for cache in caches.values():
+        cache.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_written(session):
+    session.info.pop(_SESSION_KEY, None)
@@ -0,0 +1,37 @@
+# utils/dates.py
+from datetime import date
+
+from sqlalchemy import DateTime
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+
+class month_start(FunctionElement):
+    """
+    First instant of the month containing a timestamp, for GROUP BY month.
+    date_trunc('month', col) on PostgreSQL; strftime on SQLite (benchmarks, local runs).
+    """
+    type = DateTime()
+    inherit_cache = True
+    name = "month_start"
+
+
+@compiles(month_start)
+def _month_start_default(element, compiler, **kw):
+    return "date_trunc('month', %s)" % compiler.process(element.clauses, **kw)
+
+
+@compiles(month_start, "sqlite")
+def _month_start_sqlite(element, compiler, **kw):
+    return "strftime('%%Y-%%m-01 00:00:00', %s)" % compiler.process(element.clauses, **kw)
+
+
+def month_key(value) -> str:
+    """'YYYY-MM' for a month_start() result (datetime on PostgreSQL, string on SQLite) or a date."""
+    return str(value)[:7]
+
+
+def add_months(day: date, months: int) -> date:
+    """First day of the month `months` away from `day`'s month (negative goes back)."""
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
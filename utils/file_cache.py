@@ -0,0 +1,174 @@
+# utils/file_cache.py
+"""
+Size-bounded LRU cache of generated files on local disk.
+
+Entries are plain files named "<prefix><hash of key><suffix>" in one directory, so
+every worker process on the host shares them. Writes go to a temp file that is
+renamed into place (readers never see half a file); a hit refreshes the file's
+mtime, and after each write the least recently used files are removed until the
+directory is under max_bytes.
+
+Anything with the same methods (open / put / discard_prefix) can stand in for it,
+e.g. an object store.
+"""
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from threading import Lock
+from typing import BinaryIO, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+STALE_TEMP_SECONDS = 3600
+
+
+class DiskLRUCache:
+    def __init__(self, directory: str, max_bytes: int, suffix: str = ""):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self._lock = Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def path_for(self, prefix: str, key: str) -> str:
+        digest = hashlib.sha256(key.encode()).hexdigest()[:32]
+        return os.path.join(self.directory, f"{prefix}{digest}{self.suffix}")
+
+    def open(self, prefix: str, key: str) -> Optional[BinaryIO]:
+        """Open file for `key`, or None. The handle stays valid even if the entry is evicted meanwhile."""
+        path = self.path_for(prefix, key)
+        try:
+            handle = open(path, "rb")
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(path)   # mark as recently used
+        except OSError:
+            pass
+        return handle
+
+    def temp_path(self) -> str:
+        """A new empty file in the cache directory, for put_file() (same filesystem, so a rename)."""
+        fd, path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        os.close(fd)
+        return path
+
+    def checkout(self, prefix: str, key: str) -> Optional[str]:
+        """
+        Like open(), but returns a private path for another process to read: the entry
+        hard-linked under a temp name (link_temp), which the caller removes. None on a miss.
+        """
+        path = self.path_for(prefix, key)
+        try:
+            link = self.link_temp(path)
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(path)   # mark as recently used (also keeps the link from looking stale)
+        except OSError:
+            pass
+        return link
+
+    def link_temp(self, path: str) -> str:
+        """A second name for `path` (in the cache directory) that eviction will not remove."""
+        link = os.path.join(self.directory, f"{uuid.uuid4().hex}.tmp")
+        try:
+            os.link(path, link)
+        except FileNotFoundError:
+            raise
+        except OSError:
+            shutil.copyfile(path, link)   # filesystem without hard links
+        return link
+
+    def put_file(self, prefix: str, key: str, path: str) -> BinaryIO:
+        """Move the finished file at `path` (from temp_path()) into the cache and return it opened."""
+        # rename first, then open: Windows cannot rename a file that is open
+        cached = self.path_for(prefix, key)
+        os.replace(path, cached)
+        handle = open(cached, "rb")
+        self._evict()
+        return handle
+
+    def put(self, prefix: str, key: str, source: BinaryIO):
+        """Store the contents of `source` (read from its current position)."""
+        path = self.path_for(prefix, key)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                shutil.copyfileobj(source, tmp)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self._evict()
+
+    def discard_prefix(self, prefix: str):
+        """Remove every entry whose name starts with `prefix` (e.g. all versions of one document)."""
+        for name in os.listdir(self.directory):
+            if name.startswith(prefix) and name.endswith(self.suffix):
+                self._remove(os.path.join(self.directory, name))
+
+    def _evict(self):
+        with self._lock:
+            entries, total = [], 0
+            now = time.time()
+            for entry in os.scandir(self.directory):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                if entry.name.endswith(".tmp"):
+                    # left behind by a crashed worker
+                    if now - stat.st_mtime > STALE_TEMP_SECONDS:
+                        self._remove(entry.path)
+                    continue
+                if not entry.name.endswith(self.suffix):
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                self._remove(path)
+                total -= size
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError:
+            logger.warning("Could not remove cached file %s", path)
+
+
+def close_and_remove(handle: Optional[BinaryIO], paths: Sequence[str] = ()):
+    """
+    Close `handle`, then delete the temp files `paths` (in that order: Windows cannot
+    delete an open file). Safe to call twice, e.g. from iter_file() and from a
+    response BackgroundTask, which also runs when the body was never iterated.
+    """
+    if handle is not None:
+        handle.close()
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError:
+            logger.warning("Could not remove temp file %s", path)
+
+
+def iter_file(handle: BinaryIO, chunk_size: int = 64 * 1024, remove: Sequence[str] = ()):
+    """Yield a file's contents in chunks (for StreamingResponse), closing it and deleting `remove` at the end."""
+    try:
+        while chunk := handle.read(chunk_size):
+            yield chunk
+    finally:
+        close_and_remove(handle, remove)
@@ -0,0 +1,246 @@
+# utils/http_client.py
+"""
+Shared outbound HTTP client (attachments, indent sheets, LLM APIs).
+
+- one pooled, keep-alive httpx.Client per worker, at most HTTP_MAX_CONNECTIONS
+  connections in total and HTTP_MAX_PER_HOST requests in flight per host
+- every request has a timeout (HTTP_CONNECT_TIMEOUT / HTTP_READ_TIMEOUT)
+- request() reads API responses up to HTTP_MAX_RESPONSE_MB
+- download() streams the body into a spooled temp file (memory up to
+  HTTP_SPOOL_MEMORY_MB, then disk) and stops at HTTP_MAX_DOWNLOAD_MB
+- per-host latency / error / byte counters, shown by GET /admin/http-stats
+"""
+import os
+import time
+from contextlib import contextmanager
+from tempfile import SpooledTemporaryFile
+from threading import BoundedSemaphore, Lock
+from typing import BinaryIO, Dict, Optional
+from urllib.parse import urlparse
+
+import httpx
+
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "30"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "50"))
+HTTP_MAX_PER_HOST = int(os.getenv("HTTP_MAX_PER_HOST", "10"))
+HTTP_MAX_RESPONSE_MB = float(os.getenv("HTTP_MAX_RESPONSE_MB", "10"))
+HTTP_MAX_DOWNLOAD_MB = float(os.getenv("HTTP_MAX_DOWNLOAD_MB", "100"))
+HTTP_SPOOL_MEMORY_MB = float(os.getenv("HTTP_SPOOL_MEMORY_MB", "5"))
+
+CHUNK_SIZE = 64 * 1024
+
+
+class ResponseTooLarge(Exception):
+    """The response body is bigger than the allowed download size."""
+
+
+class HostStats:
+    """Per-host running totals of request time, failures and bytes received."""
+
+    def __init__(self):
+        self._lock = Lock()
+        self._hosts: Dict[str, dict] = {}
+
+    def record(self, host: str, seconds: float, failed: bool = False, received: int = 0):
+        with self._lock:
+            stats = self._hosts.setdefault(
+                host, {"requests": 0, "errors": 0, "total": 0.0, "max": 0.0, "bytes": 0}
+            )
+            stats["requests"] += 1
+            stats["total"] += seconds
+            stats["max"] = max(stats["max"], seconds)
+            stats["bytes"] += received
+            if failed:
+                stats["errors"] += 1
+
+    def snapshot(self) -> list:
+        with self._lock:
+            return sorted(
+                (
+                    {
+                        "host": host,
+                        "requests": s["requests"],
+                        "errors": s["errors"],
+                        "avg_ms": round(s["total"] / s["requests"] * 1000, 3),
+                        "max_ms": round(s["max"] * 1000, 3),
+                        "bytes": s["bytes"],
+                    }
+                    for host, s in self._hosts.items()
+                ),
+                key=lambda s: s["avg_ms"],
+                reverse=True,
+            )
+
+
+host_stats = HostStats()
+
+_client: Optional[httpx.Client] = None
+_client_lock = Lock()
+_host_slots: Dict[str, BoundedSemaphore] = {}
+
+
+def get_client() -> httpx.Client:
+    global _client
+    with _client_lock:
+        if _client is None or _client.is_closed:
+            _client = httpx.Client(
+                timeout=httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+                limits=httpx.Limits(
+                    max_connections=HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=HTTP_MAX_CONNECTIONS,
+                ),
+                follow_redirects=True,
+            )
+        return _client
+
+
+def close():
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+
+
+def _slot(host: str) -> BoundedSemaphore:
+    with _client_lock:
+        if host not in _host_slots:
+            _host_slots[host] = BoundedSemaphore(HTTP_MAX_PER_HOST)
+        return _host_slots[host]
+
+
+@contextmanager
+def _tracked(url: str):
+    """Hold one of the host's slots and record how the request went; yields a dict for byte counts."""
+    host = urlparse(url).hostname or "unknown"
+    slot = _slot(host)
+    start = time.perf_counter()
+    if not slot.acquire(timeout=HTTP_READ_TIMEOUT):
+        host_stats.record(host, time.perf_counter() - start, failed=True)
+        raise httpx.PoolTimeout(f"No free connection slot for {host}")
+
+    outcome = {"bytes": 0, "failed": False}
+    try:
+        yield outcome
+    except Exception:
+        outcome["failed"] = True
+        raise
+    finally:
+        slot.release()
+        host_stats.record(host, time.perf_counter() - start, outcome["failed"], outcome["bytes"])
+
+
+# ===================================================================
+# REQUESTS
+# ===================================================================
+
+# Describe the streamed body, not the decoded one request() returns
+_BODY_HEADERS = ("content-encoding", "content-length", "transfer-encoding")
+
+
+def _check_declared_size(url: str, response: httpx.Response, limit: int):
+    declared = response.headers.get("Content-Length")
+    if declared and declared.isdigit() and int(declared) > limit:
+        raise ResponseTooLarge(f"{url} is {declared} bytes (limit {limit})")
+
+
+def request(method: str, url: str, max_bytes: Optional[int] = None, **kwargs) -> httpx.Response:
+    """
+    Small request/response calls (APIs). The body is read in chunks and
+    ResponseTooLarge is raised past max_bytes (default HTTP_MAX_RESPONSE_MB).
+    Server errors count as failures in the stats.
+    """
+    limit = max_bytes if max_bytes is not None else int(HTTP_MAX_RESPONSE_MB * 1024 * 1024)
+
+    with _tracked(url) as outcome:
+        with get_client().stream(method, url, **kwargs) as response:
+            _check_declared_size(url, response, limit)
+            body = bytearray()
+            for chunk in response.iter_bytes(CHUNK_SIZE):
+                outcome["bytes"] += len(chunk)
+                if outcome["bytes"] > limit:
+                    raise ResponseTooLarge(f"{url} exceeds {limit} bytes")
+                body += chunk
+
+        outcome["failed"] = response.status_code >= 500
+        return httpx.Response(
+            response.status_code,
+            headers=[(k, v) for k, v in response.headers.multi_items() if k.lower() not in _BODY_HEADERS],
+            content=bytes(body),
+            request=response.request,
+            extensions=response.extensions,
+        )
+
+
+class Download:
+    """A fetched body: `file` is a spooled temp file positioned at 0 (close it when done)."""
+
+    def __init__(self, file, content_type: str, size: int):
+        self.file = file
+        self.content_type = content_type
+        self.size = size
+
+
+def download(url: str, max_bytes: Optional[int] = None, file: Optional[BinaryIO] = None) -> Download:
+    """
+    GET `url` into a spooled temp file (or into `file`, e.g. a named temp file
+    another process will read) without holding the body in memory twice.
+    Raises httpx.HTTPStatusError for non-2xx and ResponseTooLarge past max_bytes
+    (default HTTP_MAX_DOWNLOAD_MB).
+    """
+    limit = max_bytes if max_bytes is not None else int(HTTP_MAX_DOWNLOAD_MB * 1024 * 1024)
+
+    with _tracked(url) as outcome:
+        with get_client().stream("GET", url) as response:
+            response.raise_for_status()
+            _check_declared_size(url, response, limit)
+
+            spool = file if file is not None else SpooledTemporaryFile(
+                max_size=int(HTTP_SPOOL_MEMORY_MB * 1024 * 1024)
+            )
+            try:
+                for chunk in response.iter_bytes(CHUNK_SIZE):
+                    outcome["bytes"] += len(chunk)
+                    if outcome["bytes"] > limit:
+                        raise ResponseTooLarge(f"{url} exceeds {limit} bytes")
+                    spool.write(chunk)
+            except Exception:
+                if file is None:
+                    spool.close()
+                raise
+
+            spool.seek(0)
+            return Download(spool, response.headers.get("Content-Type", ""), outcome["bytes"])
+
+
+# ===================================================================
+# ASYNC CLIENTS
+# ===================================================================
+
+def async_metric_hooks() -> dict:
+    """
+    httpx event hooks that add an AsyncClient's requests to host_stats (time to
+    response headers; connection errors are not seen by hooks).
+    """
+    async def on_request(request: httpx.Request):
+        request.extensions["started_at"] = time.perf_counter()
+
+    async def on_response(response: httpx.Response):
+        started = response.request.extensions.get("started_at")
+        if started is not None:
+            host_stats.record(
+                response.request.url.host or "unknown",
+                time.perf_counter() - started,
+                failed=response.status_code >= 500,
+            )
+
+    return {"request": [on_request], "response": [on_response]}
+
+
+def get_http_stats() -> dict:
+    return {
+        "max_connections": HTTP_MAX_CONNECTIONS,
+        "max_per_host": HTTP_MAX_PER_HOST,
+        "hosts": host_stats.snapshot(),
+    }
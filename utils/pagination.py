@@ -0,0 +1,148 @@
+# utils/pagination.py
+import base64
+import json
+import os
+from datetime import datetime
+from threading import Lock
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+from cachetools import TTLCache
+from fastapi import HTTPException
+from sqlalchemy import and_, or_, func
+
+# count=estimate totals are reused for this many seconds per distinct filter set
+COUNT_CACHE_TTL = int(os.getenv("COUNT_CACHE_TTL", "30"))
+COUNT_MODES = ("exact", "estimate", "none")
+
+_count_cache = TTLCache(maxsize=1024, ttl=COUNT_CACHE_TTL)
+_count_lock = Lock()
+
+
+def encode_cursor(**values) -> str:
+    """
+    Build an opaque cursor from the sort key of the last row on a page.
+    Datetimes are stored as ISO strings; everything else must be JSON-safe.
+    """
+    payload = {
+        key: value.isoformat() if isinstance(value, datetime) else value
+        for key, value in values.items()
+    }
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(
+    cursor: str,
+    fields: Sequence[str],
+    datetime_fields: Sequence[str] = ("created_at",),
+) -> Dict[str, Any]:
+    """
+    Decode a cursor produced by encode_cursor.
+    Raises 400 if the cursor is malformed or does not carry the expected keys.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        values = {key: payload[key] for key in fields}
+        for key in datetime_fields:
+            if key in values and values[key] is not None:
+                values[key] = datetime.fromisoformat(values[key])
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    return values
+
+
+def keyset_after(keys: Sequence[Tuple[Any, Any, str]]):
+    """
+    Build the "rows after this cursor" predicate for a multi-column sort.
+
+    keys: [(column_expression, cursor_value, "asc" | "desc"), ...] in ORDER BY order.
+    e.g. created_at DESC, id DESC  ->  created_at < c  OR (created_at = c AND id < i)
+    """
+    clauses = []
+    for i, (column, value, direction) in enumerate(keys):
+        step = column > value if direction == "asc" else column < value
+        equal_prefix = [col == val for col, val, _ in keys[:i]]
+        clauses.append(and_(*equal_prefix, step) if equal_prefix else step)
+
+    return or_(*clauses)
+
+
+def fetch_page(query, limit: int):
+    """
+    Fetch one keyset page. Reads a single extra row to know whether another page follows.
+    Returns (rows, has_more).
+    """
+    rows = query.limit(limit + 1).all()
+    return rows[:limit], len(rows) > limit
+
+
+def next_cursor_for(rows: list, has_more: bool, **key_getters) -> Optional[str]:
+    """
+    Cursor pointing after the last row, or None on the final page.
+    key_getters map cursor field -> callable(row).
+    """
+    if not rows or not has_more:
+        return None
+
+    last = rows[-1]
+    return encode_cursor(**{key: getter(last) for key, getter in key_getters.items()})
+
+
+# ===================================================================
+# TOTALS
+# ===================================================================
+
+def count_rows(query, id_column, mode: str = "exact") -> Optional[int]:
+    """
+    Count the rows matched by a filtered list query.
+
+    `query` must be the bare filtered query (joins + filters, no eager loads):
+    the count is issued as SELECT count(id) over it, never over the joined page.
+
+    mode:
+      exact    - real COUNT on every call
+      estimate - planner row estimate on PostgreSQL (exact count elsewhere),
+                 cached per filter set for COUNT_CACHE_TTL seconds
+      none     - skip the total entirely (returns None)
+    """
+    if mode == "none":
+        return None
+
+    count_query = query.with_entities(func.count(id_column)).order_by(None)
+    if mode != "estimate":
+        return count_query.scalar() or 0
+
+    id_query = query.with_entities(id_column).order_by(None)
+    dialect = query.session.get_bind().dialect
+    compiled = id_query.statement.compile(dialect=dialect)
+    key = (str(compiled), repr(sorted(compiled.params.items())))
+
+    with _count_lock:
+        cached = _count_cache.get(key)
+    if cached is not None:
+        return cached
+
+    if dialect.name == "postgresql":
+        total = _planner_estimate(query.session, compiled)
+    else:
+        total = count_query.scalar() or 0
+
+    with _count_lock:
+        _count_cache[key] = total
+    return total
+
+
+def _planner_estimate(db, compiled) -> int:
+    """Row estimate from EXPLAIN; no rows are read."""
+    params = compiled.params
+    if compiled.positional:  # asyncpg ($1, $2 ...) under AsyncSession.run_sync
+        params = tuple(params[name] for name in compiled.positiontup)
+
+    plan = db.connection().exec_driver_sql(
+        f"EXPLAIN (FORMAT JSON) {compiled}", params
+    ).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
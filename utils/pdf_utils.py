@@ -2,14 +2,32 @@
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import A4, landscape
 from reportlab.lib.units import mm
-from reportlab.lib.utils import ImageReader
+from reportlab.lib.utils import ImageReader, simpleSplit
 from io import BytesIO
 from datetime import datetime
+from tempfile import SpooledTemporaryFile
+from typing import BinaryIO, Optional
+import os
 from PyPDF2 import PdfReader, PdfWriter
-from PIL import Image
+from PIL import Image, ImageOps, ImageSequence
 
 PAGE_WIDTH, PAGE_HEIGHT = A4
 
+# Merged output stays in memory up to this size, then moves to a temp file
+PDF_SPOOL_MEMORY_MB = float(os.getenv("PDF_SPOOL_MEMORY_MB", "4"))
+
+# Embedded result images: pixels per inch at their printed size, and JPEG quality (1-95)
+PDF_IMAGE_DPI = int(os.getenv("PDF_IMAGE_DPI", "150"))
+PDF_IMAGE_JPEG_QUALITY = int(os.getenv("PDF_IMAGE_JPEG_QUALITY", "80"))
+
+# EXIF orientations that swap width and height
+_ROTATED_ORIENTATIONS = {5, 6, 7, 8}
+
+
+def spooled_pdf_file() -> BinaryIO:
+    """Output file for a merge: memory for small PDFs, a temp file for big ones."""
+    return SpooledTemporaryFile(max_size=int(PDF_SPOOL_MEMORY_MB * 1024 * 1024))
+
 def create_cover_pdf(lab_report) -> BytesIO:
     """
     Create a one-page cover PDF with details and a clickable hyperlink to result_url if exists.
@@ -69,10 +87,13 @@ def create_cover_pdf(lab_report) -> BytesIO:
     buffer.seek(0)
     return buffer
 
-def merge_pdfs(pdf_buffers: list) -> BytesIO:
+def merge_pdfs(pdf_buffers: list, output: Optional[BinaryIO] = None) -> BinaryIO:
     """
-    Merge a list of BytesIO PDF buffers (cover first, then others) using PyPDF2.
-    Each element in pdf_buffers should be a BytesIO (seeked to 0).
+    Merge a list of PDF buffers (cover first, then others) using PyPDF2.
+    Inputs can be BytesIO or (temp) files: PyPDF2 reads objects from them on demand,
+    so a file input is never loaded as one bytes object. The result is written into
+    `output` (e.g. spooled_pdf_file(), so large merges go to disk), default a BytesIO,
+    and returned seeked to 0.
     """
     writer = PdfWriter()
 
@@ -82,54 +103,210 @@ def merge_pdfs(pdf_buffers: list) -> BytesIO:
         for page in reader.pages:
             writer.add_page(page)
 
-    output = BytesIO()
+    if output is None:
+        output = BytesIO()
     writer.write(output)
     output.seek(0)
     return output
 
-def embed_image_into_pdf(cover_buf: BytesIO, image_bytes: BytesIO) -> BytesIO:
+def _fit_to_page(width: float, height: float) -> tuple:
+    """Printed size in points: 1 px = 1 pt, shrunk (never enlarged) to fit the page margins."""
+    max_w = PAGE_WIDTH - (20 * mm)
+    max_h = PAGE_HEIGHT - (30 * mm)
+    scale = min(max_w / width, max_h / height, 1.0)
+    return width * scale, height * scale
+
+
+def _image_frames(img: Image.Image):
+    """Pages to embed: every page of a multi-page TIFF, otherwise the first frame only (e.g. GIF)."""
+    if img.format == "TIFF" and getattr(img, "n_frames", 1) > 1:
+        return ImageSequence.Iterator(img)
+    return [img]
+
+
+def prepare_image_pages(image_file: BinaryIO) -> list:
     """
-    Create a PDF by taking cover_buf and appending the provided image as one or more pages.
-    If the image is large, it will be scaled to fit the page while keeping aspect ratio.
+    Turn an uploaded result image into page-ready JPEGs.
+
+    Each frame is rotated upright per its EXIF orientation, downsampled to
+    PDF_IMAGE_DPI at the size it will be printed on A4 and re-encoded as JPEG
+    (PDF_IMAGE_JPEG_QUALITY). Returns [(jpeg BytesIO, draw_w, draw_h)], sizes in points.
     """
-    # Recreate cover into a writer
-    # Strategy: create new PDF for image pages, then merge
-    # 1) create image PDF
-    image_bytes.seek(0)
-    img = Image.open(image_bytes)
-    img_mode = img.mode
-    if img_mode in ("RGBA", "LA"):
-        # convert to RGB to avoid issues
-        img = img.convert("RGB")
-
-    # If multi-frame (animated GIF) take first frame
-    try:
-        img.seek(0)
-    except Exception:
-        pass
-
-    # create a PDF with the image fit to page
-    image_pdf_buf = BytesIO()
-    c = canvas.Canvas(image_pdf_buf, pagesize=A4)
+    image_file.seek(0)
+    img = Image.open(image_file)
+    pages = []
 
-    # Fit image into page with margins
-    max_w = PAGE_WIDTH - (20 * mm)
-    max_h = PAGE_HEIGHT - (30 * mm)
+    for frame in _image_frames(img):
+        orientation = frame.getexif().get(0x0112, 1)
+        width, height = frame.size
+        if orientation in _ROTATED_ORIENTATIONS:
+            width, height = height, width
+        draw_w, draw_h = _fit_to_page(width, height)
+        target = (max(1, round(draw_w / 72 * PDF_IMAGE_DPI)), max(1, round(draw_h / 72 * PDF_IMAGE_DPI)))
+
+        if frame.format == "JPEG" and target[0] < width:
+            # Let the JPEG decoder scale down by 1/2..1/8 instead of decoding every pixel
+            requested = (target[1], target[0]) if orientation in _ROTATED_ORIENTATIONS else target
+            frame.draft("RGB", requested)
+
+        page = ImageOps.exif_transpose(frame)
+        if page.mode in ("RGBA", "LA", "PA") or (page.mode == "P" and "transparency" in page.info):
+            # flatten onto white rather than letting transparent areas turn black
+            rgba = page.convert("RGBA")
+            page = Image.new("RGB", rgba.size, "white")
+            page.paste(rgba, mask=rgba.getchannel("A"))
+        elif page.mode not in ("RGB", "L"):
+            page = page.convert("RGB")
 
-    iw, ih = img.size
-    # convert pixel sizes to points (1 px ~ 1 point at 72dpi) — better to use image dpi if available
-    scale = min(max_w / iw, max_h / ih, 1.0)
-    draw_w = iw * scale
-    draw_h = ih * scale
+        if page.width > target[0] or page.height > target[1]:
+            page = page.resize(target, Image.LANCZOS)
 
-    x = (PAGE_WIDTH - draw_w) / 2
-    y = (PAGE_HEIGHT - draw_h) / 2
+        jpeg = BytesIO()
+        page.save(jpeg, "JPEG", quality=PDF_IMAGE_JPEG_QUALITY, optimize=True)
+        jpeg.seek(0)
+        pages.append((jpeg, draw_w, draw_h))
+
+    return pages
+
+
+def embed_image_into_pdf(cover_buf: BytesIO, image_bytes: BinaryIO, output: Optional[BinaryIO] = None) -> BinaryIO:
+    """
+    Create a PDF by taking cover_buf and appending the provided image as one or more pages
+    (one per page of a multi-page TIFF), each centred and scaled to fit while keeping aspect ratio.
+    Images go through prepare_image_pages, so the PDF carries JPEGs at PDF_IMAGE_DPI
+    rather than the full-resolution pixels.
+    """
+    image_pdf_buf = BytesIO()
+    c = canvas.Canvas(image_pdf_buf, pagesize=A4)
+
+    for jpeg, draw_w, draw_h in prepare_image_pages(image_bytes):
+        x = (PAGE_WIDTH - draw_w) / 2
+        y = (PAGE_HEIGHT - draw_h) / 2
+        # an ImageReader over JPEG bytes is embedded as-is (DCTDecode), not re-compressed
+        c.drawImage(ImageReader(jpeg), x, y, draw_w, draw_h, preserveAspectRatio=True)
+        c.showPage()
 
-    img_reader = ImageReader(img)
-    c.drawImage(img_reader, x, y, draw_w, draw_h, preserveAspectRatio=True)
-    c.showPage()
     c.save()
     image_pdf_buf.seek(0)
 
-    # 2) merge cover + image_pdf
-    return merge_pdfs([cover_buf, image_pdf_buf])
+    return merge_pdfs([cover_buf, image_pdf_buf], output)
+
+def create_prescription_pdf(pres) -> BytesIO:
+    """Full prescription: patient, vitals, notes, medicines and lab tests."""
+    buffer = BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=A4)
+    pdf.setTitle(f"Prescription_{pres.id}")
+    draw_prescription(pdf, pres)
+    pdf.save()
+    buffer.seek(0)
+    return buffer
+
+
+def create_prescriptions_pdf(prescriptions, output: BinaryIO, title: str = "Prescriptions") -> BinaryIO:
+    """Several prescriptions in one document, each starting on a new page (batch printing)."""
+    pdf = canvas.Canvas(output, pagesize=A4)
+    pdf.setTitle(title)
+    for pres in prescriptions:
+        draw_prescription(pdf, pres)
+    pdf.save()
+    return output
+
+
+class _PageWriter:
+    """Top-down text on a canvas, starting a new page when the current one is full."""
+
+    LEFT = 20 * mm
+    TOP = PAGE_HEIGHT - 20 * mm
+    BOTTOM = 20 * mm
+    WIDTH = PAGE_WIDTH - 40 * mm
+
+    def __init__(self, pdf, footer: str):
+        self.pdf = pdf
+        self.footer = footer
+        self.page = 1
+        self.y = self.TOP
+
+    def line(self, text: str, font: str = "Helvetica", size: int = 11, x: float = 0, gap: float = 6 * mm):
+        self._make_room(gap)
+        self.pdf.setFont(font, size)
+        self.pdf.drawString(self.LEFT + x, self.y, text)
+        self.y -= gap
+
+    def paragraph(self, text: str, size: int = 10, x: float = 0):
+        """Wrapped text (keeps the line breaks of notes)."""
+        for raw in (text or "N/A").splitlines() or [""]:
+            for part in simpleSplit(raw, "Helvetica", size, self.WIDTH - x) or [""]:
+                self.line(part, size=size, x=x, gap=5 * mm)
+
+    def space(self, gap: float = 4 * mm):
+        self.y -= gap
+
+    def _make_room(self, gap: float):
+        if self.y - gap < self.BOTTOM:
+            self.finish_page()
+            self.y = self.TOP
+
+    def finish_page(self):
+        self.pdf.setFont("Helvetica", 8)
+        self.pdf.drawRightString(PAGE_WIDTH - self.LEFT, 10 * mm, f"{self.footer} - page {self.page}")
+        self.pdf.showPage()
+        self.page += 1
+
+
+def draw_prescription(pdf, pres):
+    """Draw one prescription from the current (fresh) page of `pdf`, ending with showPage()."""
+    out = _PageWriter(pdf, f"Prescription {pres.id}")
+
+    out.line("Medicare Hospital – Prescription", font="Helvetica-Bold", size=14, gap=10 * mm)
+    out.line(f"Prescription ID: {pres.id}")
+    created = getattr(pres, "created_at", None)
+    out.line(f"Date: {created.strftime('%Y-%m-%d %H:%M') if created else 'N/A'}")
+
+    student = getattr(pres, "student", None)
+    if pres.student_id:
+        out.line("Patient Type: Student")
+        out.line(f"Student ID: {getattr(student, 'id_number', None) or pres.student_id}")
+        out.line(f"Student Name: {getattr(student, 'name', None) or 'N/A'}")
+    else:
+        out.line("Patient Type: Others")
+        out.line(f"Patient Name: {pres.other_name or 'N/A'}")
+    out.line(f"Visit Type: {getattr(pres, 'visit_type', None) or 'N/A'}")
+
+    out.line(f"Nurse ID: {pres.nurse_id}")
+    out.line(f"Doctor ID: {pres.doctor_id or 'Not Assigned'}")
+    out.line(
+        f"Age: {pres.age or 'N/A'}    Temperature: {pres.temperature or 'N/A'}    "
+        f"BP: {pres.bp or 'N/A'}    Weight: {pres.weight or 'N/A'}"
+    )
+    out.line(f"Status: {pres.status}")
+
+    for heading, notes in (("Nurse Notes", pres.nurse_notes), ("Doctor Notes", getattr(pres, "doctor_notes", None))):
+        out.space()
+        out.line(f"{heading}:", font="Helvetica-Bold")
+        out.paragraph(notes)
+
+    medicines = getattr(pres, "medicines", None) or []
+    out.space()
+    out.line("Medicines:", font="Helvetica-Bold")
+    if medicines:
+        for med in medicines:
+            issued = med.quantity_issued if med.quantity_issued is not None else "-"
+            out.line(
+                f"{med.name or 'N/A'}  -  prescribed {med.quantity_prescribed}, issued {issued}",
+                size=10, x=4 * mm, gap=5 * mm,
+            )
+    else:
+        out.line("None", size=10, gap=5 * mm)
+
+    lab_reports = getattr(pres, "lab_reports", None) or []
+    out.space()
+    out.line("Lab Tests:", font="Helvetica-Bold")
+    if lab_reports:
+        for lab in lab_reports:
+            out.line(f"{lab.test_name}  -  {lab.status}", size=10, x=4 * mm, gap=5 * mm)
+            if lab.result:
+                out.paragraph(f"Result: {lab.result}", size=9, x=8 * mm)
+    else:
+        out.line("None", size=10, gap=5 * mm)
+
+    out.finish_page()
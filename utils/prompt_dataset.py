@@ -0,0 +1,69 @@
+# utils/prompt_dataset.py
+"""
+Compact, size-bounded data sections for LLM prompts.
+
+Aggregates are always included; rows are streamed in (most important first) only
+while the token budget lasts, so a prompt stays the same size however big the
+tables get. Everything is serialized as compact JSON (no indentation or spaces).
+"""
+import json
+import os
+from typing import Any, Iterable
+
+# Budget for the data part of a prompt (instructions come on top)
+AI_PROMPT_TOKEN_BUDGET = int(os.getenv("AI_PROMPT_TOKEN_BUDGET", "1500"))
+
+
+def compact_json(value: Any) -> str:
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token); no tokenizer needed."""
+    return len(text) // 4 + 1
+
+
+class PromptDataset:
+    """
+    Named sections rendered as one compact JSON object.
+
+        data = PromptDataset(budget=1500)
+        data.add("counts", {...})                 # always included
+        data.add_rows("rows", iter_rows(), total)  # as many rows as fit
+        data.render()
+    """
+
+    def __init__(self, budget: int = AI_PROMPT_TOKEN_BUDGET):
+        self.budget = budget
+        self.used = 0
+        self.sections = {}
+
+    @property
+    def remaining(self) -> int:
+        return self.budget - self.used
+
+    def add(self, name: str, value: Any):
+        self.sections[name] = value
+        self.used += estimate_tokens(compact_json({name: value}))
+
+    def add_rows(self, name: str, rows: Iterable[Any], total: int) -> int:
+        """
+        Add rows until the next one would exceed the budget. `rows` is consumed
+        lazily (pass a streaming query), and is not read past the last row that fits.
+        `total` is the full row count, used to note how many were left out.
+        """
+        included = []
+        for row in rows:
+            cost = estimate_tokens(compact_json(row)) + 1
+            if cost > self.remaining:
+                break
+            included.append(row)
+            self.used += cost
+
+        self.sections[name] = included
+        if total > len(included):
+            self.add(f"{name}_omitted", total - len(included))
+        return len(included)
+
+    def render(self) -> str:
+        return compact_json(self.sections)
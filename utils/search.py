@@ -0,0 +1,34 @@
+# utils/search.py
+from sqlalchemy import or_
+
+
+def escape_like(term: str) -> str:
+    """Escape LIKE wildcards so user input is matched literally."""
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def contains(column, term: str):
+    """
+    Case-insensitive substring match.
+    On PostgreSQL this is served by the pg_trgm GIN index on the column (migration 0003);
+    on SQLite (tests / local dev) it is the same ILIKE evaluated as a scan.
+    """
+    return column.ilike(f"%{escape_like(term)}%", escape="\\")
+
+
+def _is_int_id(term: str) -> bool:
+    return term.isascii() and term.isdigit() and int(term) < 2**31
+
+
+def text_search(term: str, *columns, id_column=None):
+    """
+    OR of substring matches over `columns`.
+    Numeric terms also match `id_column` exactly — an equality the primary key can
+    answer, instead of CAST(id AS VARCHAR) ILIKE which no index can. Only ASCII digits
+    within the integer column's range count ("²" or an over-long number would fail).
+    """
+    term = term.strip()
+    branches = [contains(column, term) for column in columns]
+    if id_column is not None and _is_int_id(term):
+        branches.append(id_column == int(term))
+    return or_(*branches)
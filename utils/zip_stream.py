@@ -0,0 +1,48 @@
+# utils/zip_stream.py
+"""
+ZIP archives written straight into a StreamingResponse.
+
+zipfile can write to an unseekable stream (sizes go into data descriptors after
+each member), so the archive is produced chunk by chunk and never held whole.
+"""
+import io
+import zipfile
+from typing import Iterable, Tuple
+
+CHUNK_SIZE = 64 * 1024
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only, unseekable file that collects what zipfile writes until drained."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_zip(members: Iterable[Tuple[str, str]], compression: int = zipfile.ZIP_STORED):
+    """
+    Yield a ZIP of the files in `members` ((name in archive, path on disk) pairs).
+    Stored by default: PDFs and images are already compressed.
+    """
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, "w", compression=compression) as archive:
+        for name, path in members:
+            with open(path, "rb") as source, archive.open(name, "w", force_zip64=True) as member:
+                while chunk := source.read(CHUNK_SIZE):
+                    member.write(chunk)
+                    if data := sink.drain():
+                        yield data
+            yield sink.drain()   # member header / data descriptor
+    yield sink.drain()           # central directory